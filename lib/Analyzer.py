@@ -9,6 +9,7 @@ import lib.Logging as logging
 import lib.TimeTracking as tt
 import lib.FunctorManagement as fmg
 import lib.DefaultFlags as defaults
+from lib.ProcessEngine import ExecutionContext
 
 
 class Analyzer:
@@ -38,7 +39,7 @@ class Analyzer:
     pgis_cfg_file = self._profile_sink.output_pgis_config(benchmark, analyzer_dir)
 
     if analyze_functor.get_method()['active']:
-      analyze_functor.active(benchmark, **kwargs)
+      util.run_active_functor(analyze_functor, benchmark, ExecutionContext(analyzer_dir), **kwargs)
 
     else:
       logging.get_logger().log('Analyzer::analyze_local: Using passive mode')
@@ -52,7 +53,7 @@ class Analyzer:
         benchmark_name = self.config.get_benchmark_name(benchmark)
 
         if isdirectory_good:
-          util.change_cwd(analyzer_dir)
+          # The analysis commands run in analyzer_dir, see util.run_analyser_command.
           logging.get_logger().log('Analyzer::analyzer_local: Flavor = ' + flavor + ' | benchmark_name = ' +
                                    benchmark_name)
           instr_files = util.build_instr_file_path(analyzer_dir, flavor, benchmark_name)
@@ -73,7 +74,6 @@ class Analyzer:
                           benchmark_name)
           util.run_analyser_command_noInstr(command, analyzer_dir, flavor, benchmark_name)
 
-        self.tear_down(build, exp_dir)
         return instr_files
 
       except Exception as e:
@@ -81,20 +81,32 @@ class Analyzer:
 
         raise Exception('Problem in Analyzer')
 
-  def analyse_slurm(self, flavors, build, benchmark, kwargs, config):
-    logging.get_logger().log('Analyzer::analyse_slurm: Not implemented. Aborting.', level='error')
-    assert(False)
+  def analyse_slurm(self, flavor: str, build: str, benchmark: str, kwargs: dict, iterationNumber: int) -> str:
+    """
+    With the SlurmRunner, only the measurements are submitted as jobs. The analysis is cheap compared to these and runs
+    on the submitting node, where the profiles of the job array are available in the shared file system.
+    """
+    logging.get_logger().log('Analyzer::analyse_slurm: Analyzing the profiles of the job array locally', level='debug')
+    return self.analyze_local(flavor, build, benchmark, kwargs, iterationNumber)
 
   def set_up(self):
     pass
 
-  def tear_down(self, old_dir, exp_dir):
-    isdirectory_good = util.check_provided_directory(exp_dir)
-    if isdirectory_good:
-      try:
-        util.change_cwd(old_dir)
-      except Exception as e:
-        logging.get_logger().log(str(e), level='error')
+  def get_call_graph_file(self, target_config) -> str:
+    """ The .ipcg file the analysis of target_config is based on """
+    build = target_config.get_build()
+    benchmark = target_config.get_target()
+    analyzer_dir = self.config.get_analyser_dir(build, benchmark)
+    return util.get_ipcg_file_name(analyzer_dir, self.config.get_benchmark_name(benchmark), target_config.get_flavor())
+
+  def get_cube_file(self, target_config, iteration_number: int) -> str:
+    """ The profile of iteration_number, which the analysis of the next iteration is based on """
+    build = target_config.get_build()
+    benchmark = target_config.get_target()
+    flavor = target_config.get_flavor()
+    exp_dir = self.config.get_analyser_exp_dir(build, benchmark)
+    return util.get_cube_file_path(exp_dir, flavor, iteration_number) + '/' + flavor + '-' + \
+        self.config.get_benchmark_name(benchmark) + '.cubex'
 
   def analyze(self, target_config, iteration_number: int) -> str:
     default_provider = defaults.BackendDefaults()
@@ -0,0 +1,170 @@
+"""
+File: ArtifactStore.py
+License: Part of the PIRA project. Licensed under BSD 3 clause license. See LICENSE.txt file at https://github.com/jplehr/pira/LICENSE.txt
+Description: Module to keep built executables in a content-addressed store, to restore them instead of rebuilding.
+"""
+
+import sys
+sys.path.append('..')
+
+import lib.Utility as util
+import lib.Logging as log
+from lib.Configuration import TargetConfiguration
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import typing
+
+
+class ArtifactStore:
+  """
+  Keeps the products of (instrumented) builds. Every file is stored once under the hash of its content in
+  <store>/objects. A build is described by a manifest in <store>/builds, which maps the paths of its products,
+  relative to the target directory, to their content hashes. A build is identified by the hash of all its inputs:
+  the sources, the build and clean commands, the instrumentation file and the toolchain.
+  With a max_size (bytes), the least recently used builds are evicted once the stored objects exceed it.
+  """
+
+  def __init__(self, store_dir: str, max_size: int = 0) -> None:
+    self._store_dir = store_dir
+    self._max_size = max_size
+    self._objects_dir = os.path.join(store_dir, 'objects')
+    self._builds_dir = os.path.join(store_dir, 'builds')
+    util.make_dirs(self._objects_dir)
+    util.make_dirs(self._builds_dir)
+    # Concurrently saved objects must not be collected before their manifest is written
+    self._lock = threading.RLock()
+
+  def get_store_dir(self) -> str:
+    return self._store_dir
+
+  def get_max_size(self) -> int:
+    return self._max_size
+
+  def get_build_key(self, target_config: TargetConfiguration, build_command: str, clean_command: str,
+                    instr_file: str) -> str:
+    """ Hashes all inputs of a build: the sources, the commands, the instrumentation file and the toolchain. """
+    inputs = [
+        util.hash_source_tree(target_config.get_place()),
+        target_config.get_target(),
+        target_config.get_flavor(), build_command, clean_command,
+        util.get_toolchain_fingerprint()
+    ]
+    if instr_file is not None and util.is_file(instr_file):
+      inputs.append(util.hash_file(instr_file))
+
+    return util.hash_string('|'.join(inputs))
+
+  def _get_manifest_file(self, build_key: str) -> str:
+    return os.path.join(self._builds_dir, build_key + '.json')
+
+  def _get_object_file(self, content_hash: str) -> str:
+    return os.path.join(self._objects_dir, content_hash)
+
+  def _atomic_copy(self, source: str, target: str) -> None:
+    """ Concurrent PIRA processes must never see partially written files. """
+    fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(target), prefix='.pira-')
+    os.close(fd)
+    try:
+      shutil.copyfile(source, tmp_file)
+      os.replace(tmp_file, target)
+    except Exception:
+      util.remove_file(tmp_file)
+      raise
+
+  def has(self, build_key: str) -> bool:
+    return util.is_file(self._get_manifest_file(build_key))
+
+  def save(self, build_key: str, directory: str, newer_than: float) -> typing.List[str]:
+    """ Stores the executables and shared libraries in directory that were written after newer_than. """
+    with self._lock:
+      products = util.find_executables(directory, newer_than, with_shared_libs=True)
+      manifest = {}
+      for product in products:
+        content_hash = util.hash_file(product)
+        object_file = self._get_object_file(content_hash)
+        if not util.is_file(object_file):
+          self._atomic_copy(product, object_file)
+        mode = os.stat(product).st_mode & 0o777
+        manifest[os.path.relpath(product, directory)] = {'hash': content_hash, 'mode': mode}
+
+      if len(manifest) == 0:
+        log.get_logger().log('ArtifactStore::save: No build products found in ' + directory, level='warn')
+        return []
+
+      fd, tmp_file = tempfile.mkstemp(dir=self._builds_dir, prefix='.pira-')
+      with os.fdopen(fd, 'w') as f:
+        json.dump(manifest, f)
+      os.replace(tmp_file, self._get_manifest_file(build_key))
+      log.get_logger().log('ArtifactStore::save: Stored ' + str(list(manifest.keys())) + ' as ' + build_key)
+      self.evict()
+      return products
+
+  def get_size(self) -> int:
+    """ Bytes of all stored objects """
+    return sum([os.path.getsize(os.path.join(self._objects_dir, o)) for o in os.listdir(self._objects_dir)])
+
+  def evict(self) -> typing.List[str]:
+    """
+    Removes the least recently saved or restored builds until the objects fit into max_size, and then all objects
+    that no remaining build refers to. Returns the keys of the removed builds.
+    """
+    with self._lock:
+      if self._max_size <= 0 or self.get_size() <= self._max_size:
+        return []
+
+      manifests = [os.path.join(self._builds_dir, m) for m in os.listdir(self._builds_dir) if m.endswith('.json')]
+      manifests.sort(key=os.path.getmtime)
+      evicted = []
+      # The most recent build is always kept
+      while len(manifests) > 1 and self.get_size() > self._max_size:
+        manifest_file = manifests.pop(0)
+        util.remove_file(manifest_file)
+        evicted.append(os.path.basename(manifest_file)[:-len('.json')])
+        self._collect_garbage(manifests)
+
+      log.get_logger().log('ArtifactStore::evict: Evicted ' + str(evicted), level='debug')
+      return evicted
+
+  def _collect_garbage(self, manifests: typing.List[str]) -> None:
+    referenced = set()
+    for manifest_file in manifests:
+      with open(manifest_file) as f:
+        referenced.update([entry['hash'] for entry in json.load(f).values()])
+    for content_hash in os.listdir(self._objects_dir):
+      if content_hash not in referenced and not content_hash.startswith('.pira-'):
+        util.remove_file(self._get_object_file(content_hash))
+
+  def restore(self, build_key: str, directory: str) -> bool:
+    """ Copies the products of build build_key into directory. Returns False, if the build is not known. """
+    try:
+      with open(self._get_manifest_file(build_key)) as f:
+        manifest = json.load(f)
+    except OSError:
+      return False
+
+    for rel_path, entry in manifest.items():
+      object_file = self._get_object_file(entry['hash'])
+      if not util.is_file(object_file):
+        log.get_logger().log('ArtifactStore::restore: Missing object ' + entry['hash'] + ' for ' + rel_path,
+                             level='warn')
+        return False
+
+    try:
+      for rel_path, entry in manifest.items():
+        target = os.path.join(directory, rel_path)
+        util.make_dirs(os.path.dirname(target))
+        self._atomic_copy(self._get_object_file(entry['hash']), target)
+        os.chmod(target, entry['mode'])
+      # Marks the build as recently used
+      os.utime(self._get_manifest_file(build_key))
+    except OSError as e:
+      # E.g., evicted by a concurrent PIRA process
+      log.get_logger().log('ArtifactStore::restore: Restoring ' + build_key + ' failed: ' + str(e), level='warn')
+      return False
+
+    log.get_logger().log('ArtifactStore::restore: Restored ' + str(list(manifest.keys())) + ' from ' + build_key)
+    return True
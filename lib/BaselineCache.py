@@ -0,0 +1,132 @@
+"""
+File: BaselineCache.py
+License: Part of the PIRA project. Licensed under BSD 3 clause license. See LICENSE.txt file at https://github.com/jplehr/pira/LICENSE.txt
+Description: Module to reuse vanilla (baseline) measurements of previous PIRA invocations.
+"""
+
+import sys
+sys.path.append('..')
+
+import lib.Utility as util
+import lib.Logging as log
+import lib.FunctorManagement as fm
+import lib.Measurement as ms
+import lib.PerfEvents as pe
+from lib.Configuration import TargetConfiguration
+
+import abc
+import time
+
+
+class BaselineCacheBase(abc.ABC):
+
+  @abc.abstractmethod
+  def get_baseline(self, target_config: TargetConfiguration, build_fn, measure_fn) -> ms.RunResult:
+    """
+    Returns the baseline RunResult of target_config.
+
+    :build_fn: callable that does the vanilla build
+    :measure_fn: callable that does the baseline measurement and returns its RunResult
+    """
+
+
+class NopBaselineCache(BaselineCacheBase):
+  """  Always builds and measures  """
+
+  def get_baseline(self, target_config: TargetConfiguration, build_fn, measure_fn) -> ms.RunResult:
+    build_fn()
+    return measure_fn()
+
+
+class BaselineCache(BaselineCacheBase):
+  """
+  Stores baseline RunResults in the PIRA database. An entry is found in two ways:
+  1) Before the vanilla build, via the sources of the target, its build and run functors, its arguments and the
+     environment. On a hit, neither the vanilla build nor the baseline measurement is done.
+  2) After the vanilla build, via the hash of the built executable, the arguments and the environment. On a hit, the
+     baseline measurement is skipped.
+  The environment is the host and the toolchain, i.e., compilers, Score-P and the build environment variables.
+  """
+
+  def __init__(self, db_manager, configuration, runner) -> None:
+    self._dbm = db_manager
+    self._config = configuration
+    self._runner = runner
+    self._environment = util.hash_string(util.get_host_fingerprint() + '|' + util.get_toolchain_fingerprint())
+
+  def get_args_key(self, target_config: TargetConfiguration) -> str:
+    """
+    All argument configurations the runner measures, and how it measures them: the settings of the runner, e.g., the
+    number of repetitions, and the outlier rejection.
+    """
+    args = self._config.get_args(target_config.get_build(), target_config.get_target())
+    outliers = ms.RunResult.outlier_policy + '=' + str(ms.RunResult.outlier_threshold)
+    return self._runner.get_measurement_settings() + ':' + outliers + ':' + '|'.join([str(a) for a in args])
+
+  def get_source_hash(self, target_config: TargetConfiguration) -> str:
+    build = target_config.get_build()
+    item = target_config.get_target()
+    flavor = target_config.get_flavor()
+    f_man = fm.FunctorManager()
+    builder_path, builder_name, _ = f_man.get_builder(build, item, flavor, True)
+    functor_files = [builder_path + '/' + builder_name + '.py', f_man.get_runner_file(build, item, flavor)]
+
+    hashes = [util.hash_source_tree(target_config.get_place()), item, flavor]
+    for functor_file in functor_files:
+      if util.is_file(functor_file):
+        hashes.append(util.hash_file(functor_file))
+
+    return util.hash_string('|'.join(hashes))
+
+  def get_cache_key(self, source_hash: str, args_key: str) -> str:
+    return util.hash_string('|'.join([source_hash, args_key, self._environment]))
+
+  def lookup(self, cache_key: str = None, exe_hash: str = None, args_key: str = None) -> ms.RunResult:
+    serialized = self._dbm.select_baseline_cache(cache_key, exe_hash, args_key, self._environment)
+    if serialized is None:
+      return None
+
+    return ms.RunResult.from_json(serialized)
+
+  def store(self, target_config: TargetConfiguration, cache_key: str, source_hash: str, exe_hash: str, args_key: str,
+            run_result: ms.RunResult) -> None:
+    if exe_hash is None:
+      exe_hash = ''
+    self._dbm.insert_baseline_cache((cache_key, source_hash, exe_hash, args_key, self._environment,
+                                     target_config.get_target(), run_result.to_json(), time.time()))
+
+  def get_baseline(self, target_config: TargetConfiguration, build_fn, measure_fn) -> ms.RunResult:
+    args_key = self.get_args_key(target_config)
+    source_hash = self.get_source_hash(target_config)
+    cache_key = self.get_cache_key(source_hash, args_key)
+
+    run_result = self.lookup(cache_key=cache_key)
+    if run_result is not None:
+      log.get_logger().log(
+          'BaselineCache::get_baseline: Reusing baseline of unchanged ' + target_config.get_target() +
+          '. Skipping vanilla build and baseline run.',
+          level='info')
+      log.get_logger().log('[BASELINECACHE] hit sources', level='perf')
+      pe.emit('baseline_cache', target_config, iteration=-1, attributes={'result': 'hit sources'})
+      return run_result
+
+    # Coarse file system time stamps may lag behind the wall clock.
+    build_start = time.time() - 2
+    build_fn()
+    exe_hash = util.hash_executables(target_config.get_place(), build_start)
+
+    if exe_hash is not None:
+      run_result = self.lookup(exe_hash=exe_hash, args_key=args_key)
+
+    if run_result is not None:
+      log.get_logger().log(
+          'BaselineCache::get_baseline: Reusing baseline of identical executable. Skipping baseline run.', level='info')
+      log.get_logger().log('[BASELINECACHE] hit executable', level='perf')
+      pe.emit('baseline_cache', target_config, iteration=-1, attributes={'result': 'hit executable'})
+    else:
+      log.get_logger().log('[BASELINECACHE] miss', level='perf')
+      pe.emit('baseline_cache', target_config, iteration=-1, attributes={'result': 'miss'})
+      run_result = measure_fn()
+
+    self.store(target_config, cache_key, source_hash, exe_hash, args_key, run_result)
+    return run_result
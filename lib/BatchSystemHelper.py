@@ -5,9 +5,22 @@ Description: Needs attention
 """
 import lib.Utility as util
 import lib.Logging as log
+from lib.Exception import PiraException
+
+import asyncio
+import os
+import threading
+import time
+import typing
 
 queued_job_filename = './queued_job.tmp'
 
+# The event loop the job arrays are polled on, see set_poll_loop
+_poll_loop = None
+# Polls the job arrays while no poll loop is set, see _get_poll_loop
+_background_loop = None
+_background_lock = threading.Lock()
+
 
 class BatchSystemJob:
   """
@@ -107,3 +120,201 @@ def get_runtime_of_submitted_job(job_id):
 
 def remove_queued_job_tmp_file():
   util.remove(queued_job_filename)
+
+
+class BatchSystemException(PiraException):
+
+  def __init__(self, message):
+    super().__init__(message)
+
+
+class SlurmJobArray:
+  """
+  A Slurm job array of num_tasks tasks, which run script_file with SLURM_ARRAY_TASK_ID set to 0, ..., num_tasks-1.
+  After submission, the state of the array is polled with squeue. The polling interval starts at poll_interval and is
+  doubled after every poll, up to max_poll_interval, to not flood the Slurm controller for long running jobs.
+  wait_async polls without blocking the event loop. wait blocks the calling thread only, the polling is done on the
+  poll loop, see set_poll_loop.
+  """
+
+  def __init__(self,
+               script_file: str,
+               num_tasks: int,
+               sbatch_options: str = '',
+               poll_interval: float = 1.0,
+               max_poll_interval: float = 60.0) -> None:
+    self._script_file = script_file
+    self._num_tasks = num_tasks
+    self._sbatch_options = sbatch_options
+    self._poll_interval = poll_interval
+    self._max_poll_interval = max_poll_interval
+    self._job_id = None
+
+  def get_job_id(self) -> str:
+    return self._job_id
+
+  def get_num_tasks(self) -> int:
+    return self._num_tasks
+
+  def submit(self) -> str:
+    command = 'sbatch --parsable --array=0-' + str(self._num_tasks - 1)
+    if self._sbatch_options:
+      command += ' ' + self._sbatch_options
+    command += ' ' + self._script_file
+
+    out, _ = util.shell(command)
+    # --parsable prints <job id> or <job id>;<cluster>
+    job_id = out.strip().split(';')[0]
+    if not job_id.isdigit():
+      raise BatchSystemException('SlurmJobArray::submit: Unexpected sbatch output: ' + out)
+
+    self._job_id = job_id
+    log.get_logger().log('SlurmJobArray::submit: Submitted job array ' + job_id + ' with ' + str(self._num_tasks) +
+                         ' tasks')
+    return job_id
+
+  def is_done(self) -> bool:
+    """ Non-blocking: True once no task of the array is pending or running anymore. """
+    if self._job_id is None:
+      raise BatchSystemException('SlurmJobArray::is_done: Job array was not submitted')
+
+    out, _ = util.shell('squeue -h -j ' + self._job_id + ' -o %i')
+    return out.strip() == ''
+
+  def get_task_states(self) -> typing.Dict[int, str]:
+    """ The final state of every task, as far as the accounting knows it. """
+    out, _ = util.shell('sacct -n -P -X -j ' + self._job_id + ' -o JobID,State')
+    states = {}
+    for line in out.splitlines():
+      fields = line.strip().split('|')
+      if len(fields) < 2 or '_' not in fields[0]:
+        continue
+      task_id = fields[0].split('_')[1]
+      if task_id.isdigit():
+        # States like 'CANCELLED by 42' carry a reason
+        states[int(task_id)] = fields[1].split(' ')[0]
+
+    return states
+
+  def get_task_usages(self) -> typing.Dict[int, typing.Tuple[float, float, int]]:
+    """
+    User time, system time and maximum resident set size in KB of every task, as far as the accounting knows them.
+    The times of the task are summed up by Slurm, the resident set size is the maximum of its steps.
+    """
+    out, _ = util.shell('sacct -n -P -j ' + self._job_id + ' -o JobID,UserCPU,SystemCPU,MaxRSS')
+    usages = {}
+    for line in out.splitlines():
+      fields = line.strip().split('|')
+      if len(fields) < 4 or '_' not in fields[0]:
+        continue
+      task_id, _, step = fields[0].split('_')[1].partition('.')
+      if not task_id.isdigit():
+        continue
+      user_time, sys_time, max_rss = usages.get(int(task_id), (.0, .0, 0))
+      if step == '':
+        user_time = parse_slurm_time(fields[1])
+        sys_time = parse_slurm_time(fields[2])
+      max_rss = max(max_rss, parse_slurm_memory(fields[3]))
+      usages[int(task_id)] = (user_time, sys_time, max_rss)
+
+    return usages
+
+  def _next_poll(self, start: float, timeout: typing.Optional[float], interval: float) -> float:
+    """ Returns the interval after the one that is waited now """
+    if timeout is not None and time.time() - start > timeout:
+      raise BatchSystemException('SlurmJobArray::wait: Job array ' + self._job_id + ' did not finish within ' +
+                                 str(timeout) + ' seconds')
+    log.get_logger().log(
+        'SlurmJobArray::wait: Job array ' + self._job_id + ' still queued. Polling again in ' + str(interval) + 's',
+        level='debug')
+    return min(interval * 2, self._max_poll_interval)
+
+  def wait(self, timeout: float = None) -> typing.Dict[int, str]:
+    """
+    Waits until all tasks finished and returns their states. The polling is done by wait_async on the poll loop,
+    while the calling thread waits for the result.
+    """
+    loop = _get_poll_loop()
+    if _get_running_loop() is loop:
+      raise BatchSystemException('SlurmJobArray::wait: Blocking wait inside the poll loop, use wait_async')
+    return asyncio.run_coroutine_threadsafe(self.wait_async(timeout), loop).result()
+
+  async def wait_async(self, timeout: float = None) -> typing.Dict[int, str]:
+    """ As wait, but awaits the polling interval, and runs squeue and sacct in a worker thread. """
+    interval = self._poll_interval
+    start = time.time()
+    while not await asyncio.to_thread(self.is_done):
+      next_interval = self._next_poll(start, timeout, interval)
+      await asyncio.sleep(interval)
+      interval = next_interval
+
+    return await asyncio.to_thread(self.get_task_states)
+
+
+def _get_running_loop() -> typing.Optional[asyncio.AbstractEventLoop]:
+  try:
+    return asyncio.get_running_loop()
+  except RuntimeError:
+    return None
+
+
+def _get_poll_loop() -> asyncio.AbstractEventLoop:
+  """ The poll loop if it is set and running, else a loop in a daemon thread, which is started on first use """
+  global _background_loop
+  loop = _poll_loop
+  if loop is not None and loop.is_running():
+    return loop
+
+  with _background_lock:
+    if _background_loop is None:
+      _background_loop = asyncio.new_event_loop()
+      threading.Thread(target=_background_loop.run_forever, name='pira-slurm-poll', daemon=True).start()
+    return _background_loop
+
+
+def _reset_poll_loops() -> None:
+  """ The threads running the loops are not inherited by a forked child """
+  global _poll_loop, _background_loop, _background_lock
+  _poll_loop = None
+  _background_loop = None
+  _background_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_poll_loops)
+
+
+def set_poll_loop(loop: typing.Optional[asyncio.AbstractEventLoop]) -> None:
+  """
+  While loop runs, the job arrays waited for in other threads are polled on it, s.t. the waiting threads hold no
+  poll timers of their own. None polls on a loop in a daemon thread.
+  """
+  global _poll_loop
+  _poll_loop = loop
+
+
+def parse_slurm_time(value: str) -> float:
+  """ Seconds of a Slurm duration, [DD-[HH:]]MM:SS[.mmm]. Empty values, i.e., unknown durations, are 0. """
+  value = value.strip()
+  if value == '':
+    return .0
+
+  days = 0
+  if '-' in value:
+    day_str, value = value.split('-', 1)
+    days = int(day_str)
+  seconds = .0
+  for part in value.split(':'):
+    seconds = seconds * 60 + float(part)
+  return days * 86400 + seconds
+
+
+def parse_slurm_memory(value: str) -> int:
+  """ KB of a Slurm memory size, e.g., 2048K or 1.5G. Values without unit are in KB, empty values are 0. """
+  value = value.strip()
+  if value == '':
+    return 0
+
+  factors = {'K': 1, 'M': 1024, 'G': 1024**2, 'T': 1024**3}
+  if value[-1].upper() in factors:
+    return int(float(value[:-1]) * factors[value[-1].upper()])
+  return int(float(value))
@@ -10,8 +10,11 @@ import lib.FunctorManagement as fm
 from lib.Configuration import TargetConfiguration
 from lib.Measurement import ScorepSystemHelper
 import lib.DefaultFlags as defaults
+from lib.SelectiveBuild import TranslationUnitInvalidator
+from lib.ProcessEngine import ExecutionContext
 from lib.Exception import PiraException
 
+import time
 import typing
 
 
@@ -26,20 +29,27 @@ class Builder:
   Class which builds the benchmark executable, given a TargetConfiguration
   """
 
-  def __init__(self, target_config: TargetConfiguration, instrument: bool, instr_file: str = None) -> None:
+  def __init__(self,
+               target_config: TargetConfiguration,
+               instrument: bool,
+               instr_file: str = None,
+               artifact_store=None,
+               call_graph_file: str = None) -> None:
     self.target_config = target_config
     self.directory = target_config.get_place()
-    self.old_cwd = ''
+    # All commands run in the target directory, PIRA itself does not change its working directory.
+    self._context = ExecutionContext(self.directory)
     self.build_instr = instrument
     self.instrumentation_file = instr_file
     self._compile_time_filtering = target_config.is_compile_time_filtering()
+    self._artifact_store = artifact_store
+    self._call_graph_file = call_graph_file
     self.error = None
 
   def build(self) -> None:
     try:
       self.set_up()
       self.build_detail()
-      self.tear_down()
 
     except BuilderException as e:
       log.get_logger().log('Builder::build: Caught exception ' + str(e), level='warn')
@@ -49,15 +59,9 @@ class Builder:
   def set_up(self) -> None:
     log.get_logger().log('Builder::set_up for ' + self.directory)
     directory_good = util.check_provided_directory(self.directory)
-    if directory_good:
-      self.old_cwd = util.get_cwd()
-      util.change_cwd(self.directory)
-    else:
+    if not directory_good:
       self.error = True
-      raise Exception('Builder::set_up: Could not change to directory')
-
-  def tear_down(self) -> None:
-    util.change_cwd(self.old_cwd)
+      raise Exception('Builder::set_up: Target directory ' + self.directory + ' does not exist')
 
   def build_detail(self) -> None:
     kwargs = {'compiler': 'clang++'}
@@ -99,13 +103,10 @@ class Builder:
 
   def check_build_prerequisites(self) -> None:
     return
-    ScorepSystemHelper.check_build_prerequisites()
+    ScorepSystemHelper.check_build_prerequisites(self.directory)
 
-  def build_flavors(self, kwargs) -> None:
-    log.get_logger().log(
-        'Builder::build_flavors: Building for ' + self.target_config.get_target() + ' in ' +
-        self.target_config.get_flavor(),
-        level='debug')
+  def prepare_build(self) -> typing.Tuple[typing.Any, typing.Any, typing.Dict]:
+    """ Loads the build and clean functors and prepares the (instrumented) build. Returns these and the kwargs. """
     build = self.target_config.get_build()
     benchmark = self.target_config.get_target()
     flavor = self.target_config.get_flavor()
@@ -114,29 +115,40 @@ class Builder:
     kwargs = {}
 
     if self.build_instr:
-      log.get_logger().log('Builder::build_flavors: Instrumentation', level='debug')
+      log.get_logger().log('Builder::prepare_build: Instrumentation', level='debug')
       try:
         self.check_build_prerequisites()
-        log.get_logger().log('Builder::build_flavors: Prerequisite check successfull.')
+        log.get_logger().log('Builder::prepare_build: Prerequisite check successfull.')
       except Exception as e:
         raise BuilderException('Precheck failed.\n' + str(e))
 
       if not self.target_config.is_compile_time_filtering():
-        log.get_logger().log('Builder::build_flavors: Runtime filtering enabled.')
+        log.get_logger().log('Builder::prepare_build: Runtime filtering enabled.')
         self.target_config.set_instr_file(self.instrumentation_file)
 
       build_functor = f_man.get_or_load_functor(build, benchmark, flavor, 'build')
       kwargs = self.construct_pira_instr_kwargs()
-      ScorepSystemHelper.prepare_MPI_filtering(self.instrumentation_file)
+      ScorepSystemHelper.prepare_MPI_filtering(self.instrumentation_file, self.target_config.get_wrap_dir())
 
     else:
-      log.get_logger().log('Builder::build_flavors: No instrumentation', level='debug')
+      log.get_logger().log('Builder::prepare_build: No instrumentation', level='debug')
       build_functor = f_man.get_or_load_functor(build, benchmark, flavor, 'basebuild')
       kwargs = self.construct_pira_kwargs()
 
+    return build_functor, clean_functor, kwargs
+
+  def build_flavors(self, kwargs) -> None:
+    log.get_logger().log(
+        'Builder::build_flavors: Building for ' + self.target_config.get_target() + ' in ' +
+        self.target_config.get_flavor(),
+        level='debug')
+    benchmark = self.target_config.get_target()
+    build_functor, clean_functor, kwargs = self.prepare_build()
+
     if build_functor.get_method()['active']:
-      log.get_logger().log('Builder::build_flavors: Running the passive functor.', level='debug')
-      build_functor.active(benchmark, **kwargs)
+      log.get_logger().log('Builder::build_flavors: Running the active functor.', level='debug')
+      # Active functors run inside PIRA and expect to be in the target directory.
+      util.run_active_functor(build_functor, benchmark, self._context, **kwargs)
 
     else:
       try:
@@ -144,11 +156,48 @@ class Builder:
         ''' The build command uses CC and CXX to pass flags that are needed by PIRA for the given toolchain. '''
         build_command = build_functor.passive(benchmark, **kwargs)
         clean_command = clean_functor.passive(benchmark, **kwargs)
+        selective = self.build_instr and self.target_config.is_selective_rebuild()
+
+        if selective and self._call_graph_file is not None:
+          invalidator = TranslationUnitInvalidator(self._call_graph_file)
+          stale_objects = invalidator.get_objects_to_invalidate(self.directory, build_command,
+                                                                self.instrumentation_file)
+          if stale_objects is not None:
+            log.get_logger().log('Builder::build_flavors: Selective rebuild of ' + str(stale_objects), level='info')
+            log.get_logger().log('[INVALIDATED] ' + str(len(stale_objects)), level='perf')
+            for stale_object in stale_objects:
+              util.remove_file(stale_object)
+            util.shell(build_command, context=self._context)
+            TranslationUnitInvalidator.record_build(self.directory, build_command, self.instrumentation_file)
+            return
+
+        # Instrumented builds with an instrumentation file that was built before are restored from the store.
+        # This is done before cleaning, s.t. a hit does not discard the current build for nothing.
+        build_key = None
+        if self.build_instr and self._artifact_store is not None:
+          build_key = self._artifact_store.get_build_key(self.target_config, build_command, clean_command,
+                                                         self.instrumentation_file)
+          if self._artifact_store.restore(build_key, self.directory):
+            # The object files in the directory are not the ones of the restored build.
+            TranslationUnitInvalidator.forget_build(self.directory)
+            log.get_logger().log('Builder::build_flavors: Restored build ' + build_key, level='info')
+            log.get_logger().log('[BUILDCACHE] hit', level='perf')
+            return
+          log.get_logger().log('[BUILDCACHE] miss', level='perf')
+
         log.get_logger().log(
             'Builder::build_flavors: Clean in ' + benchmark + '\n  Using ' + clean_command, level='debug')
-        util.shell(clean_command)
+        util.shell(clean_command, context=self._context)
+        TranslationUnitInvalidator.forget_build(self.directory)
+
         log.get_logger().log('Builder::build_flavors: Building: ' + build_command, level='debug')
-        util.shell(build_command)
+        # Coarse file system time stamps may lag behind the wall clock.
+        build_start = time.time() - 2
+        util.shell(build_command, context=self._context)
+        if build_key is not None:
+          self._artifact_store.save(build_key, self.directory, build_start)
+        if selective:
+          TranslationUnitInvalidator.record_build(self.directory, build_command, self.instrumentation_file)
 
       except Exception as e:
         log.get_logger().log('Builder::build_flavors: ' + str(e), level='error')
@@ -0,0 +1,77 @@
+"""
+File: Checkpoint.py
+License: Part of the PIRA project. Licensed under BSD 3 clause license. See LICENSE.txt file at https://github.com/jplehr/pira/LICENSE.txt
+Description: Module to checkpoint the progress of a PIRA campaign, s.t. it can be resumed after it was interrupted.
+"""
+
+import sys
+sys.path.append('..')
+
+import lib.Utility as util
+import lib.Logging as log
+from lib.Configuration import TargetConfiguration
+
+import json
+import time
+import typing
+
+
+class Checkpointer:
+  """
+  Records every completed phase of a target in the PIRA database: the baseline, and per iteration the analysis,
+  the build and the run(s). Together with a phase, its result is stored, e.g., the whitelist or the RunResult.
+  Without resume, the checkpoints of a target are discarded when it starts, i.e., only written.
+  The database item of a target is recorded when it starts, s.t. a resumed campaign continues in the same item.
+  """
+
+  def __init__(self, db_manager, campaign_key: str, resume: bool = False) -> None:
+    self._dbm = db_manager
+    self._campaign_key = campaign_key
+    self._resume = resume
+
+  @classmethod
+  def for_config_file(cls, db_manager, config_file: str, resume: bool = False):
+    """ A campaign is identified by its configuration file and the contents thereof. """
+    campaign_key = util.hash_string(util.get_absolute_path(config_file) + '|' + util.hash_file(config_file))
+    return cls(db_manager, campaign_key, resume)
+
+  def is_resume(self) -> bool:
+    return self._resume
+
+  def get_target_key(self, target_config: TargetConfiguration) -> str:
+    return util.hash_string('|'.join(
+        [self._campaign_key,
+         target_config.get_build(),
+         target_config.get_target(),
+         target_config.get_flavor()]))
+
+  def begin_target(self, target_config: TargetConfiguration) -> None:
+    if not self._resume:
+      self._dbm.delete_checkpoints(self.get_target_key(target_config))
+    self.save(target_config, 'item', -1, {'db_item_id': target_config.get_db_item_id()})
+
+  def load_db_item_id(self, target_config: TargetConfiguration) -> typing.Optional[str]:
+    """ The database item of target_config in the resumed campaign, None if it was not started """
+    payload = self.load(target_config, 'item', -1)
+    if payload is None:
+      return None
+    return payload['db_item_id']
+
+  def save(self, target_config: TargetConfiguration, phase: str, iteration: int, payload: dict) -> None:
+    self._dbm.insert_checkpoint((self.get_target_key(target_config), phase, iteration, json.dumps(payload),
+                                 time.time()))
+
+  def load(self, target_config: TargetConfiguration, phase: str, iteration: int) -> typing.Optional[dict]:
+    """ Returns the payload of a completed phase, if the campaign is resumed. """
+    if not self._resume:
+      return None
+
+    payload = self._dbm.select_checkpoint(self.get_target_key(target_config), phase, iteration)
+    if payload is None:
+      return None
+
+    log.get_logger().log(
+        'Checkpointer::load: Resuming ' + target_config.get_target() + ': ' + phase + ' of iteration ' +
+        str(iteration) + ' is done',
+        level='info')
+    return json.loads(payload)
@@ -359,13 +359,21 @@ class TargetConfiguration:
   """  The TargetConfiguration encapsulates the relevant information for a specific target, i.e., its place and a given flavor. 
   Using TargetConfiguration all steps of building and executing are possible.  """
 
-  def __init__(self, place: str, build: str, target: str, flavor: str, db_item_id: str, compile_time_filter: bool = True):
+  def __init__(self,
+               place: str,
+               build: str,
+               target: str,
+               flavor: str,
+               db_item_id: str,
+               compile_time_filter: bool = True,
+               selective_rebuild: bool = False):
     """  Initializes the TargetConfiguration with its necessary parameters.
 
     :place: str: TODO
     :target: str: TODO
     :flavor: str: TODO
     :db_item_id: str: The unique ID for this target
+    :selective_rebuild: bool: Only recompile the translation units affected by a whitelist change
 
     """
     self._place: str = place
@@ -374,8 +382,10 @@ class TargetConfiguration:
     self._flavor: str = flavor
     self._db_item_id: str = db_item_id
     self._compile_time_filtering = compile_time_filter
+    self._selective_rebuild = selective_rebuild
     self._instr_file = ''
     self._args_for_invocation = None
+    self._wrap_dir = None
 
   def get_place(self) -> str:
     """Return the place stored in this TargetConfiguration
@@ -418,6 +428,10 @@ class TargetConfiguration:
     """
     return self._db_item_id
 
+  def set_db_item_id(self, db_item_id: str) -> None:
+    """ E.g., the item of the interrupted campaign, which is resumed """
+    self._db_item_id = db_item_id
+
   def has_args_for_invocation(self) -> bool:
     return self._args_for_invocation is not None
 
@@ -434,6 +448,10 @@ class TargetConfiguration:
     """ Returns whether this PIRA instance uses compile-time filtering"""
     return self._compile_time_filtering
 
+  def is_selective_rebuild(self) -> bool:
+    """ Returns whether instrumented builds only recompile the translation units affected by a whitelist change """
+    return self._selective_rebuild
+
   def set_instr_file(self, instr_file: str) -> None:
     self._instr_file = instr_file
 
@@ -444,6 +462,13 @@ class TargetConfiguration:
     """
     return self._instr_file
 
+  def set_wrap_dir(self, wrap_dir: str) -> None:
+    self._wrap_dir = wrap_dir
+
+  def get_wrap_dir(self) -> typing.Optional[str]:
+    """ The directory of the MPI filter wrapper of this target, None for the one of the BackendDefaults """
+    return self._wrap_dir
+
 
 class InstrumentConfig:
   """  Holds information how instrumentation is handled in the different run phases.  """
@@ -461,10 +486,12 @@ class InstrumentConfig:
 
 class ExtrapConfiguration:
 
-  def __init__(self, dir: str, prefix: str, postfix: str):
+  def __init__(self, dir: str, prefix: str, postfix: str, summarize: bool = False, link: bool = True):
     self._dir = dir
     self._prefix = prefix
     self._postfix = postfix
+    self._summarize = summarize
+    self._link = link
 
   def get_dir(self) -> str:
     return self._dir
@@ -472,14 +499,56 @@ class ExtrapConfiguration:
   def get_prefix(self) -> str:
     return self._prefix
 
+  def is_summarize(self) -> bool:
+    """ Whether the repetitions are merged into one summary in addition to the profiles """
+    return self._summarize
+
+  def is_link(self) -> bool:
+    """ Whether profiles are hard linked instead of copied """
+    return self._link
+
 
 class InvocationConfiguration:
 
-  def __init__(self, path_to_config: str, compile_time_filter: bool, pira_iters: int, num_reps: int):
+  def __init__(self,
+               path_to_config: str,
+               compile_time_filter: bool,
+               pira_iters: int,
+               num_reps: int,
+               num_jobs: int = 1,
+               concurrent_reps: bool = False,
+               cpus_per_rep: int = 0,
+               target_rel_ci: float = .0,
+               max_reps: int = 0,
+               baseline_cache: bool = False,
+               artifact_dir: str = None,
+               selective_rebuild: bool = False,
+               convergence=None,
+               resume: bool = False,
+               sbatch_options: str = None,
+               compile_slots: int = 0,
+               measure_slots: int = 1,
+               async_orchestration: bool = False,
+               artifact_max_size: int = 0):
     self._path_to_cfg = path_to_config
     self._compile_time_filtering = compile_time_filter
     self._pira_iters = pira_iters
     self._num_repetitions = num_reps
+    self._num_jobs = num_jobs
+    self._concurrent_reps = concurrent_reps
+    self._cpus_per_rep = cpus_per_rep
+    self._target_rel_ci = target_rel_ci
+    self._max_repetitions = max_reps
+    self._baseline_cache = baseline_cache
+    self._artifact_dir = artifact_dir
+    self._selective_rebuild = selective_rebuild
+    self._convergence = convergence
+    self._resume = resume
+    self._sbatch_options = sbatch_options
+    self._compile_slots = compile_slots
+    self._measure_slots = measure_slots
+    self._async_orchestration = async_orchestration
+    self._artifact_max_size = artifact_max_size
 
   def get_path_to_cfg(self) -> str:
     return self._path_to_cfg
@@ -492,3 +561,62 @@ class InvocationConfiguration:
 
   def get_num_repetitions(self) -> int:
     return self._num_repetitions
+
+  def get_num_jobs(self) -> int:
+    return self._num_jobs
+
+  def is_concurrent_repetitions(self) -> bool:
+    return self._concurrent_reps
+
+  def get_cpus_per_repetition(self) -> int:
+    return self._cpus_per_rep
+
+  def is_adaptive_repetitions(self) -> bool:
+    return self._target_rel_ci > 0
+
+  def get_target_relative_ci(self) -> float:
+    return self._target_rel_ci
+
+  def get_max_repetitions(self) -> int:
+    return self._max_repetitions
+
+  def is_baseline_cache(self) -> bool:
+    return self._baseline_cache
+
+  def get_artifact_dir(self) -> str:
+    """ The directory of the artifact store for instrumented builds, None if builds are not cached """
+    return self._artifact_dir
+
+  def get_artifact_max_size(self) -> int:
+    """ Bytes the artifact store may use, 0 for no limit """
+    return self._artifact_max_size
+
+  def is_selective_rebuild(self) -> bool:
+    return self._selective_rebuild
+
+  def get_convergence_criteria(self):
+    """ When to stop refining the instrumentation before pira_iters iterations are done, None to never stop """
+    return self._convergence
+
+  def is_resume(self) -> bool:
+    """ Whether phases that completed in an earlier, interrupted invocation are skipped """
+    return self._resume
+
+  def is_slurm(self) -> bool:
+    """ Whether the measurements are submitted as Slurm job arrays """
+    return self._sbatch_options is not None
+
+  def get_sbatch_options(self) -> str:
+    return self._sbatch_options
+
+  def get_compile_slots(self) -> int:
+    """ How many of the concurrently processed targets may build at the same time, 0 for all """
+    return self._compile_slots
+
+  def get_measure_slots(self) -> int:
+    """ How many of the concurrently processed targets may run measurements at the same time, 0 for all """
+    return self._measure_slots
+
+  def is_async_orchestration(self) -> bool:
+    """ Whether all targets are processed as coroutines of one event loop, instead of worker processes """
+    return self._async_orchestration
@@ -0,0 +1,66 @@
+"""
+File: Convergence.py
+License: Part of the PIRA project. Licensed under BSD 3 clause license. See LICENSE.txt file at https://github.com/jplehr/pira/LICENSE.txt
+Description: Module to decide when further PIRA iterations do not refine the instrumentation anymore.
+"""
+
+import sys
+sys.path.append('..')
+
+import typing
+
+
+class ConvergenceCriteria:
+  """
+  Criteria to end the iterative refinement of a target early. All criteria are optional:
+  - fixpoint: the analysis returned the same whitelist as in the previous iteration
+  - overhead: the (upper bound of the) instrumentation overhead is below a threshold
+  - change: less than a given percentage of the whitelisted functions changed w.r.t. the previous iteration
+  The whitelist criteria are checked right after the analysis, i.e., the build and run of that iteration are
+  skipped. The overhead criterion is checked after the run.
+  """
+
+  def __init__(self, stop_on_fixpoint: bool = False, overhead_threshold: float = .0, min_change_percent: float = .0):
+    self._stop_on_fixpoint = stop_on_fixpoint
+    self._overhead_threshold = overhead_threshold
+    self._min_change_percent = min_change_percent
+
+  def is_enabled(self) -> bool:
+    return self._stop_on_fixpoint or self._overhead_threshold > 0 or self._min_change_percent > 0
+
+  @staticmethod
+  def get_change_percent(previous: typing.Set[str], current: typing.Set[str]) -> float:
+    """ Changed functions relative to all functions whitelisted in either iteration """
+    union = previous.union(current)
+    if len(union) == 0:
+      return .0
+    return 100.0 * len(previous.symmetric_difference(current)) / len(union)
+
+  def check_whitelist(self, previous: typing.Set[str], current: typing.Set[str]) -> typing.Optional[str]:
+    """ Returns why the refinement converged, or None. previous is None in the first iteration. """
+    if previous is None:
+      return None
+
+    if self._stop_on_fixpoint and previous == current:
+      return 'fixpoint: whitelist unchanged'
+
+    if self._min_change_percent > 0:
+      change = ConvergenceCriteria.get_change_percent(previous, current)
+      if change < self._min_change_percent:
+        return 'change: ' + str(round(change, 2)) + '% of the whitelist changed'
+
+    return None
+
+  def check_overhead(self, overhead) -> typing.Optional[str]:
+    """ Returns why the refinement converged, or None. Uses the upper bound of the overhead if known. """
+    if self._overhead_threshold <= 0:
+      return None
+
+    upper = float(overhead)
+    if hasattr(overhead, 'get_interval'):
+      upper = overhead.get_interval()[1]
+
+    if upper <= self._overhead_threshold:
+      return 'overhead: ' + str(round(upper, 4)) + ' <= ' + str(self._overhead_threshold)
+
+    return None
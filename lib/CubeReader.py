@@ -0,0 +1,357 @@
+"""
+File: CubeReader.py
+License: Part of the PIRA project. Licensed under BSD 3 clause license. See LICENSE.txt file at https://github.com/jplehr/pira/LICENSE.txt
+Description: Module to read Score-P .cubex profiles in-process, without the Cube tools.
+"""
+
+import sys
+sys.path.append('..')
+
+import lib.Logging as log
+from lib.Exception import PiraException
+
+from array import array
+import struct
+import tarfile
+import typing
+import xml.etree.ElementTree as ET
+
+try:
+  import numpy as np
+except ImportError:
+  np = None
+
+
+class CubeReaderException(PiraException):
+
+  def __init__(self, message):
+    super().__init__(message)
+
+
+class CubeMetric:
+  """  A metric of the profile as defined in its anchor.xml  """
+
+  # Cube data type -> array type code and how the values of the locations are combined
+  dtypes = {
+      'DOUBLE': ('d', 'sum'),
+      'UINT64': ('Q', 'sum'),
+      'INT64': ('q', 'sum'),
+      'MINDOUBLE': ('d', 'min'),
+      'MAXDOUBLE': ('d', 'max')
+  }
+
+  def __init__(self, metric_id: int, uniq_name: str, disp_name: str, dtype: str, uom: str, kind: str) -> None:
+    self._id = metric_id
+    self._uniq_name = uniq_name
+    self._disp_name = disp_name
+    self._dtype = dtype
+    self._uom = uom
+    self._kind = kind
+
+  def get_id(self) -> int:
+    return self._id
+
+  def get_uniq_name(self) -> str:
+    return self._uniq_name
+
+  def get_disp_name(self) -> str:
+    return self._disp_name
+
+  def get_dtype(self) -> str:
+    return self._dtype
+
+  def get_uom(self) -> str:
+    return self._uom
+
+  def get_kind(self) -> str:
+    """ How the values are stored: EXCLUSIVE or INCLUSIVE. Derived metrics have no stored values. """
+    return self._kind
+
+  def is_stored(self) -> bool:
+    return self._kind in ('EXCLUSIVE', 'INCLUSIVE')
+
+  def is_supported(self) -> bool:
+    return self.is_stored() and self._dtype in CubeMetric.dtypes
+
+  def get_value_type(self) -> str:
+    """ The array type code of the aggregated values """
+    return 'd' if CubeMetric.dtypes[self._dtype][0] == 'd' else 'q'
+
+  def get_aggregation(self) -> str:
+    """ How the values of locations or call paths are combined: sum, min or max """
+    return CubeMetric.dtypes[self._dtype][1]
+
+  def is_additive(self) -> bool:
+    return self.is_supported() and self.get_aggregation() == 'sum'
+
+
+class CubeProfile:
+  """
+  The call tree of a profile and, for every loaded metric, one value per call path, aggregated over all locations
+  (threads and processes). Call paths are identified by their cnode id, which indexes all arrays.
+  """
+
+  def __init__(self, regions: typing.Dict[int, str], callees: array, parents: array, preorder: typing.List[int],
+               metrics: typing.Dict[str, CubeMetric], values: typing.Dict[str, array], num_locations: int) -> None:
+    self._regions = regions
+    self._callees = callees
+    self._parents = parents
+    self._preorder = preorder
+    self._metrics = metrics
+    self._values = values
+    self._num_locations = num_locations
+    self._inclusive = {}
+    self._exclusive = {}
+
+  def get_metrics(self) -> typing.Dict[str, CubeMetric]:
+    """ The loaded metrics by their unique name """
+    return self._metrics
+
+  def get_num_callpaths(self) -> int:
+    return len(self._callees)
+
+  def get_num_locations(self) -> int:
+    return self._num_locations
+
+  def get_parents(self) -> array:
+    """ The cnode id of the parent of every call path, -1 for roots """
+    return self._parents
+
+  def get_region_name(self, cnode_id: int) -> str:
+    return self._regions.get(self._callees[cnode_id], '<unknown>')
+
+  def get_callpath_name(self, cnode_id: int) -> str:
+    names = []
+    while cnode_id >= 0:
+      names.append(self.get_region_name(cnode_id))
+      cnode_id = self._parents[cnode_id]
+    return '/'.join(reversed(names))
+
+  def get_callpath_names(self) -> typing.List[str]:
+    names = [''] * self.get_num_callpaths()
+    for cnode_id in self._preorder:
+      parent = self._parents[cnode_id]
+      region = self.get_region_name(cnode_id)
+      names[cnode_id] = region if parent < 0 else names[parent] + '/' + region
+    return names
+
+  def _get_metric(self, metric: str) -> CubeMetric:
+    if metric not in self._values:
+      raise CubeReaderException('CubeProfile: Metric ' + metric + ' was not loaded')
+    return self._metrics[metric]
+
+  def get_values(self, metric: str) -> array:
+    """ The values as stored, i.e., exclusive or inclusive depending on the kind of the metric """
+    self._get_metric(metric)
+    return self._values[metric]
+
+  def get_exclusive(self, metric: str) -> array:
+    cube_metric = self._get_metric(metric)
+    if cube_metric.get_kind() == 'EXCLUSIVE':
+      return self._values[metric]
+    if not cube_metric.is_additive():
+      raise CubeReaderException('CubeProfile: Metric ' + metric + ' cannot be made exclusive over the call tree')
+
+    if metric not in self._exclusive:
+      # Subtract the inclusive values of the children
+      inclusive = self._values[metric]
+      exclusive = array('d', inclusive)
+      for cnode_id in self._preorder:
+        parent = self._parents[cnode_id]
+        if parent >= 0:
+          exclusive[parent] -= inclusive[cnode_id]
+      self._exclusive[metric] = exclusive
+
+    return self._exclusive[metric]
+
+  def get_inclusive(self, metric: str) -> array:
+    cube_metric = self._get_metric(metric)
+    if cube_metric.get_kind() == 'INCLUSIVE':
+      return self._values[metric]
+    if not cube_metric.is_additive():
+      raise CubeReaderException('CubeProfile: Metric ' + metric + ' cannot be summed over the call tree')
+
+    if metric not in self._inclusive:
+      # Children come after their parent in preorder, so walking it backwards sums up bottom-up.
+      inclusive = array('d', self._values[metric])
+      for cnode_id in reversed(self._preorder):
+        parent = self._parents[cnode_id]
+        if parent >= 0:
+          inclusive[parent] += inclusive[cnode_id]
+      self._inclusive[metric] = inclusive
+
+    return self._inclusive[metric]
+
+  def get_region_totals(self, metric: str) -> typing.Dict[str, float]:
+    """ The exclusive values summed per region, i.e., per function, over all its call paths """
+    totals = {}
+    exclusive = self.get_exclusive(metric)
+    for cnode_id in range(self.get_num_callpaths()):
+      region = self.get_region_name(cnode_id)
+      totals[region] = totals.get(region, .0) + exclusive[cnode_id]
+    return totals
+
+  def get_total(self, metric: str) -> float:
+    """ The value of metric summed over all call paths, e.g., the total runtime """
+    return sum(self.get_exclusive(metric))
+
+  def to_numpy(self, metric: str, inclusive: bool = False):
+    """ The values as a NumPy array. Requires NumPy. """
+    if np is None:
+      raise CubeReaderException('CubeProfile::to_numpy: NumPy is not available')
+    values = self.get_inclusive(metric) if inclusive else self.get_exclusive(metric)
+    return np.frombuffer(values, dtype=values.typecode).copy()
+
+
+class CubeReader:
+  """
+  Reads a .cubex file, i.e., a tar archive of the anchor.xml, which defines metrics, call tree and system tree, and
+  one .index and .data file per stored metric. Nothing is extracted to disk. The anchor.xml is parsed incrementally
+  and the .data members are streamed from the archive, the values of all locations of a cnode at a time.
+  """
+
+  data_header = b'CUBEX.DATA'
+  index_header = b'CUBEX.INDEX'
+  sparse_index = 1
+  # Upper bound of the bytes read from a .data member at once
+  chunk_size = 1024 * 1024
+
+  def __init__(self, cubex_file: str, metrics: typing.List[str] = None) -> None:
+    """ Only the metrics given by their unique name are loaded, all supported metrics if None. """
+    self._cubex_file = cubex_file
+    self._metric_filter = metrics
+
+  def read(self) -> CubeProfile:
+    try:
+      with tarfile.open(self._cubex_file, 'r') as cubex:
+        members = {m.name: m for m in cubex.getmembers()}
+        if 'anchor.xml' not in members:
+          raise CubeReaderException('CubeReader::read: No anchor.xml in ' + self._cubex_file)
+
+        regions, callees, parents, preorder, metrics, num_locations = self._parse_anchor(
+            cubex.extractfile(members['anchor.xml']))
+
+        values = {}
+        for name, metric in metrics.items():
+          data_name = str(metric.get_id()) + '.data'
+          index_name = str(metric.get_id()) + '.index'
+          if data_name not in members or index_name not in members:
+            # Score-P does not write metrics without any value
+            values[name] = array(metric.get_value_type(), [0] * len(callees))
+            continue
+          values[name] = self._read_values(metric,
+                                           cubex.extractfile(members[index_name]).read(),
+                                           cubex.extractfile(members[data_name]), len(callees), num_locations)
+
+    except (tarfile.TarError, ET.ParseError, struct.error) as e:
+      raise CubeReaderException('CubeReader::read: Cannot read ' + self._cubex_file + ': ' + str(e))
+
+    log.get_logger().log(
+        'CubeReader::read: ' + self._cubex_file + ': ' + str(len(callees)) + ' call paths, ' + str(num_locations) +
+        ' locations, metrics ' + str(list(values.keys())),
+        level='debug')
+    return CubeProfile(regions, callees, parents, preorder, {n: metrics[n] for n in values}, values, num_locations)
+
+  def _parse_anchor(self, anchor_file) -> typing.Tuple:
+    regions = {}
+    cnodes = []
+    stack = []
+    preorder = []
+    metrics = {}
+    num_locations = 0
+
+    for event, elem in ET.iterparse(anchor_file, events=('start', 'end')):
+      tag = elem.tag
+      if event == 'start':
+        if tag == 'cnode':
+          cnode_id = int(elem.get('id'))
+          cnodes.append((cnode_id, int(elem.get('calleeId')), stack[-1] if len(stack) > 0 else -1))
+          preorder.append(cnode_id)
+          stack.append(cnode_id)
+        continue
+
+      if tag == 'cnode':
+        stack.pop()
+        elem.clear()
+      elif tag == 'region':
+        regions[int(elem.get('id'))] = elem.findtext('name', '')
+        elem.clear()
+      elif tag == 'metric':
+        metric = CubeMetric(int(elem.get('id')), elem.findtext('uniq_name', ''), elem.findtext('disp_name', ''),
+                            elem.findtext('dtype', ''), elem.findtext('uom', ''), elem.get('type', 'EXCLUSIVE'))
+        wanted = self._metric_filter is None or metric.get_uniq_name() in self._metric_filter
+        if wanted and metric.is_supported():
+          metrics[metric.get_uniq_name()] = metric
+        elif wanted and self._metric_filter is not None:
+          raise CubeReaderException('CubeReader: Metric ' + metric.get_uniq_name() + ' of type ' +
+                                    metric.get_kind() + '/' + metric.get_dtype() + ' is not supported')
+      elif tag == 'location':
+        num_locations += 1
+        elem.clear()
+
+    if self._metric_filter is not None:
+      missing = [m for m in self._metric_filter if m not in metrics]
+      if len(missing) > 0:
+        raise CubeReaderException('CubeReader: Metrics ' + str(missing) + ' not found in ' + self._cubex_file)
+
+    num_cnodes = max([c[0] for c in cnodes]) + 1 if len(cnodes) > 0 else 0
+    callees = array('q', [-1] * num_cnodes)
+    parents = array('q', [-1] * num_cnodes)
+    for cnode_id, callee_id, parent_id in cnodes:
+      callees[cnode_id] = callee_id
+      parents[cnode_id] = parent_id
+
+    return regions, callees, parents, preorder, metrics, max(num_locations, 1)
+
+  def _read_values(self, metric: CubeMetric, index: bytes, data_file: typing.BinaryIO, num_cnodes: int,
+                   num_locations: int) -> array:
+    """ Aggregates the values of every cnode over all locations, reading data_file in chunks of whole cnodes. """
+    if not index.startswith(CubeReader.index_header):
+      raise CubeReaderException('CubeReader: Unknown index format of metric ' + metric.get_uniq_name())
+    if data_file.read(len(CubeReader.data_header)) != CubeReader.data_header:
+      raise CubeReaderException('CubeReader: Unknown data format of metric ' + metric.get_uniq_name() +
+                                ', e.g., compressed')
+
+    # The writer stores 1 as uint32 in its byte order.
+    pos = len(CubeReader.index_header)
+    byte_order = '<' if struct.unpack_from('<I', index, pos)[0] == 1 else '>'
+    pos += 4
+    _, index_type = struct.unpack_from(byte_order + 'HB', index, pos)
+    pos += 3
+
+    if index_type == CubeReader.sparse_index:
+      count = struct.unpack_from(byte_order + 'I', index, pos)[0]
+      cnode_ids = array('I', index[pos + 4:pos + 4 + 4 * count])
+      if (byte_order == '<') != (sys.byteorder == 'little'):
+        cnode_ids.byteswap()
+    else:
+      cnode_ids = range(num_cnodes)
+
+    type_code, aggregation = CubeMetric.dtypes[metric.get_dtype()]
+    combine = {'sum': sum, 'min': min, 'max': max}[aggregation]
+    swap = (byte_order == '<') != (sys.byteorder == 'little')
+    item_size = array(type_code).itemsize
+    row_size = item_size * num_locations
+    rows_per_chunk = max(1, CubeReader.chunk_size // row_size)
+    num_values = len(cnode_ids) * num_locations
+
+    values = array(metric.get_value_type(), [0] * num_cnodes)
+    for first_row in range(0, len(cnode_ids), rows_per_chunk):
+      num_rows = min(rows_per_chunk, len(cnode_ids) - first_row)
+      chunk = data_file.read(num_rows * row_size)
+      if len(chunk) != num_rows * row_size:
+        raise CubeReaderException('CubeReader: Expected ' + str(num_values) + ' values of metric ' +
+                                  metric.get_uniq_name() + ', found ' +
+                                  str(first_row * num_locations + len(chunk) // item_size))
+      raw = array(type_code)
+      raw.frombytes(chunk)
+      if swap:
+        raw.byteswap()
+      for row in range(num_rows):
+        values[cnode_ids[first_row + row]] = combine(raw[row * num_locations:(row + 1) * num_locations])
+
+    if len(data_file.read(1)) > 0:
+      raise CubeReaderException('CubeReader: Expected ' + str(num_values) + ' values of metric ' +
+                                metric.get_uniq_name() + ', found more')
+
+    return values
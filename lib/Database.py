@@ -12,7 +12,11 @@ import lib.Utility as u
 import lib.tables as pirasql
 from lib.Exception import PiraException
 
+import json
 import sqlite3 as db
+import threading
+import time
+import typing
 
 
 class DBException(PiraException):
@@ -30,17 +34,89 @@ class DBManager:
     """
     Inner class to implement singleton pattern.
 
-    Takes care of the actual database connection.
+    Takes care of the actual database connection. The schema is created once per connection, which runs in WAL mode,
+    s.t. the worker processes of a parallel campaign do not block each other's reads.
+    Inserts are buffered and written in one transaction by flush, which happens when flush_threshold rows are
+    pending, before every query, and at the end of a phase. Checkpoints are written immediately.
     """
 
+    sql_insert_application = ''' INSERT INTO Application(AppID,App_Name,Global_Flavor,Global_Submitter)
+                VALUES(?,?,?,?) '''
+    sql_insert_builds = ''' INSERT INTO Builds(BuildID,Build_Name,Prefix,Flavors,AppName)
+                VALUES(?,?,?,?,?) '''
+    sql_insert_items = ''' INSERT INTO Items(ItemID,Item_Name,Inst_Analysis_Functor_Path,Builders_Funtor_Path,Run_Args,Runner_Functor_Path,Submitter_Functor_Path,Exp_Data_Dir_Base_Path,BuildName)
+                VALUES(?,?,?,?,?,?,?,?,?) '''
+    sql_insert_experiment = ''' INSERT INTO Experiment(Experiment_ID,BenchmarkName,Iteration_No,IsWithInstrumentation,Position,Args,Repetition,WallTime,UserTime,SysTime,MaxRSS,IsOutlier,CubeFilePath,Created,Item_ID)
+                VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?,?,?) '''
+    sql_insert_baseline_cache = ''' INSERT OR REPLACE INTO BaselineCache(CacheKey,SourceHash,ExeHash,Args,Host,Item_Name,RunResult,Created)
+                VALUES(?,?,?,?,?,?,?,?) '''
+    sql_insert_checkpoint = ''' INSERT OR REPLACE INTO Checkpoint(TargetKey,Phase,Iteration,Payload,Created)
+                VALUES(?,?,?,?,?) '''
+
+    sql_insert_analysis = ''' INSERT INTO Analysis(Item_ID,BenchmarkName,Iteration_No,NumFunctions,Created)
+                VALUES(?,?,?,?,?) '''
+
+    sql_insert_perf_event = ''' INSERT INTO PerfEvent(Kind,Target,Item_ID,Iteration_No,Phase,Duration,Value,Attributes,Created)
+                VALUES(?,?,?,?,?,?,?,?,?) '''
+
+    flush_threshold = 1000
+    # Seconds to wait for the write lock held by another process
+    busy_timeout = 30.0
+
     def __init__(self, name):
+      self.name = name
       self.conn = None
       self.cursor = None
+      # Pending rows per statement, in the order the statements were first used
+      self._pending = {}
+      self._num_pending = 0
+      # The targets of the AsyncOrchestrator share the connection from their threads
+      self._lock = threading.RLock()
+      self.connect()
+
+    def connect(self):
       try:
-        self.conn = db.connect(name)
+        # The sqlite3 module caches the prepared statements of a connection.
+        self.conn = db.connect(self.name,
+                               timeout=DBManager.DBImpl.busy_timeout,
+                               cached_statements=256,
+                               check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        with self.conn:
+          self.migrate()
+          for table in pirasql.all_tables:
+            self.conn.execute(table)
+          self.conn.execute('PRAGMA user_version=' + str(pirasql.schema_version))
       except Exception:
         raise DBException('Error in creating the database / connection')
 
+    def get_schema_version(self) -> int:
+      return self.conn.execute('PRAGMA user_version').fetchone()[0]
+
+    def migrate(self):
+      """ Moves the tables of an older schema aside, s.t. they are recreated in the current layout """
+      version = self.get_schema_version()
+      for new_version, tables in sorted(pirasql.migrated_tables.items()):
+        if version >= new_version:
+          continue
+        for table in tables:
+          exists = self.conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type='table' AND name=?",
+                                     (table,)).fetchone()[0]
+          if exists:
+            self.conn.execute('ALTER TABLE ' + table + ' RENAME TO ' + table + '_v' + str(version))
+
+    def reconnect(self):
+      """ Opens a fresh connection, e.g., in a forked process, which must not share the parent's connection. """
+      # The pending rows belong to the parent, which flushes them itself.
+      self._pending = {}
+      self._num_pending = 0
+      # The lock may have been held by another thread of the parent while forking
+      self._lock = threading.RLock()
+      self.connect()
+      if self.cursor is not None:
+        self.create_cursor()
+
     def create_cursor(self):
       try:
         self.cursor = self.conn.cursor()
@@ -54,36 +130,88 @@ class DBManager:
       except Exception:
         raise DBException('Problem creating tables')
 
-    def insert_data_application(self, values):
-      self.create_table(pirasql.create_application_table)
-      sql = ''' INSERT INTO Application(AppID,App_Name,Global_Flavor,Global_Submitter)
-                VALUES(?,?,?,?) '''
+    def buffer(self, sql, values):
+      with self._lock:
+        self._pending.setdefault(sql, []).append(values)
+        self._num_pending += 1
+        if self._num_pending >= DBManager.DBImpl.flush_threshold:
+          self.flush()
 
-      self.cursor.execute(sql, values)
-      self.conn.commit()
+    def get_num_pending(self) -> int:
+      return self._num_pending
 
-    def insert_data_builds(self, values):
-      self.create_table(pirasql.create_builds_table)
-      sql = ''' INSERT INTO Builds(BuildID,Build_Name,Prefix,Flavors,AppName)
-                VALUES(?,?,?,?,?) '''
+    def flush(self):
+      """ Writes all pending rows in a single transaction """
+      with self._lock:
+        if self._num_pending == 0:
+          return
 
-      self.cursor.execute(sql, values)
-      self.conn.commit()
+        pending = self._pending
+        self._pending = {}
+        self._num_pending = 0
+        try:
+          with self.conn:
+            for sql, rows in pending.items():
+              self.conn.executemany(sql, rows)
+        except db.Error as e:
+          num_rows = sum([len(rows) for rows in pending.values()])
+          raise DBException('Error in writing ' + str(num_rows) + ' rows: ' + str(e))
 
-    def insert_data_items(self, values):
-      self.create_table(pirasql.create_items_table)
-      sql = ''' INSERT INTO Items(ItemID,Item_Name,Inst_Analysis_Functor_Path,Builders_Funtor_Path,Run_Args,Runner_Functor_Path,Submitter_Functor_Path,Exp_Data_Dir_Base_Path,BuildName)
-                VALUES(?,?,?,?,?,?,?,?,?) '''
+    def close(self):
+      self.flush()
+      self.conn.close()
 
-      self.cursor.execute(sql, values)
-      self.conn.commit()
+    def insert_data_application(self, values):
+      self.buffer(DBManager.DBImpl.sql_insert_application, values)
+
+    def insert_data_builds(self, values):
+      self.buffer(DBManager.DBImpl.sql_insert_builds, values)
+
+    def insert_data_items(self, values):
+      self.buffer(DBManager.DBImpl.sql_insert_items, values)
 
     def insert_data_experiment(self, values):
-      self.create_table(pirasql.create_experiment_table)
-      sql = ''' INSERT INTO Experiment(Experiment_ID,BenchmarkName,Iteration_No,IsWithInstrumentation,CubeFilePath,Runtime,Item_ID)
-                VALUES(?,?,?,?,?,?,?) '''
-      self.cursor.execute(sql, values)
-      self.conn.commit()
+      self.buffer(DBManager.DBImpl.sql_insert_experiment, values)
+
+    def insert_baseline_cache(self, values):
+      self.buffer(DBManager.DBImpl.sql_insert_baseline_cache, values)
+
+    def select_baseline_cache(self, cache_key: str, exe_hash: str, args: str, host: str):
+      """ Returns the RunResult column of the entry with cache_key, or the most recent one that matches exe_hash. """
+      with self._lock:
+        self.flush()
+        if cache_key is not None:
+          self.cursor.execute('SELECT RunResult FROM BaselineCache WHERE CacheKey=?', (cache_key,))
+        else:
+          self.cursor.execute(
+              'SELECT RunResult FROM BaselineCache WHERE ExeHash=? AND Args=? AND Host=? '
+              'ORDER BY Created DESC LIMIT 1', (exe_hash, args, host))
+        row = self.cursor.fetchone()
+        if row is None:
+          return None
+        return row[0]
+
+    def insert_checkpoint(self, values):
+      with self._lock:
+        # A checkpoint marks the end of a phase. Together with it, everything recorded in the phase is persisted.
+        self.buffer(DBManager.DBImpl.sql_insert_checkpoint, values)
+        self.flush()
+
+    def select_checkpoint(self, target_key: str, phase: str, iteration: int):
+      with self._lock:
+        self.flush()
+        self.cursor.execute('SELECT Payload FROM Checkpoint WHERE TargetKey=? AND Phase=? AND Iteration=?',
+                            (target_key, phase, iteration))
+        row = self.cursor.fetchone()
+        if row is None:
+          return None
+        return row[0]
+
+    def delete_checkpoints(self, target_key: str):
+      with self._lock:
+        self.flush()
+        with self.conn:
+          self.conn.execute('DELETE FROM Checkpoint WHERE TargetKey=?', (target_key,))
 
     def prep_db_for_build_item_in_flavor(self, config, build, item, flavor):
       """Generates all the necessary build work to write to the db.
@@ -116,9 +244,59 @@ class DBManager:
 
       return db_item_id
 
-    def enter_run_data(self, unique_id: str, item_name: str, iteration_no: int, is_instrumented_run: bool,
-                       path_to_cube: str, runtime: float, db_item_id) -> None:
-      pass
+    def enter_analysis_data(self, db_item_id: str, item_name: str, iteration_no: int, num_functions: int) -> None:
+      self.buffer(DBManager.DBImpl.sql_insert_analysis, (db_item_id, item_name, iteration_no, num_functions,
+                                                         time.time()))
+
+    def enter_perf_event(self, event) -> None:
+      """ Records a PerfEvents.PerfEvent """
+      self.buffer(DBManager.DBImpl.sql_insert_perf_event,
+                  (event.get_kind(), event.get_target(), event.get_item_id(), event.get_iteration(), event.get_phase(),
+                   event.get_duration(), event.get_value(), json.dumps(event.get_attributes()), event.get_created()))
+
+    def enter_run_data(self,
+                       unique_id: str,
+                       item_name: str,
+                       iteration_no: int,
+                       is_instrumented_run: bool,
+                       path_to_cube: typing.Optional[str],
+                       run_result,
+                       db_item_id: str,
+                       args: typing.List[str] = None) -> None:
+      """
+      Records every repetition of every position of run_result as a row of the Experiment table.
+
+      :unique_id: identifies the measurement
+      :iteration_no: the PIRA iteration, -1 for the baseline
+      :run_result: a Measurement.RunResult
+      :args: the input configuration of every position, if known
+      """
+      created = time.time()
+      for pos in range(run_result.get_num_positions()):
+        pos_args = ''
+        if args is not None and pos < len(args):
+          pos_args = str(args[pos])
+
+        sample_set = run_result.get_sample_set(pos)
+        if sample_set.is_aggregate():
+          # Only the average of the repetitions is known, which is recorded as a single row
+          self.insert_data_experiment((unique_id, item_name, iteration_no, int(is_instrumented_run), pos, pos_args, 0,
+                                       run_result.get_average(pos), None, None, None, 0, path_to_cube, created,
+                                       db_item_id))
+          continue
+
+        kept = set(run_result.get_kept_indices(pos))
+        runtimes = sample_set.get_runtimes()
+        has_usages = sample_set.has_usages()
+        for rep in range(len(sample_set)):
+          user_time, sys_time, max_rss = None, None, None
+          if has_usages:
+            user_time = sample_set.get_user_times()[rep]
+            sys_time = sample_set.get_sys_times()[rep]
+            max_rss = sample_set.get_max_rss()[rep]
+          self.insert_data_experiment((unique_id, item_name, iteration_no, int(is_instrumented_run), pos, pos_args, rep,
+                                       runtimes[rep], user_time, sys_time, max_rss, int(rep not in kept), path_to_cube,
+                                       created, db_item_id))
 
   #### END OF INNER CLASS ###
 
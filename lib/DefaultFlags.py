@@ -20,6 +20,7 @@ class BackendDefaults:
       self._compiler_instr_wl_flag = '-finstrument-functions-whitelist-inputfile'
       self._num_compile_procs = 8
       self._pira_exe_name = 'pira.built.exe'
+      self._wrap_dir = '/tmp'
 
     def get_default_c_compiler_name(self) -> str:
       return self._c_compiler
@@ -48,17 +49,27 @@ class BackendDefaults:
       }
       return kwargs
 
-    def get_wrap_w_file(self) -> str:
-      return '/tmp/pira-mpi-filter.w'
+    def set_wrap_dir(self, directory: str) -> None:
+      self._wrap_dir = directory
 
-    def get_wrap_c_file(self) -> str:
-      return '/tmp/pira-mpi-filter.c'
+    def get_wrap_dir(self, wrap_dir: str = None) -> str:
+      """ wrap_dir, e.g., the one of a target, if given, otherwise the default one """
+      return wrap_dir if wrap_dir is not None else self._wrap_dir
 
-    def get_wrap_so_file(self) -> str:
-      return '/tmp/PIRA_MPI_Filter.so'
+    def get_wrap_w_file(self, wrap_dir: str = None) -> str:
+      return self.get_wrap_dir(wrap_dir) + '/pira-mpi-filter.w'
 
-    def get_MPI_wrap_LD_PRELOAD(self) -> str:
-      return 'LD_PRELOAD=' + self.get_wrap_so_file()
+    def get_wrap_c_file(self, wrap_dir: str = None) -> str:
+      return self.get_wrap_dir(wrap_dir) + '/pira-mpi-filter.c'
+
+    def get_wrap_so_file(self, wrap_dir: str = None) -> str:
+      return self.get_wrap_dir(wrap_dir) + '/PIRA_MPI_Filter.so'
+
+    def get_MPI_functions_file(self, wrap_dir: str = None) -> str:
+      return self.get_wrap_dir(wrap_dir) + '/mpi_funcs.dump'
+
+    def get_MPI_wrap_LD_PRELOAD(self, wrap_dir: str = None) -> str:
+      return 'LD_PRELOAD=' + self.get_wrap_so_file(wrap_dir)
 
 
   instance = None
@@ -4,6 +4,7 @@ License: Part of the PIRA project. Licensed under BSD 3 clause license. See LICE
 Description: Module to load and manage the user-supplied functors.
 """
 
+import threading
 import typing
 import lib.Utility as u
 from lib.Configuration import PiraConfiguration, PiraConfigurationErrorException
@@ -26,6 +27,8 @@ class FunctorManager:
     def __init__(self, cfg: PiraConfiguration) -> None:
       self.config = cfg
       self.functor_cache = {}
+      # Loading changes sys.path, which the threads of the AsyncOrchestrator share
+      self._load_lock = threading.Lock()
 
     def get_or_load_functor(self, build: str, item: str, flavor: str, func: str):
       '''
@@ -45,14 +48,14 @@ class FunctorManager:
       else:
         raise Exception('No such option available to load functor for. Value = ' + func)
 
-      try:
-        _ = self.functor_cache[name]
-      except KeyError:
-        self.functor_cache[name] = u.load_functor(path, name)
+      with self._load_lock:
+        try:
+          _ = self.functor_cache[name]
+        except KeyError:
+          self.functor_cache[name] = u.load_functor(path, name)
 
-      log.get_logger().log(
-          'FunctorManager::get_or_load: The retrieved ' + func + ' functor: ' + str(self.functor_cache[name]),
-          level='debug')
+      log.get_logger().log('FunctorManager::get_or_load: The retrieved %s functor: %s', func, self.functor_cache[name],
+                           level='debug')
 
       return self.functor_cache[name]
 
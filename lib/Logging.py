@@ -4,20 +4,235 @@ License: Part of the PIRA project. Licensed under BSD 3 clause license. See LICE
 Description: Module to handle output of PIRA.
 """
 
+import collections
+import os
+import queue
+import sys
+import threading
+
+
+class LazyMessage:
+  """
+  A message that is formatted only when it is needed: msg % args, or msg() if msg is callable.
+  The result is kept, so it is formatted at most once.
+  """
+
+  __slots__ = ('_msg', '_args', '_str')
+
+  def __init__(self, msg, args: tuple) -> None:
+    self._msg = msg
+    self._args = args
+    self._str = None
+
+  def __str__(self) -> str:
+    if self._str is None:
+      msg = self._msg() if callable(self._msg) else self._msg
+      if len(self._args) > 0:
+        msg = msg % self._args
+      self._str = str(msg)
+      self._msg = None
+      self._args = None
+    return self._str
+
+
+class TapeWriter:
+  """
+  Streams the tape to a file from a background thread. Records are written in batches and flushed at least every
+  flush_interval seconds, s.t. the tape survives if PIRA is killed. Once the file exceeds max_bytes, it is rotated
+  to <file>.1, ..., <file>.<backups>; the oldest one is removed.
+  The file is only used while holding the lock, which is held across fork, see Logger, s.t. a forked process never
+  inherits a half written buffer or a locked file object.
+  """
+
+  def __init__(self, out_file: str, max_bytes: int = 64 * 1024 * 1024, backups: int = 3, flush_interval: float = 1.0):
+    # PIRA changes its working directory, the file is rotated later on
+    self._out_file = os.path.abspath(out_file)
+    self._max_bytes = max_bytes
+    self._backups = backups
+    self._flush_interval = flush_interval
+    self._queue = queue.Queue()
+    self._lock = threading.Lock()
+    self._file = open(self._out_file, 'w')
+    self._thread = threading.Thread(target=self._write_loop, name='pira-tape-writer', daemon=True)
+    self._thread.start()
+
+  def get_file(self) -> str:
+    return self._out_file
+
+  def write(self, entry) -> None:
+    """ entry is a string or a (prefix, LazyMessage) tuple, which is formatted by the writer thread """
+    self._queue.put(entry)
+
+  def flush(self) -> None:
+    """ Blocks until every record written so far is in the file """
+    self._queue.join()
+
+  def close(self) -> None:
+    self._queue.put(None)
+    self._thread.join()
+
+  def acquire(self) -> None:
+    self._lock.acquire()
+
+  def release(self) -> None:
+    self._lock.release()
+
+  def rotate(self) -> None:
+    self._file.close()
+    if self._backups > 0:
+      for idx in range(self._backups - 1, 0, -1):
+        if os.path.exists(self._out_file + '.' + str(idx)):
+          os.replace(self._out_file + '.' + str(idx), self._out_file + '.' + str(idx + 1))
+      os.replace(self._out_file, self._out_file + '.1')
+    self._file = open(self._out_file, 'w')
+
+  def _format(self, entry) -> str:
+    """ A record that cannot be formatted, e.g., due to wrong arguments, is replaced by the error """
+    if isinstance(entry, str):
+      return entry + '\n'
+    try:
+      return entry[0] + str(entry[1]) + '\n'
+    except Exception as e:
+      return entry[0] + 'TapeWriter: Cannot format record: ' + repr(e) + '\n'
+
+  def _write_loop(self) -> None:
+    done = False
+    while not done:
+      try:
+        batch = [self._queue.get(timeout=self._flush_interval)]
+      except queue.Empty:
+        continue
+      while True:
+        try:
+          batch.append(self._queue.get_nowait())
+        except queue.Empty:
+          break
+
+      try:
+        lines = []
+        for entry in batch:
+          if entry is None:
+            done = True
+            continue
+          lines.append(self._format(entry))
+
+        with self._lock:
+          for line in lines:
+            if self._file.tell() > 0 and self._file.tell() + len(line) > self._max_bytes:
+              self.rotate()
+            self._file.write(line)
+          self._file.flush()
+      except Exception as e:
+        # The thread must keep running, flush waits for every record
+        print('[Error] TapeWriter: Cannot write to ' + self._out_file + ': ' + repr(e), file=sys.stderr)
+      finally:
+        for _ in batch:
+          self._queue.task_done()
+
+    with self._lock:
+      self._file.close()
+
 
 class Logger:
   """
     Class to steer output
+
+    Messages are either strings, or format strings with arguments, or callables, see LazyMessage. The latter two are
+    formatted only if they are printed or recorded. Which messages are recorded on the tape is set by the policy:
+    - enabled: only the messages of enabled levels, the default
+    - all: every message, the ones of disabled levels are formatted when they are logged, as their arguments may
+      change afterwards
+    - none: no messages, only the perf tape is kept
+    With a tape file, see set_tape_file, the tape is streamed to it and only the last ring_size records are kept in
+    memory. Otherwise, the tape is kept in memory entirely, e.g., in the worker processes, which return it.
   """
 
+  tape_policies = ['enabled', 'all', 'none']
+
   def __init__(self):
     self.state = {'debug': False, 'info': True, 'warn': True, 'error': True, 'perf': True}
-    self.tape = []
+    self.tape_policy = 'enabled'
+    self.ring_size = 1000
+    self._writer = None
+    # Writers inherited from the parent process, which must neither be used nor finalized
+    self._detached_writers = []
+    self._tape = []
     self.perf_tape = []
 
-  def log(self, msg, level='debug') -> None:
-    if self.state[level]:
+  @property
+  def tape(self):
+    """ The recorded messages as strings """
+    for idx, entry in enumerate(self._tape):
+      if not isinstance(entry, str):
+        self._tape[idx] = entry[0] + str(entry[1])
+    return self._tape
+
+  @tape.setter
+  def tape(self, tape) -> None:
+    if self._writer is not None:
+      self._tape = collections.deque(tape, maxlen=self.ring_size)
+    else:
+      self._tape = tape
+
+  def set_tape_file(self, out_file: str, max_bytes: int = 64 * 1024 * 1024, backups: int = 3) -> None:
+    """ Streams the tape, including what is recorded so far, to out_file """
+    self.close_tape()
+    self._writer = TapeWriter(out_file, max_bytes, backups)
+    for entry in self._tape:
+      self._writer.write(entry)
+    self._tape = collections.deque(self._tape, maxlen=self.ring_size)
+
+  def get_tape_file(self):
+    if self._writer is None:
+      return None
+    return self._writer.get_file()
+
+  def flush_tape(self) -> None:
+    if self._writer is not None:
+      self._writer.flush()
+
+  def close_tape(self) -> None:
+    """ Writes the remaining records and stops streaming. The ring buffer is kept in memory. """
+    if self._writer is not None:
+      self._writer.close()
+      self._writer = None
+      self._tape = list(self._tape)
+
+  def _before_fork(self) -> None:
+    if self._writer is not None:
+      self._writer.acquire()
+
+  def _after_fork_in_parent(self) -> None:
+    if self._writer is not None:
+      self._writer.release()
+
+  def _detach_tape(self) -> None:
+    """
+    The writer thread does not exist in a forked process, which keeps its tape in memory. The inherited writer is
+    kept referenced, s.t. it is not finalized, which would write to its copy of the file.
+    """
+    if self._writer is not None:
+      self._detached_writers.append(self._writer)
+    self._writer = None
+    self._tape = list(self._tape)
+
+  def set_tape_policy(self, policy: str) -> None:
+    if policy not in Logger.tape_policies:
+      raise ValueError('Logger::set_tape_policy: Unknown tape policy ' + str(policy))
+    self.tape_policy = policy
+
+  def log(self, msg, *args, level='debug') -> None:
+    enabled = self.state[level]
+    if not enabled and level != 'perf' and self.tape_policy != 'all':
+      return
+
+    if len(args) > 0 or callable(msg):
+      msg = LazyMessage(msg, args)
+
+    if enabled:
       self.print_level(level, msg)
+    else:
+      msg = str(msg)
 
     self.record(level, msg)
 
@@ -28,13 +243,13 @@ class Logger:
     self.state[state_id] = not self.state[state_id]
 
   def print_level(self, level, msg) -> None:
-    if level is 'debug':
+    if level == 'debug':
       self.print_debug(msg)
-    elif level is 'info':
+    elif level == 'info':
       self.print_info(msg)
-    elif level is 'warn':
+    elif level == 'warn':
       self.print_warn(msg)
-    elif level is 'error':
+    elif level == 'error':
       self.print_error(msg)
 
   def print_debug(self, msg) -> None:
@@ -54,20 +269,50 @@ class Logger:
     print(msg_str)
 
   def record(self, level, msg) -> None:
-    msg_str = '[' + level + '] ' + str(msg)
-    self.tape.append(msg_str)
     if level == 'perf':
       self.perf_tape.append('[PERF] ' + str(msg))
 
+    if self.tape_policy == 'none' or (self.tape_policy == 'enabled' and not self.state[level]):
+      return
+    if isinstance(msg, LazyMessage):
+      self._append(('[' + level + '] ', msg))
+    else:
+      self._append('[' + level + '] ' + str(msg))
+
+  def _append(self, entry) -> None:
+    self._tape.append(entry)
+    if self._writer is not None:
+      self._writer.write(entry)
+
+  def reset_tape(self) -> None:
+    self.tape = []
+    self.perf_tape = []
+
+  def merge_tape(self, tape, perf_tape, tag: str = '') -> None:
+    """ Appends the records of another logger, e.g., from a worker process, prefixed with tag.  """
+    prefix = ''
+    if tag != '':
+      prefix = '[' + tag + '] '
+    for m in tape:
+      self._append(prefix + m)
+    for p in perf_tape:
+      self.perf_tape.append(prefix + p)
+
   def show_perf(self) -> None:
     for p in self.perf_tape:
       print(p)
 
   def get_last_msg(self) -> str:
-    return self.tape[len(self.tape) - 1]
+    entry = self._tape[len(self._tape) - 1]
+    if isinstance(entry, str):
+      return entry
+    return entry[0] + str(entry[1])
 
   def dump_tape(self, out_file=None, cli=False) -> None:
-    if out_file is not None:
+    """ Writes the tape to out_file. If the tape is streamed to out_file, it is only flushed. """
+    if out_file is not None and self.get_tape_file() == os.path.abspath(str(out_file)):
+      self.flush_tape()
+    elif out_file is not None:
       of = open(str(out_file), 'w')
       for m in self.tape:
         of.write(m)
@@ -80,6 +325,9 @@ class Logger:
 
 
 logger = Logger()
+os.register_at_fork(before=logger._before_fork,
+                    after_in_parent=logger._after_fork_in_parent,
+                    after_in_child=logger._detach_tape)
 
 
 def get_logger():
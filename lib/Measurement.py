@@ -9,7 +9,12 @@ import lib.Logging as log
 import lib.DefaultFlags as defaults
 from lib.Configuration import PiraConfiguration, TargetConfiguration, InstrumentConfig
 from lib.Exception import PiraException
+from lib.ProcessEngine import ResourceUsage, ExecutionContext
 
+import array
+import json
+import math
+import statistics
 import typing
 
 
@@ -20,74 +25,384 @@ class MeasurementSystemException(PiraException):
     super().__init__(message)
 
 
+# Two-sided Student t quantiles for degrees of freedom 1..30
+_t_table = {
+    0.90: [
+        6.314, 2.920, 2.353, 2.132, 2.015, 1.943, 1.895, 1.860, 1.833, 1.812, 1.796, 1.782, 1.771, 1.761, 1.753, 1.746,
+        1.740, 1.734, 1.729, 1.725, 1.721, 1.717, 1.714, 1.711, 1.708, 1.706, 1.703, 1.701, 1.699, 1.697
+    ],
+    0.95: [
+        12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228, 2.201, 2.179, 2.160, 2.145, 2.131,
+        2.120, 2.110, 2.101, 2.093, 2.086, 2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042
+    ],
+    0.99: [
+        63.657, 9.925, 5.841, 4.604, 4.032, 3.707, 3.499, 3.355, 3.250, 3.169, 3.106, 3.055, 3.012, 2.977, 2.947,
+        2.921, 2.898, 2.878, 2.861, 2.845, 2.831, 2.819, 2.807, 2.797, 2.787, 2.779, 2.771, 2.763, 2.756, 2.750
+    ]
+}
+
+
+def t_quantile(degrees_of_freedom: int, confidence: float) -> float:
+  """ Two-sided Student t quantile. Falls back to the normal distribution for large or untabulated cases. """
+  if confidence in _t_table and 1 <= degrees_of_freedom <= len(_t_table[confidence]):
+    return _t_table[confidence][degrees_of_freedom - 1]
+  return statistics.NormalDist().inv_cdf(.5 + confidence / 2)
+
+
+def median_of(values) -> float:
+  return statistics.median(values)
+
+
+def mad_of(values) -> float:
+  """ Median absolute deviation """
+  med = statistics.median(values)
+  return statistics.median([abs(v - med) for v in values])
+
+
+class SampleSet:
+  """
+  Array-backed storage of the per-repetition samples of a single measurement configuration.
+  An aggregate holds only the accumulated runtime of its repetitions, but no samples.
+  """
+
+  def __init__(self):
+    self._aggregate = None
+    self._wall = array.array('d')
+    self._user = array.array('d')
+    self._sys = array.array('d')
+    self._max_rss = array.array('q')
+    self._vol_ctx = array.array('q')
+    self._invol_ctx = array.array('q')
+
+  def add_runtime(self, runtime: float) -> None:
+    self._wall.append(runtime)
+
+  def set_aggregate(self, accumulated_runtime: float, nr_of_iterations: int) -> None:
+    self._aggregate = (accumulated_runtime, nr_of_iterations)
+
+  def is_aggregate(self) -> bool:
+    return self._aggregate is not None
+
+  def get_aggregate(self) -> typing.Tuple[float, int]:
+    return self._aggregate
+
+  def add_usage(self, usage: ResourceUsage) -> None:
+    self._wall.append(usage.get_wall_time())
+    self._user.append(usage.get_user_time())
+    self._sys.append(usage.get_sys_time())
+    self._max_rss.append(usage.get_max_rss())
+    self._vol_ctx.append(usage.get_voluntary_context_switches())
+    self._invol_ctx.append(usage.get_involuntary_context_switches())
+
+  def __len__(self):
+    if self._aggregate is not None:
+      return self._aggregate[1]
+    return len(self._wall)
+
+  def has_usages(self) -> bool:
+    return len(self._wall) > 0 and len(self._user) == len(self._wall)
+
+  def get_runtimes(self) -> array.array:
+    return self._wall
+
+  def get_usage(self, idx: int) -> ResourceUsage:
+    return ResourceUsage(int(self._wall[idx] * 1e9), self._user[idx], self._sys[idx], self._max_rss[idx],
+                         self._vol_ctx[idx], self._invol_ctx[idx])
+
+  def get_user_times(self) -> array.array:
+    return self._user
+
+  def get_sys_times(self) -> array.array:
+    return self._sys
+
+  def get_max_rss(self) -> array.array:
+    return self._max_rss
+
+  def get_context_switches(self) -> typing.List[int]:
+    return [v + i for v, i in zip(self._vol_ctx, self._invol_ctx)]
+
+  def to_dict(self) -> typing.Dict[str, typing.List]:
+    return {
+        'aggregate': None if self._aggregate is None else list(self._aggregate),
+        'wall': self._wall.tolist(),
+        'user': self._user.tolist(),
+        'sys': self._sys.tolist(),
+        'max_rss': self._max_rss.tolist(),
+        'vol_ctx': self._vol_ctx.tolist(),
+        'invol_ctx': self._invol_ctx.tolist()
+    }
+
+  @classmethod
+  def from_dict(cls, values: typing.Dict[str, typing.List]):
+    sample_set = cls()
+    if values.get('aggregate') is not None:
+      sample_set.set_aggregate(*values['aggregate'])
+    sample_set._wall.extend(values['wall'])
+    sample_set._user.extend(values['user'])
+    sample_set._sys.extend(values['sys'])
+    sample_set._max_rss.extend(values['max_rss'])
+    sample_set._vol_ctx.extend(values['vol_ctx'])
+    sample_set._invol_ctx.extend(values['invol_ctx'])
+    return sample_set
+
+
+class Overhead(float):
+  """  An overhead ratio that additionally carries its confidence interval.  """
+
+  def __new__(cls, ratio: float, lower: float = None, upper: float = None):
+    obj = super().__new__(cls, ratio)
+    obj._lower = ratio if lower is None else lower
+    obj._upper = ratio if upper is None else upper
+    return obj
+
+  def get_ratio(self) -> float:
+    return float(self)
+
+  def get_interval(self) -> typing.Tuple[float, float]:
+    return (self._lower, self._upper)
+
+
 class RunResult:
-  """  Holds the result of a measurement execution with potentially multiple iterations.  """
+  """
+  Holds the result of a measurement execution with potentially multiple iterations.
+  Every position, i.e., measured input configuration, keeps all its repetition samples.
+  Statistics are computed on the samples that survive the outlier rejection.
+  """
+
+  # Outlier rejection applied to all RunResults: 'none', 'mad' (modified z-score) or 'iqr' (Tukey fences)
+  outlier_policy = 'none'
+  outlier_threshold = 3.5
+  confidence = 0.95
 
-  def __init__(self, accumulated_runtime: float = None, nr_of_iterations: int = None, rt_trace=None):
+  @classmethod
+  def set_outlier_rejection(cls, policy: str, threshold: float = None) -> None:
+    if policy not in ['none', 'mad', 'iqr']:
+      raise MeasurementSystemException('Unknown outlier rejection policy: ' + policy)
+    cls.outlier_policy = policy
+    if threshold is not None:
+      cls.outlier_threshold = threshold
+    elif policy == 'iqr':
+      cls.outlier_threshold = 1.5
+    else:
+      cls.outlier_threshold = 3.5
+
+  def __init__(self,
+               accumulated_runtime: float = None,
+               nr_of_iterations: int = None,
+               rt_trace=None,
+               usages: typing.List[ResourceUsage] = None):
     """Initializes the class
 
-    :accumulated_runtime: TODO
-    :nr_of_iterations: TODO
-    :average: TODO
+    :accumulated_runtime: The sum of all repetitions' runtimes (used if no usages are given)
+    :nr_of_iterations: The number of repetitions
+    :rt_trace: unused
+    :usages: The resource usage of every single repetition
 
     """
-    if accumulated_runtime is not None:
-      self._accumulated_runtime = [accumulated_runtime]
-    else:
-      self._accumulated_runtime = []
-    if nr_of_iterations is not None:
-      self._nr_of_iterations = [nr_of_iterations]
-    else:
-      self._nr_of_iterations = []
+    self._samples = []
     if rt_trace is not None:
       self._rt_trace = [rt_trace]
     else:
       self._rt_trace = []
+    if usages is not None or accumulated_runtime is not None:
+      self.add_values(accumulated_runtime, nr_of_iterations, usages)
+
+  @classmethod
+  def from_usages(cls, usages: typing.List[ResourceUsage]):
+    """ Constructs a RunResult from the resource usage of the single repetitions. """
+    return cls(usages=usages)
+
+  def to_json(self) -> str:
+    """ Serializes all samples, e.g., to store them in the database """
+    return json.dumps([sample_set.to_dict() for sample_set in self._samples])
+
+  @classmethod
+  def from_json(cls, json_str: str):
+    run_result = cls()
+    for values in json.loads(json_str):
+      run_result._samples.append(SampleSet.from_dict(values))
+    return run_result
 
   def is_multi_value(self):
-    return len(self._accumulated_runtime) > 1
+    return len(self._samples) > 1
 
-  def add_values(self, accu_rt: float, nr_iter: int) -> None:
-    self._accumulated_runtime.append(accu_rt)
-    self._nr_of_iterations.append(nr_iter)
-    self._rt_trace.append(None)
+  def add_values(self, accu_rt: float, nr_iter: int, usages: typing.List[ResourceUsage] = None) -> None:
+    """
+    Adds a position. Without usages, the position is an aggregate: only the average accu_rt / nr_iter is known,
+    thus statistics on the repetitions, e.g., the confidence interval, are not available for it.
+    """
+    sample_set = SampleSet()
+    if usages is not None:
+      for usage in usages:
+        sample_set.add_usage(usage)
+    elif nr_iter is not None and nr_iter > 0:
+      sample_set.set_aggregate(accu_rt, nr_iter)
+    self._samples.append(sample_set)
 
   def add_from(self, other) -> None:
-    for (accu, iters) in zip(other._accumulated_runtime, other._nr_of_iterations):
-      self._accumulated_runtime.append(accu)
-      self._nr_of_iterations.append(iters)
+    for sample_set in other._samples:
+      self._samples.append(sample_set)
 
-  def get_average(self, pos: int = 0) -> float:
-    if self._nr_of_iterations == 0 or self._nr_of_iterations == []:
-      log.get_logger().log('Calculating average based on 0 repetitions - assuming 1', level='warn')
+  def get_num_positions(self) -> int:
+    return len(self._samples)
+
+  def get_sample_set(self, pos: int = 0) -> SampleSet:
+    if pos >= len(self._samples) or len(self._samples[pos]) == 0:
+      log.get_logger().log('Calculating statistics based on 0 repetitions', level='warn')
       raise RuntimeError('Calculating average based on 0 repetitions impossible.')
-      self._nr_of_iterations = 1
-    return self._accumulated_runtime[pos] / self._nr_of_iterations[pos]
+    return self._samples[pos]
+
+  def has_samples(self, pos: int = 0) -> bool:
+    """ False for an aggregate, see add_values """
+    return pos < len(self._samples) and not self._samples[pos].is_aggregate() and len(self._samples[pos]) > 0
+
+  def get_kept_indices(self, pos: int = 0) -> typing.List[int]:
+    """ Indices of the samples that are not rejected as outliers. """
+    sample_set = self.get_sample_set(pos)
+    if sample_set.is_aggregate():
+      raise MeasurementSystemException('RunResult: Position ' + str(pos) +
+                                       ' has no samples, only the average of its repetitions')
+    runtimes = sample_set.get_runtimes()
+    indices = list(range(0, len(runtimes)))
+    policy = RunResult.outlier_policy
+    if policy == 'none' or len(runtimes) < 3:
+      return indices
+
+    if policy == 'mad':
+      med = median_of(runtimes)
+      mad = mad_of(runtimes)
+      if mad == 0:
+        return indices
+      return [i for i in indices if 0.6745 * abs(runtimes[i] - med) / mad <= RunResult.outlier_threshold]
+
+    q = statistics.quantiles(runtimes, n=4, method='inclusive')
+    iqr = q[2] - q[0]
+    lower = q[0] - RunResult.outlier_threshold * iqr
+    upper = q[2] + RunResult.outlier_threshold * iqr
+    return [i for i in indices if lower <= runtimes[i] <= upper]
+
+  def get_samples(self, pos: int = 0) -> typing.List[float]:
+    """ The runtimes of the samples that are not rejected as outliers. """
+    runtimes = self.get_sample_set(pos).get_runtimes()
+    return [runtimes[i] for i in self.get_kept_indices(pos)]
+
+  def get_num_outliers(self, pos: int = 0) -> int:
+    return len(self.get_sample_set(pos)) - len(self.get_kept_indices(pos))
 
-  def compute_overhead(self, base_line, pos: int = 0) -> float:
+  def get_average(self, pos: int = 0) -> float:
+    sample_set = self.get_sample_set(pos)
+    if sample_set.is_aggregate():
+      accumulated_runtime, nr_of_iterations = sample_set.get_aggregate()
+      return accumulated_runtime / nr_of_iterations
+    return statistics.fmean(self.get_samples(pos))
+
+  def get_median(self, pos: int = 0) -> float:
+    return median_of(self.get_samples(pos))
+
+  def get_mad(self, pos: int = 0) -> float:
+    return mad_of(self.get_samples(pos))
+
+  def get_stddev(self, pos: int = 0) -> float:
+    samples = self.get_samples(pos)
+    if len(samples) < 2:
+      return .0
+    return statistics.stdev(samples)
+
+  def get_confidence_interval(self, pos: int = 0, confidence: float = None) -> typing.Tuple[float, float]:
+    """ Confidence interval of the mean runtime, based on Student's t distribution. """
+    if confidence is None:
+      confidence = RunResult.confidence
+    samples = self.get_samples(pos)
+    mean = statistics.fmean(samples)
+    if len(samples) < 2:
+      return (mean, mean)
+    half_width = t_quantile(len(samples) - 1, confidence) * statistics.stdev(samples) / math.sqrt(len(samples))
+    return (mean - half_width, mean + half_width)
+
+  def get_relative_ci_width(self, pos: int = 0, confidence: float = None) -> float:
+    """ Half width of the confidence interval relative to the mean """
+    lower, upper = self.get_confidence_interval(pos, confidence)
+    mean = self.get_average(pos)
+    if mean == 0:
+      return .0
+    return (upper - lower) / 2 / mean
+
+  def compute_overhead(self, base_line, pos: int = 0) -> Overhead:
+    """ Ratio of the mean runtimes and its confidence interval (delta method). """
     base_line_avg = base_line.get_average(pos)
     if base_line_avg == 0:
       base_line_avg = 1
-    result = self.get_average(pos) / base_line_avg
-    return result
+    this_avg = self.get_average(pos)
+    result = this_avg / base_line_avg
+    if not self.has_samples(pos) or not base_line.has_samples(pos):
+      # The ratio of aggregates has no interval
+      return Overhead(result)
+
+    this_samples = self.get_samples(pos)
+    base_samples = base_line.get_samples(pos)
+    if len(this_samples) < 2 or len(base_samples) < 2 or this_avg == 0:
+      return Overhead(result)
+
+    rel_var = (statistics.variance(this_samples) / len(this_samples)) / this_avg**2
+    rel_var += (statistics.variance(base_samples) / len(base_samples)) / base_line_avg**2
+    dof = min(len(this_samples), len(base_samples)) - 1
+    half_width = t_quantile(dof, RunResult.confidence) * result * math.sqrt(rel_var)
+    return Overhead(result, result - half_width, result + half_width)
 
   def get_all_averages(self) -> typing.List[float]:
-    avgs = []
-    for (rt, ni) in zip(self._accumulated_runtime, self._nr_of_iterations):
-      avgs.append(rt / ni)
+    return [self.get_average(pos) for pos in range(0, len(self._samples))]
+
+  def compute_all_overheads(self, base_line: typing.List) -> typing.List[Overhead]:
+    num_pos = min(len(self._samples), len(base_line._samples))
+    return [self.compute_overhead(base_line, pos) for pos in range(0, num_pos)]
+
+  def has_usages(self, pos: int = 0) -> bool:
+    return pos < len(self._samples) and self._samples[pos].has_usages()
+
+  def get_usages(self, pos: int = 0) -> typing.List[ResourceUsage]:
+    sample_set = self.get_sample_set(pos)
+    if not sample_set.has_usages():
+      return []
+    return [sample_set.get_usage(i) for i in range(0, len(sample_set))]
 
-    return avgs
+  def _get_usage_values(self, pos: int, values: array.array) -> typing.List:
+    if not self.has_usages(pos):
+      raise RuntimeError('RunResult: No resource usage recorded.')
+    return [values[i] for i in self.get_kept_indices(pos)]
 
-  def compute_all_overheads(self, base_line: typing.List) -> typing.List[float]:
-    ovhds = []
-    for (thisAvg, otherAvg) in zip(self.get_all_averages(), base_line.get_all_averages()):
-      ovhds.append(thisAvg / otherAvg)
+  def get_average_user_time(self, pos: int = 0) -> float:
+    return statistics.fmean(self._get_usage_values(pos, self._samples[pos].get_user_times()))
 
-    return ovhds
+  def get_average_sys_time(self, pos: int = 0) -> float:
+    return statistics.fmean(self._get_usage_values(pos, self._samples[pos].get_sys_times()))
+
+  def get_average_cpu_time(self, pos: int = 0) -> float:
+    return self.get_average_user_time(pos) + self.get_average_sys_time(pos)
+
+  def get_average_context_switches(self, pos: int = 0) -> float:
+    return statistics.fmean(self._get_usage_values(pos, self._samples[pos].get_context_switches()))
+
+  def get_max_rss(self, pos: int = 0) -> int:
+    return max(self._get_usage_values(pos, self._samples[pos].get_max_rss()))
+
+  def compute_cpu_overhead(self, base_line, pos: int = 0) -> float:
+    base_line_cpu = base_line.get_average_cpu_time(pos)
+    if base_line_cpu == 0:
+      base_line_cpu = 1
+    return self.get_average_cpu_time(pos) / base_line_cpu
+
+  def compute_memory_overhead(self, base_line, pos: int = 0) -> float:
+    base_line_rss = base_line.get_max_rss(pos)
+    if base_line_rss == 0:
+      base_line_rss = 1
+    return self.get_max_rss(pos) / base_line_rss
 
 
 class ScorepSystemHelper:
-  """  Takes care of setting necessary environment variables appropriately.  """
+  """
+  Takes care of setting necessary environment variables appropriately. The variables are collected in the helper,
+  see get_env, and passed to the measured processes, i.e., the environment of PIRA is not changed.
+  """
 
   def __init__(self, config: PiraConfiguration) -> None:
     self.known_files = ['.cubex']
@@ -100,6 +415,15 @@ class ScorepSystemHelper:
     self.cur_filter_file = ''
     self._enable_unwinding = 'False'
     self._MPI_filter_so_path = ''
+    self._env = {}
+
+  def get_env(self) -> typing.Dict[str, str]:
+    """ The Score-P environment of the measured target """
+    return dict(self._env)
+
+  def _set_env(self, env_var: str, val: str) -> None:
+    log.get_logger().log('ScorepSystemHelper::_set_env: Setting ' + env_var + ' to ' + str(val), level='debug')
+    self._env[env_var] = val
 
   def get_data_elem(self, key: str):
     try:
@@ -161,11 +485,11 @@ class ScorepSystemHelper:
 
   def set_memory_size(self, mem_str: str) -> None:
     self.cur_mem_size = mem_str
-    u.set_env('SCOREP_TOTAL_MEMORY', self.cur_mem_size)
+    self._set_env('SCOREP_TOTAL_MEMORY', self.cur_mem_size)
 
   def set_profiling_basename(self, flavor: str, base: str, item: str) -> None:
     self.cur_base_name = flavor + '-' + item
-    u.set_env('SCOREP_PROFILING_BASE_NAME', self.cur_base_name)
+    self._set_env('SCOREP_PROFILING_BASE_NAME', self.cur_base_name)
 
   def set_exp_dir(self, exp_dir: str, flavor: str, iterationNumber: int) -> None:
     effective_dir = u.get_cube_file_path(exp_dir, flavor, iterationNumber)
@@ -173,7 +497,7 @@ class ScorepSystemHelper:
       raise MeasurementSystemException('Score-p experiment directory invalid.')
 
     self.cur_exp_directory = effective_dir
-    u.set_env('SCOREP_EXPERIMENT_DIRECTORY', self.cur_exp_directory)
+    self._set_env('SCOREP_EXPERIMENT_DIRECTORY', self.cur_exp_directory)
     return
 
   def get_exp_dir(self) -> str:
@@ -182,11 +506,11 @@ class ScorepSystemHelper:
 
   def set_overwrite_exp_dir(self) -> None:
     self.cur_overwrite_exp_dir = 'True'
-    u.set_env('SCOREP_OVERWRITE_EXPERIMENT_DIRECTORY', self.cur_overwrite_exp_dir)
+    self._set_env('SCOREP_OVERWRITE_EXPERIMENT_DIRECTORY', self.cur_overwrite_exp_dir)
 
   def set_enable_unwinding(self) -> None:
     self._enable_unwinding = 'True'
-    u.set_env('SCOREP_ENABLE_UNWINDING', self._enable_unwinding)
+    self._set_env('SCOREP_ENABLE_UNWINDING', self._enable_unwinding)
 
   def set_filter_file(self, file_name: str) -> None:
     log.get_logger().log('ScorepMeasurementSystem::set_filter_file: File for runtime filtering = ' + file_name)
@@ -194,7 +518,7 @@ class ScorepSystemHelper:
       raise MeasurementSystemException('Score-P filter file not valid.')
 
     self.cur_filter_file = file_name
-    u.set_env('SCOREP_FILTERING_FILE', self.cur_filter_file)
+    self._set_env('SCOREP_FILTERING_FILE', self.cur_filter_file)
 
   def append_scorep_footer(self, input_str: str) -> str:
     return input_str + '\nSCOREP_REGION_NAMES_END\n'
@@ -259,25 +583,27 @@ class ScorepSystemHelper:
     ) + ' -lscorep_adapter_memory_event_cxx_L64 ' + cls.get_additional_libs() + '\"'
 
   @classmethod
-  def check_build_prerequisites(cls) -> None:
-    scorep_init_file_name = 'scorep.init.c'
+  def check_build_prerequisites(cls, directory: str) -> None:
+    scorep_init_file_name = directory + '/scorep.init.c'
     log.get_logger().log('ScorepMeasurementSystem::check_build_prerequisites: global home dir: ' + u.get_home_dir())
     pira_scorep_resource = u.get_home_dir() + '/resources/scorep.init.c'
     if not u.is_file(scorep_init_file_name):
-      u.copy_file(pira_scorep_resource, u.get_cwd() + '/' + scorep_init_file_name)
+      u.copy_file(pira_scorep_resource, scorep_init_file_name)
 
     # In case something goes wrong with copying
     if u.is_file(scorep_init_file_name):
-      u.shell('gcc -c ' + scorep_init_file_name)
+      u.shell('gcc -c scorep.init.c', context=ExecutionContext(directory))
     else:
       raise MeasurementSystemException('ScorepMeasurementSystem::check_build_prerequisites: Missing ' +
                                        scorep_init_file_name)
 
   @classmethod
-  def prepare_MPI_filtering(cls, filter_file: str) -> None:
+  def prepare_MPI_filtering(cls, filter_file: str, wrap_dir: str = None) -> None:
+    """ Generates the MPI filter wrapper in wrap_dir, which is the default one of the BackendDefaults if None """
+    default_provider = defaults.BackendDefaults()
     # Find which MPI functions to filter
     # Get all MPI functions (our filter_file is a WHITELIST)
-    mpi_funcs_dump = '/tmp/mpi_funcs.dump'
+    mpi_funcs_dump = default_provider.get_MPI_functions_file(wrap_dir)
     u.shell('wrap.py -d > ' + mpi_funcs_dump)
     all_MPI_functions_decls = u.read_file(mpi_funcs_dump).split('\n')
     all_MPI_functions = []
@@ -302,15 +628,15 @@ class ScorepSystemHelper:
       wrap_script += ' ' + mpi_func
 
     wrap_script += '}}\n{{callfn}}\n{{endfn}}'
-    default_provider = defaults.BackendDefaults()
-    wrap_file = default_provider.get_wrap_w_file()
+    wrap_file = default_provider.get_wrap_w_file(wrap_dir)
     if u.check_file(wrap_file):
       u.remove_file(wrap_file)
     u.write_file(wrap_file, wrap_script)
 
-    wrap_c_path = default_provider.get_wrap_c_file()
+    wrap_c_path = default_provider.get_wrap_c_file(wrap_dir)
     wrap_command = 'wrap.py -o ' + wrap_c_path + ' ' + wrap_file
     u.shell(wrap_command)
     # Compile it to .so file
-    compile_mpi_wrapper_command = 'mpicc -shared -fPIC -o ' + default_provider.get_wrap_so_file() + ' ' + wrap_c_path
+    compile_mpi_wrapper_command = 'mpicc -shared -fPIC -o ' + default_provider.get_wrap_so_file(
+        wrap_dir) + ' ' + wrap_c_path
     u.shell(compile_mpi_wrapper_command)
@@ -0,0 +1,87 @@
+"""
+File: Orchestration.py
+License: Part of the PIRA project. Licensed under BSD 3 clause license. See LICENSE.txt file at https://github.com/jplehr/pira/LICENSE.txt
+Description: Module to orchestrate the builds, runs and analyses of many targets from a single asyncio event loop.
+"""
+
+import sys
+sys.path.append('..')
+
+import lib.Logging as log
+import lib.BatchSystemHelper as bat_sys
+from lib.Configuration import TargetConfiguration
+from lib.Exception import PiraException
+
+import asyncio
+import concurrent.futures
+import contextvars
+import functools
+import shutil
+import tempfile
+import typing
+
+
+class OrchestrationException(PiraException):
+
+  def __init__(self, message):
+    super().__init__(message)
+
+
+class AsyncOrchestrator:
+  """
+  Executes the PIRA workflow of all targets concurrently from one asyncio event loop. Every target is processed by
+  execute_fn, i.e., Pira.execute_with_config, in a worker thread. Hence, baseline cache, artifact store, selective
+  rebuilds, checkpoints and the runners behave exactly as in the blocking workflow. Targets of the same lane, see
+  ParallelTargetScheduler.partition_into_lanes, share resources and are executed one after the other.
+  While the targets are executed, the Slurm job arrays are polled by the event loop, see
+  BatchSystemHelper.set_poll_loop, and the compile and measure slots are the ones of Scheduling.resource_slot.
+  """
+
+  def __init__(self, execute_fn: typing.Callable[[TargetConfiguration], None]) -> None:
+    self._execute_fn = execute_fn
+
+  def execute_target(self, target_config: TargetConfiguration) -> None:
+    """ Runs in a worker thread """
+    # Concurrent targets must not overwrite each other's MPI filter wrapper
+    wrap_dir = tempfile.mkdtemp(prefix='pira-wrap-')
+    target_config.set_wrap_dir(wrap_dir)
+    try:
+      self._execute_fn(target_config)
+    finally:
+      target_config.set_wrap_dir(None)
+      shutil.rmtree(wrap_dir, ignore_errors=True)
+
+  async def execute_lane(self, executor: concurrent.futures.Executor,
+                         target_configs: typing.List[TargetConfiguration]) -> None:
+    loop = asyncio.get_running_loop()
+    for target_config in target_configs:
+      # The context is copied, s.t. the spans of the target are nested into the current one
+      await loop.run_in_executor(executor,
+                                 functools.partial(contextvars.copy_context().run, self.execute_target, target_config))
+
+  async def execute(self, target_configs: typing.List[TargetConfiguration],
+                    lanes: typing.List[typing.List[int]]) -> None:
+    lane_targets = [[target_configs[idx] for idx in lane] for lane in lanes]
+    # The targets get their own threads. The default executor is left to the Slurm polls, see SlurmJobArray.wait_async
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, len(lanes)), thread_name_prefix='pira-target')
+    bat_sys.set_poll_loop(asyncio.get_running_loop())
+    try:
+      results = await asyncio.gather(*[self.execute_lane(executor, tcs) for tcs in lane_targets],
+                                     return_exceptions=True)
+    finally:
+      bat_sys.set_poll_loop(None)
+      executor.shutdown(wait=True)
+
+    failed = []
+    for tcs, result in zip(lane_targets, results):
+      if isinstance(result, Exception):
+        tags = ', '.join([tc.get_target() + '/' + tc.get_flavor() for tc in tcs])
+        log.get_logger().log('AsyncOrchestrator::execute: Lane of ' + tags + ' failed: ' + str(result), level='error')
+        failed.append(tags)
+
+    if len(failed) > 0:
+      raise RuntimeError('AsyncOrchestrator: Execution failed for ' + '; '.join(failed))
+
+  def run(self, target_configs: typing.List[TargetConfiguration], lanes: typing.List[typing.List[int]]) -> None:
+    """ Blocks until all targets are processed """
+    asyncio.run(self.execute(target_configs, lanes))
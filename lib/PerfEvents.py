@@ -0,0 +1,185 @@
+"""
+File: PerfEvents.py
+License: Part of the PIRA project. Licensed under BSD 3 clause license. See LICENSE.txt file at https://github.com/jplehr/pira/LICENSE.txt
+Description: Module to export the performance data of a PIRA campaign as typed events, instead of perf log strings.
+"""
+
+import sys
+sys.path.append('..')
+
+import lib.Logging as log
+from lib.Exception import PiraException
+
+import json
+import os
+import time
+import typing
+
+
+class PerfEventException(PiraException):
+
+  def __init__(self, message):
+    super().__init__(message)
+
+
+class PerfEvent:
+  """
+  A single measurement of the campaign.
+
+  :kind: what is measured, see PerfEvent.kinds
+  :target: <target>/<flavor>, if the event belongs to a target
+  :iteration: the PIRA iteration, -1 for the baseline
+  :phase: the phase the event stems from, e.g., build, run or analysis
+  :duration: seconds the phase took
+  :value: the measured value, e.g., the runtime, the overhead ratio or the number of whitelisted functions
+  :attributes: further values, e.g., the confidence interval of the overhead
+  """
+
+  kinds = ['runtime', 'overhead', 'whitelist', 'converged', 'iteration', 'build', 'baseline_cache']
+
+  def __init__(self,
+               kind: str,
+               target: str = None,
+               iteration: int = None,
+               phase: str = None,
+               duration: float = None,
+               value: float = None,
+               attributes: typing.Dict = None,
+               item_id: str = None) -> None:
+    if kind not in PerfEvent.kinds:
+      raise PerfEventException('PerfEvent: Unknown kind ' + kind)
+    self._kind = kind
+    self._target = target
+    self._iteration = iteration
+    self._phase = phase
+    self._duration = duration
+    self._value = value
+    self._attributes = attributes if attributes is not None else {}
+    self._item_id = item_id
+    self._created = time.time()
+    self._pid = os.getpid()
+
+  def get_kind(self) -> str:
+    return self._kind
+
+  def get_target(self) -> typing.Optional[str]:
+    return self._target
+
+  def get_iteration(self) -> typing.Optional[int]:
+    return self._iteration
+
+  def get_phase(self) -> typing.Optional[str]:
+    return self._phase
+
+  def get_duration(self) -> typing.Optional[float]:
+    return self._duration
+
+  def get_value(self) -> typing.Optional[float]:
+    return self._value
+
+  def get_attributes(self) -> typing.Dict:
+    return self._attributes
+
+  def get_item_id(self) -> typing.Optional[str]:
+    return self._item_id
+
+  def get_created(self) -> float:
+    return self._created
+
+  def to_dict(self) -> typing.Dict:
+    return {
+        'kind': self._kind,
+        'target': self._target,
+        'item_id': self._item_id,
+        'iteration': self._iteration,
+        'phase': self._phase,
+        'duration': self._duration,
+        'value': self._value,
+        'attributes': self._attributes,
+        'created': self._created,
+        'pid': self._pid
+    }
+
+
+class PerfEventExporterBase:
+
+  def export(self, event: PerfEvent) -> None:
+    raise NotImplementedError('PerfEventExporterBase::export is abstract')
+
+  def close(self) -> None:
+    pass
+
+
+class JsonLinesExporter(PerfEventExporterBase):
+  """
+  Appends every event as one line of JSON to a file. Each line is a single write to a file opened with O_APPEND, so
+  the worker processes of a parallel campaign can share the file. A forked process opens the file anew.
+  """
+
+  def __init__(self, out_file: str) -> None:
+    self._out_file = out_file
+    self._fd = None
+    self._pid = None
+
+  def get_file(self) -> str:
+    return self._out_file
+
+  def export(self, event: PerfEvent) -> None:
+    if self._pid != os.getpid():
+      self._fd = os.open(self._out_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+      self._pid = os.getpid()
+    os.write(self._fd, (json.dumps(event.to_dict()) + '\n').encode('utf-8'))
+
+  def close(self) -> None:
+    if self._fd is not None and self._pid == os.getpid():
+      os.close(self._fd)
+    self._fd = None
+    self._pid = None
+
+
+class DatabaseExporter(PerfEventExporterBase):
+  """ Writes the events to the PerfEvent table of the PIRA database, batched with its other inserts """
+
+  def __init__(self, db_manager) -> None:
+    self._dbm = db_manager
+
+  def export(self, event: PerfEvent) -> None:
+    self._dbm.enter_perf_event(event)
+
+  def close(self) -> None:
+    self._dbm.flush()
+
+
+_exporters = []
+
+
+def add_exporter(exporter: PerfEventExporterBase) -> None:
+  """ Must be called before the worker processes are forked """
+  _exporters.append(exporter)
+
+
+def get_exporters() -> typing.List[PerfEventExporterBase]:
+  return _exporters
+
+
+def close_exporters() -> None:
+  for exporter in _exporters:
+    exporter.close()
+  _exporters.clear()
+
+
+def emit(kind: str, target_config=None, **kwargs) -> None:
+  """ Creates an event for target_config, if given, and hands it to all exporters. kwargs as in PerfEvent. """
+  if len(_exporters) == 0:
+    return
+
+  if target_config is not None:
+    kwargs['target'] = target_config.get_target() + '/' + target_config.get_flavor()
+    kwargs['item_id'] = target_config.get_db_item_id()
+  event = PerfEvent(kind, **kwargs)
+  for exporter in _exporters:
+    try:
+      exporter.export(event)
+    except Exception as e:
+      # Losing an event must not stop the campaign
+      log.get_logger().log('PerfEvents::emit: Exporting ' + kind + ' event failed: ' + str(e), level='warn')
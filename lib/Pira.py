@@ -19,61 +19,212 @@ import lib.Measurement as ms
 import lib.TimeTracking as tt
 import lib.Database as d
 import lib.ProfileSink as sinks
+import lib.Scheduling as sched
+import lib.BaselineCache as bc
+import lib.PerfEvents as pe
+from lib.ArtifactStore import ArtifactStore
+from lib.Convergence import ConvergenceCriteria
+from lib.Checkpoint import Checkpointer
+from lib.Orchestration import AsyncOrchestrator
 from lib.RunnerFactory import PiraRunnerFactory
 
 import typing
 import sys
-
-
-def execute_with_config(runner: Runner, analyzer: A, pira_iters: int, target_config: TargetConfiguration) -> None:
+import time
+
+
+def execute_with_config(runner: Runner,
+                        analyzer: A,
+                        pira_iters: int,
+                        target_config: TargetConfiguration,
+                        baseline_cache: bc.BaselineCacheBase,
+                        artifact_store: ArtifactStore = None,
+                        convergence: ConvergenceCriteria = None,
+                        checkpointer: Checkpointer = None,
+                        dbm: d.DBManager = None) -> None:
+  """ Executes the PIRA workflow for target_config, traced as one target span """
+  with tt.get_tracer().span(target_config.get_target() + '/' + target_config.get_flavor(), 'target',
+                            build=target_config.get_build()):
+    _execute_with_config(runner, analyzer, pira_iters, target_config, baseline_cache, artifact_store, convergence,
+                         checkpointer, dbm)
+
+
+def _execute_with_config(runner: Runner,
+                         analyzer: A,
+                         pira_iters: int,
+                         target_config: TargetConfiguration,
+                         baseline_cache: bc.BaselineCacheBase,
+                         artifact_store: ArtifactStore = None,
+                         convergence: ConvergenceCriteria = None,
+                         checkpointer: Checkpointer = None,
+                         dbm: d.DBManager = None) -> None:
+  tracer = tt.get_tracer()
   try:
     log.get_logger().log('run_setup phase.', level='debug')
     instrument = False
     pira_iterations = pira_iters 
 
+    def load_checkpoint(phase: str, iteration: int) -> typing.Optional[dict]:
+      if checkpointer is None:
+        return None
+      return checkpointer.load(target_config, phase, iteration)
+
+    def save_checkpoint(phase: str, iteration: int, payload: dict) -> None:
+      if checkpointer is not None:
+        checkpointer.save(target_config, phase, iteration, payload)
+
+    def record_run(iteration: int, run_result: ms.RunResult) -> None:
+      """ Stores the repetitions of a run in the Experiment table. iteration is -1 for the baseline. """
+      if dbm is None:
+        return
+      cube_file = None
+      if iteration >= 0:
+        cube_file = analyzer.get_cube_file(target_config, iteration)
+      args = [str(a) for a in runner.get_arg_configs(target_config)]
+      dbm.enter_run_data(util.generate_random_string(), target_config.get_target(), iteration, iteration >= 0,
+                         cube_file, run_result, target_config.get_db_item_id(), args)
+
+    if checkpointer is not None:
+      checkpointer.begin_target(target_config)
+
     # Build without any instrumentation
     vanilla_builder = B(target_config, instrument)
     tracker = tt.TimeTracker()
-    tracker.m_track('Vanilla Build', vanilla_builder, 'build')
 
-    # Run without instrumentation for baseline
-    log.get_logger().log('Running baseline measurements', level='info')
-    vanilla_rr = runner.do_baseline_run(target_config)
+    def build_vanilla() -> None:
+      with sched.resource_slot('compile'):
+        start = time.time()
+        with tracer.span('vanilla build', 'build', iteration=-1):
+          tracker.m_track('Vanilla Build', vanilla_builder, 'build')
+        pe.emit('build', target_config, iteration=-1, phase='build', duration=time.time() - start)
+
+    def run_baseline() -> ms.RunResult:
+      # Run without instrumentation for baseline
+      log.get_logger().log('Running baseline measurements', level='info')
+      with sched.resource_slot('measure'):
+        start = time.time()
+        with tracer.span('baseline', 'run', iteration=-1):
+          run_result = runner.do_baseline_run(target_config)
+        duration = time.time() - start
+      pe.emit('runtime', target_config, iteration=-1, phase='run', duration=duration, value=run_result.get_average())
+      return run_result
+
+    baseline_cp = load_checkpoint('baseline', -1)
+    if baseline_cp is not None:
+      vanilla_rr = ms.RunResult.from_json(baseline_cp['run_result'])
+    else:
+      vanilla_rr = baseline_cache.get_baseline(target_config, build_vanilla, run_baseline)
+      save_checkpoint('baseline', -1, {'run_result': vanilla_rr.to_json()})
+    # Also a cached or checkpointed baseline is recorded for this item, which its runs are compared against
+    record_run(-1, vanilla_rr)
     log.get_logger().log(
         'Pira::execute_with_config: RunResult: ' + str(vanilla_rr) + ' | avg: ' + str(vanilla_rr.get_average()),
         level='debug')
     instr_file = ''
+    prev_functions = None
 
     for x in range(0, pira_iterations):
-      log.get_logger().log('Running instrumentation iteration ' + str(x), level='info')
-
-      # Only run the pgoe to get the functions name
-      iteration_tracker = tt.TimeTracker()
-
-      # Analysis Phase
-      instr_file = analyzer.analyze(target_config, x)
-      log.get_logger().log('[WHITELIST] $' + str(x) + '$ ' + str(util.lines_in_file(instr_file)), level='perf')
-      util.shell('stat ' + instr_file)
-
-      # After baseline measurement is complete, do the instrumented build/run
-      # This is only necessary in every iteration when run in compile-time mode.
-      if x is 0 or target_config.is_compile_time_filtering():
-        instrument = True
-        instr_builder = B(target_config, instrument, instr_file)
-        tracker.m_track('Instrument Build', instr_builder, 'build')
-
-      #Run Phase
-      log.get_logger().log('Running profiling measurements', level='info')
-      instr_rr = runner.do_profile_run(target_config, x)
-
-      # Compute overhead of instrumentation
-      ovh_percentage = instr_rr.compute_overhead(vanilla_rr)
-      log.get_logger().log('[RUNTIME] $' + str(x) + '$ ' + str(instr_rr.get_average()), level='perf')
-      log.get_logger().log('[OVERHEAD] $' + str(x) + '$ ' + str(ovh_percentage), level='perf')
-
-      iteration_tracker.stop()
-      user_time, system_time = iteration_tracker.get_time()
-      log.get_logger().log('[ITERTIME] $' + str(x) + '$ ' + str(user_time) + ', ' + str(system_time), level='perf')
+      with tracer.span('iteration ' + str(x), 'iteration', iteration=x):
+        log.get_logger().log('Running instrumentation iteration ' + str(x), level='info')
+
+        # Only run the pgoe to get the functions name
+        iteration_tracker = tt.TimeTracker()
+
+        # Analysis Phase
+        analysis_cp = load_checkpoint('analysis', x)
+        if analysis_cp is not None:
+          # The next analysis expects the whitelist of this iteration in place.
+          instr_file = analysis_cp['instr_file']
+          util.write_file(instr_file, analysis_cp['whitelist'])
+        else:
+          with tracer.span('analysis', 'analysis', iteration=x):
+            instr_file = analyzer.analyze(target_config, x)
+          if dbm is not None:
+            dbm.enter_analysis_data(target_config.get_db_item_id(), target_config.get_target(), x,
+                                    len(util.get_whitelisted_functions(instr_file)))
+          save_checkpoint('analysis', x, {'instr_file': instr_file, 'whitelist': util.read_file(instr_file)})
+        log.get_logger().log('[WHITELIST] $' + str(x) + '$ ' + str(util.lines_in_file(instr_file)), level='perf')
+        pe.emit('whitelist', target_config, iteration=x, phase='analysis', value=util.lines_in_file(instr_file))
+        util.shell('stat ' + instr_file)
+
+        if convergence is not None and convergence.is_enabled():
+          functions = util.get_whitelisted_functions(instr_file)
+          reason = convergence.check_whitelist(prev_functions, functions)
+          if reason is not None:
+            log.get_logger().log('Pira::execute_with_config: Converged in iteration ' + str(x) + ': ' + reason,
+                                 level='info')
+            log.get_logger().log('[CONVERGED] $' + str(x) + '$ ' + reason, level='perf')
+            pe.emit('converged', target_config, iteration=x, phase='analysis', attributes={'reason': reason})
+            break
+          prev_functions = functions
+
+        # After baseline measurement is complete, do the instrumented build/run
+        # This is only necessary in every iteration when run in compile-time mode.
+        if x == 0 or target_config.is_compile_time_filtering():
+          build_cp = load_checkpoint('build', x)
+          if build_cp is None:
+            instrument = True
+            instr_builder = B(target_config, instrument, instr_file, artifact_store,
+                              analyzer.get_call_graph_file(target_config))
+            with sched.resource_slot('compile'):
+              start = time.time()
+              with tracer.span('instrument build', 'build', iteration=x):
+                tracker.m_track('Instrument Build', instr_builder, 'build')
+              pe.emit('build', target_config, iteration=x, phase='build', duration=time.time() - start)
+            save_checkpoint('build', x, {'instr_file': instr_file})
+          elif not target_config.is_compile_time_filtering():
+            # The skipped build sets the filter file of the runtime filtering
+            target_config.set_instr_file(build_cp.get('instr_file', instr_file))
+
+        #Run Phase
+        run_cp = load_checkpoint('run', x)
+        if run_cp is not None:
+          instr_rr = ms.RunResult.from_json(run_cp['run_result'])
+          if runner.has_sink():
+            runner.get_sink().set_state(run_cp['sink'])
+        else:
+          log.get_logger().log('Running profiling measurements', level='info')
+          with sched.resource_slot('measure'):
+            start = time.time()
+            with tracer.span('profile run', 'run', iteration=x):
+              instr_rr = runner.do_profile_run(target_config, x)
+            run_duration = time.time() - start
+          record_run(x, instr_rr)
+          pe.emit('runtime', target_config, iteration=x, phase='run', duration=run_duration,
+                  value=instr_rr.get_average())
+          sink_state = {}
+          if runner.has_sink():
+            sink_state = runner.get_sink().get_state()
+          save_checkpoint('run', x, {'run_result': instr_rr.to_json(), 'sink': sink_state})
+
+        # Compute overhead of instrumentation
+        ovh_percentage = instr_rr.compute_overhead(vanilla_rr)
+        log.get_logger().log('[RUNTIME] $' + str(x) + '$ ' + str(instr_rr.get_average()), level='perf')
+        log.get_logger().log('[OVERHEAD] $' + str(x) + '$ ' + str(ovh_percentage), level='perf')
+        ovh_lower, ovh_upper = ovh_percentage.get_interval()
+        log.get_logger().log('[OVERHEADCI] $' + str(x) + '$ ' + str(ovh_lower) + ', ' + str(ovh_upper), level='perf')
+        overhead_attributes = {'lower': ovh_lower, 'upper': ovh_upper}
+        if instr_rr.has_usages() and vanilla_rr.has_usages():
+          overhead_attributes['cpu'] = instr_rr.compute_cpu_overhead(vanilla_rr)
+          overhead_attributes['memory'] = instr_rr.compute_memory_overhead(vanilla_rr)
+          log.get_logger().log('[CPUOVERHEAD] $' + str(x) + '$ ' + str(overhead_attributes['cpu']), level='perf')
+          log.get_logger().log('[MEMOVERHEAD] $' + str(x) + '$ ' + str(overhead_attributes['memory']), level='perf')
+        pe.emit('overhead', target_config, iteration=x, phase='run', value=float(ovh_percentage),
+                attributes=overhead_attributes)
+
+        iteration_tracker.stop()
+        user_time, system_time = iteration_tracker.get_time()
+        log.get_logger().log('[ITERTIME] $' + str(x) + '$ ' + str(user_time) + ', ' + str(system_time), level='perf')
+        pe.emit('iteration', target_config, iteration=x, attributes={'user_time': user_time, 'sys_time': system_time})
+
+        if convergence is not None:
+          reason = convergence.check_overhead(ovh_percentage)
+          if reason is not None:
+            log.get_logger().log('Pira::execute_with_config: Converged in iteration ' + str(x) + ': ' + reason,
+                                 level='info')
+            log.get_logger().log('[CONVERGED] $' + str(x) + '$ ' + reason, level='perf')
+            pe.emit('converged', target_config, iteration=x, phase='run', attributes={'reason': reason})
+            break
 
   except Exception as e:
     log.get_logger().log(
@@ -86,7 +237,8 @@ def process_args_for_extrap(cmdline_args) -> typing.Tuple[bool, str]:
   extrap_config = ExtrapConfiguration('', '', '')
   if cmdline_args.extrap_dir is not '':
     use_extra_p = True
-    extrap_config = ExtrapConfiguration(cmdline_args.extrap_dir, cmdline_args.extrap_prefix, '')
+    extrap_config = ExtrapConfiguration(cmdline_args.extrap_dir, cmdline_args.extrap_prefix, '',
+                                        cmdline_args.extrap_summary, not cmdline_args.extrap_copy)
 
     num_reps = cmdline_args.repetitions
     if num_reps < 5:
@@ -96,6 +248,11 @@ def process_args_for_extrap(cmdline_args) -> typing.Tuple[bool, str]:
         log.get_logger().log('At least 3 repetitions are required for Extra-P modelling.', level='error')
         raise RuntimeError('At least 5 repetitions are needed for Extra-P modelling.')
 
+    if cmdline_args.async_orchestration:
+      # The profile sink keeps the state of the target it currently collects for, which the threads would share
+      log.get_logger().log('Extra-P modelling cannot be combined with --async-orchestration.', level='error')
+      raise RuntimeError('Extra-P modelling cannot be combined with --async-orchestration.')
+
   return use_extra_p, extrap_config
 
 
@@ -114,8 +271,22 @@ def process_args_for_invoc(cmdline_args) -> None:
   compile_time_filter = not cmdline_args.runtime_filter
   pira_iters = cmdline_args.iterations
   num_reps = cmdline_args.repetitions
-
-  invoc_cfg = InvocationConfiguration(path_to_config, compile_time_filter, pira_iters, num_reps)
+  num_jobs = cmdline_args.jobs
+  concurrent_reps = cmdline_args.concurrent_repetitions
+  cpus_per_rep = cmdline_args.cpus_per_repetition
+  target_rel_ci = cmdline_args.adaptive_repetitions
+  max_reps = cmdline_args.max_repetitions
+  baseline_cache = not cmdline_args.no_baseline_cache
+  artifact_dir = cmdline_args.artifact_dir
+  selective_rebuild = cmdline_args.selective_rebuild
+  convergence = ConvergenceCriteria(cmdline_args.stop_on_fixpoint, cmdline_args.stop_overhead,
+                                    cmdline_args.stop_change)
+
+  invoc_cfg = InvocationConfiguration(path_to_config, compile_time_filter, pira_iters, num_reps, num_jobs,
+                                      concurrent_reps, cpus_per_rep, target_rel_ci, max_reps, baseline_cache,
+                                      artifact_dir, selective_rebuild, convergence, cmdline_args.resume,
+                                      cmdline_args.slurm, cmdline_args.compile_slots, cmdline_args.measure_slots,
+                                      cmdline_args.async_orchestration, cmdline_args.artifact_max_size * 1024 * 1024)
 
   return invoc_cfg
 
@@ -125,10 +296,12 @@ def main(arguments) -> None:
   show_pira_invoc_info(arguments)
 
   invoc_cfg = process_args_for_invoc(arguments)
+  ms.RunResult.set_outlier_rejection(arguments.outlier_rejection)
   use_extra_p, extrap_config = process_args_for_extrap(arguments)
 
   home_dir = util.get_cwd()
   util.set_home_dir(home_dir)
+  dbm = None
 
   try:
     if arguments.version is 1:
@@ -156,6 +329,10 @@ def main(arguments) -> None:
       fm.FunctorManager(configuration)
       dbm = d.DBManager(d.DBManager.db_name + '.' + d.DBManager.db_ext)
       dbm.create_cursor()
+      if arguments.perf_events is not None:
+        pe.add_exporter(pe.JsonLinesExporter(arguments.perf_events))
+      if arguments.perf_events_db:
+        pe.add_exporter(pe.DatabaseExporter(dbm))
       analyzer = A(configuration)
 
       runner_factory = PiraRunnerFactory(invoc_cfg, configuration)
@@ -164,9 +341,32 @@ def main(arguments) -> None:
         log.get_logger().log('Running with Extra-P runner')
         runner = runner_factory.get_scalability_runner(extrap_config)
 
+      if invoc_cfg.is_slurm():
+        log.get_logger().log('Submitting the measurements to Slurm')
+        sink = None
+        if use_extra_p:
+          sink = runner.get_sink()
+        runner = runner_factory.get_slurm_runner(sink)
+
       if runner.has_sink():
         analyzer.set_profile_sink(runner.get_sink())
 
+      checkpointer = Checkpointer.for_config_file(dbm, invoc_cfg.get_path_to_cfg(), invoc_cfg.is_resume())
+      runner.set_checkpointer(checkpointer)
+
+      baseline_cache = bc.NopBaselineCache()
+      if invoc_cfg.is_baseline_cache():
+        baseline_cache = bc.BaselineCache(dbm, configuration, runner)
+
+      artifact_store = None
+      if invoc_cfg.get_artifact_dir() is not None:
+        artifact_store = ArtifactStore(
+            util.get_absolute_path(invoc_cfg.get_artifact_dir()), invoc_cfg.get_artifact_max_size())
+
+      # With more than one job, or asynchronously, the targets are collected first and executed concurrently.
+      run_in_parallel = invoc_cfg.get_num_jobs() > 1 or invoc_cfg.is_async_orchestration()
+      parallel_targets = []
+
       # A build/place is a top-level directory
       for build in configuration.get_builds():
         log.get_logger().log('Build: ' + str(build))
@@ -182,14 +382,23 @@ def main(arguments) -> None:
             for flavor in configuration.get_flavors(build, item):
               log.get_logger().log('Running for local flavor ' + flavor, level='debug')
 
-              # prepare database, and get a unique handle for current item.
-              db_item_id = dbm.prep_db_for_build_item_in_flavor(configuration, build, item, flavor)
               # Create configuration object for the item currently processed.
               place = configuration.get_place(build)
-              t_config = TargetConfiguration(place, build, item, flavor, db_item_id, invoc_cfg.is_compile_time_filtering())
+              t_config = TargetConfiguration(place, build, item, flavor, None, invoc_cfg.is_compile_time_filtering(),
+                                             invoc_cfg.is_selective_rebuild())
+              # A resumed target continues in its item, otherwise prepare database and get a unique handle for it.
+              db_item_id = checkpointer.load_db_item_id(t_config)
+              if db_item_id is None:
+                db_item_id = dbm.prep_db_for_build_item_in_flavor(configuration, build, item, flavor)
+              t_config.set_db_item_id(db_item_id)
+
+              if run_in_parallel:
+                parallel_targets.append(t_config)
+                continue
 
               # Execute using a local runner, given the generated target description
-              execute_with_config(runner, analyzer, invoc_cfg.get_pira_iters(), t_config)
+              execute_with_config(runner, analyzer, invoc_cfg.get_pira_iters(), t_config, baseline_cache,
+                                  artifact_store, invoc_cfg.get_convergence_criteria(), checkpointer, dbm)
 
           # If global flavor
           else:
@@ -197,10 +406,34 @@ def main(arguments) -> None:
             log.get_logger().log('In this version of PIRA it is not yet implemented', level='error')
             assert (False)
 
+      # All builds and items are known, write them in one transaction
+      dbm.flush()
+
+      if len(parallel_targets) > 0:
+        sched.set_resource_pools(sched.ResourcePools(invoc_cfg.get_compile_slots(), invoc_cfg.get_measure_slots()))
+
+        def execute_fn(tc: TargetConfiguration) -> None:
+          execute_with_config(runner, analyzer, invoc_cfg.get_pira_iters(), tc, baseline_cache, artifact_store,
+                              invoc_cfg.get_convergence_criteria(), checkpointer, dbm)
+
+        scheduler = sched.ParallelTargetScheduler(invoc_cfg.get_num_jobs(), configuration, runner)
+        if invoc_cfg.is_async_orchestration():
+          AsyncOrchestrator(execute_fn).run(parallel_targets, scheduler.partition_into_lanes(parallel_targets))
+        else:
+          scheduler.execute(execute_fn, parallel_targets)
+
+      pe.close_exporters()
+
     util.change_cwd(home_dir)
 
   except RuntimeError as rt_err:
+    pe.close_exporters()
     util.change_cwd(home_dir)
     log.get_logger().log('Runner.run caught exception. Message: ' + str(rt_err), level='error')
     log.get_logger().dump_tape()
     sys.exit(-1)
+
+  finally:
+    # The buffered rows are written also if a target failed, e.g., the ones of the other targets
+    if dbm is not None:
+      dbm.close()
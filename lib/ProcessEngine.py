@@ -0,0 +1,336 @@
+"""
+File: ProcessEngine.py
+License: Part of the PIRA project. Licensed under BSD 3 clause license. See LICENSE.txt file at https://github.com/jplehr/pira/LICENSE.txt
+Description: Module to execute external commands without a temporary file or an intermediate shell, if possible.
+"""
+
+import sys
+sys.path.append('..')
+
+from lib.Exception import PiraException
+
+import os
+import re
+import selectors
+import shlex
+import signal
+import subprocess
+import time
+import typing
+
+
+class ProcessEngineException(PiraException):
+
+  def __init__(self, message):
+    super().__init__(message)
+
+
+class BoundedBuffer:
+  """  Ring buffer that keeps only the last max_bytes of the data appended to it.  """
+
+  def __init__(self, max_bytes: int):
+    self._max_bytes = max_bytes
+    self._data = bytearray()
+    self._truncated = False
+
+  def append(self, data: bytes) -> None:
+    self._data += data
+    overflow = len(self._data) - self._max_bytes
+    if overflow > 0:
+      del self._data[:overflow]
+      self._truncated = True
+
+  def get_value(self) -> bytes:
+    return bytes(self._data)
+
+  def is_truncated(self) -> bool:
+    return self._truncated
+
+
+class ResourceUsage:
+  """  Resources consumed by a single process invocation, including all descendants it waited for.  """
+
+  def __init__(self,
+               wall_time_ns: int,
+               user_time: float = .0,
+               sys_time: float = .0,
+               max_rss: int = 0,
+               vol_ctx_switches: int = 0,
+               invol_ctx_switches: int = 0):
+    self._wall_time_ns = wall_time_ns
+    self._user_time = user_time
+    self._sys_time = sys_time
+    self._max_rss = max_rss
+    self._vol_ctx_switches = vol_ctx_switches
+    self._invol_ctx_switches = invol_ctx_switches
+
+  @classmethod
+  def from_rusage(cls, wall_time_ns: int, rusage):
+    if rusage is None:
+      return cls(wall_time_ns)
+    return cls(wall_time_ns, rusage.ru_utime, rusage.ru_stime, rusage.ru_maxrss, rusage.ru_nvcsw, rusage.ru_nivcsw)
+
+  def get_wall_time(self) -> float:
+    """ Wall time in seconds """
+    return self._wall_time_ns / 1e9
+
+  def get_wall_time_ns(self) -> int:
+    return self._wall_time_ns
+
+  def get_user_time(self) -> float:
+    return self._user_time
+
+  def get_sys_time(self) -> float:
+    return self._sys_time
+
+  def get_cpu_time(self) -> float:
+    return self._user_time + self._sys_time
+
+  def get_max_rss(self) -> int:
+    """ Maximum resident set size in KiB """
+    return self._max_rss
+
+  def get_voluntary_context_switches(self) -> int:
+    return self._vol_ctx_switches
+
+  def get_involuntary_context_switches(self) -> int:
+    return self._invol_ctx_switches
+
+  def __str__(self):
+    return 'wall: ' + str(self.get_wall_time()) + 's user: ' + str(self._user_time) + 's sys: ' + str(
+        self._sys_time) + 's maxrss: ' + str(self._max_rss) + 'KiB ctx: ' + str(self._vol_ctx_switches) + '/' + str(
+            self._invol_ctx_switches)
+
+
+class ExecutionContext:
+  """
+  The working directory and the additional environment entries of the processes PIRA invokes for a target.
+  Components pass it on to the processes instead of changing the working directory or the environment of PIRA,
+  so targets can be processed concurrently, e.g., in threads.
+  """
+
+  def __init__(self, cwd: str = None, env: typing.Dict[str, str] = None) -> None:
+    self._cwd = cwd
+    self._env = dict(env) if env is not None else {}
+
+  def get_cwd(self) -> str:
+    """ None keeps the working directory of PIRA """
+    return self._cwd
+
+  def get_env(self) -> typing.Dict[str, str]:
+    return dict(self._env)
+
+  def with_cwd(self, cwd: str):
+    return ExecutionContext(cwd, self._env)
+
+  def with_env(self, env: typing.Dict[str, str]):
+    """ A copy with the entries of env added """
+    merged = dict(self._env)
+    merged.update(env)
+    return ExecutionContext(self._cwd, merged)
+
+  def __str__(self):
+    return 'cwd: ' + str(self._cwd) + ' env: ' + str(self._env)
+
+
+class ProcessResult:
+  """  Holds return code, captured output and resource usage of a finished process.  """
+
+  def __init__(self, argv: typing.List[str], return_code: int, stdout: BoundedBuffer, stderr: BoundedBuffer,
+               wall_time_ns: int, rusage, timed_out: bool):
+    self._argv = argv
+    self._return_code = return_code
+    self._stdout = stdout
+    self._stderr = stderr
+    self._wall_time_ns = wall_time_ns
+    self._rusage = rusage
+    self._timed_out = timed_out
+
+  def get_argv(self) -> typing.List[str]:
+    return self._argv
+
+  def get_return_code(self) -> int:
+    return self._return_code
+
+  def succeeded(self) -> bool:
+    return self._return_code == 0 and not self._timed_out
+
+  def is_timed_out(self) -> bool:
+    return self._timed_out
+
+  def get_stdout(self) -> str:
+    return self._stdout.get_value().decode('utf-8', errors='replace')
+
+  def get_stderr(self) -> str:
+    return self._stderr.get_value().decode('utf-8', errors='replace')
+
+  def is_output_truncated(self) -> bool:
+    return self._stdout.is_truncated() or self._stderr.is_truncated()
+
+  def get_wall_time(self) -> float:
+    return self._wall_time_ns / 1e9
+
+  def get_rusage(self):
+    """ The resource.struct_rusage as reported by wait4, None if the process could not be started. """
+    return self._rusage
+
+  def get_resource_usage(self) -> ResourceUsage:
+    return ResourceUsage.from_rusage(self._wall_time_ns, self._rusage)
+
+
+class ProcessEngine:
+  """
+  Runs commands via an argument vector and Popen. Only commands that actually need a shell, i.e., that
+  use pipes, redirection, variable expansion etc., are passed to /bin/sh. Both output pipes are drained
+  concurrently into bounded buffers, and the process is reaped via wait4 to obtain its resource usage.
+  """
+
+  default_max_output = 1024 * 1024
+
+  _shell_chars = set('|&;<>()$`\\*?[]#~\n')
+  _shell_builtins = set([
+      '.', ':', '[', 'alias', 'break', 'cd', 'command', 'continue', 'eval', 'exec', 'exit', 'export', 'for', 'if',
+      'read', 'readonly', 'return', 'set', 'shift', 'source', 'test', 'trap', 'ulimit', 'umask', 'unset', 'wait',
+      'while'
+  ])
+  _env_assignment = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*=')
+
+  def __init__(self, max_output: int = None):
+    if max_output is None:
+      max_output = ProcessEngine.default_max_output
+    self._max_output = max_output
+
+  @classmethod
+  def to_argv(cls, command) -> typing.Tuple[typing.List[str], typing.Dict[str, str]]:
+    """
+    Splits command into an argument vector and the environment assignments that prefix it, e.g.,
+    'CXX=clang++ make gol' becomes (['make', 'gol'], {'CXX': 'clang++'}).
+    """
+    if isinstance(command, list):
+      return command, {}
+
+    shell_argv = ['/bin/sh', '-c', command]
+    if any(c in cls._shell_chars for c in command):
+      return shell_argv, {}
+
+    try:
+      tokens = shlex.split(command)
+    except ValueError:
+      return shell_argv, {}
+
+    env = {}
+    while len(tokens) > 0 and cls._env_assignment.match(tokens[0]):
+      name, value = tokens.pop(0).split('=', 1)
+      env[name] = value
+
+    if len(tokens) == 0 or tokens[0] in cls._shell_builtins:
+      return shell_argv, {}
+
+    return tokens, env
+
+  def run(self,
+          command,
+          cwd: str = None,
+          env: typing.Dict[str, str] = None,
+          timeout: float = None,
+          output_callback=None) -> ProcessResult:
+    """
+    Runs command and blocks until it finished.
+
+    :command: str or list: the command line, or an argument vector that is executed as is
+    :cwd: str: the working directory of the process, None keeps the current one
+    :env: dict: environment entries that are set in addition to the inherited environment
+    :timeout: float: seconds after which the process (group) is killed
+    :output_callback: callable: receives every chunk of stdout as bytes, as it is produced
+    """
+    argv, prefix_env = self.to_argv(command)
+    proc_env = None
+    if env is not None or len(prefix_env) > 0:
+      proc_env = dict(os.environ)
+      if env is not None:
+        proc_env.update(env)
+      proc_env.update(prefix_env)
+
+    stdout = BoundedBuffer(self._max_output)
+    stderr = BoundedBuffer(self._max_output)
+    start = time.perf_counter_ns()
+    try:
+      # A process group of its own, so a timeout can kill the whole process tree.
+      proc = subprocess.Popen(argv,
+                              stdin=subprocess.DEVNULL,
+                              stdout=subprocess.PIPE,
+                              stderr=subprocess.PIPE,
+                              cwd=cwd,
+                              env=proc_env,
+                              start_new_session=timeout is not None)
+    except (FileNotFoundError, PermissionError) as e:
+      # Mimic the shell's behavior for commands that cannot be executed.
+      stderr.append((argv[0] + ': ' + e.strerror + '\n').encode('utf-8'))
+      return ProcessResult(argv, 127 if isinstance(e, FileNotFoundError) else 126, stdout, stderr,
+                           time.perf_counter_ns() - start, None, False)
+
+    deadline = None
+    if timeout is not None:
+      deadline = start + int(timeout * 1e9)
+
+    timed_out = self._drain(proc, stdout, stderr, deadline, output_callback)
+    status, rusage, waited_out = self._wait(proc, deadline)
+    wall_time_ns = time.perf_counter_ns() - start
+
+    return ProcessResult(argv, proc.returncode, stdout, stderr, wall_time_ns, rusage, timed_out or waited_out)
+
+  def _drain(self, proc, stdout: BoundedBuffer, stderr: BoundedBuffer, deadline, output_callback) -> bool:
+    """ Reads both pipes until EOF. Returns whether the deadline passed before. """
+    buffers = {proc.stdout.fileno(): stdout, proc.stderr.fileno(): stderr}
+    with selectors.DefaultSelector() as selector:
+      selector.register(proc.stdout, selectors.EVENT_READ)
+      selector.register(proc.stderr, selectors.EVENT_READ)
+
+      while len(selector.get_map()) > 0:
+        wait_for = None
+        if deadline is not None:
+          wait_for = (deadline - time.perf_counter_ns()) / 1e9
+          if wait_for <= 0:
+            self._kill(proc)
+            return True
+
+        for key, _ in selector.select(wait_for):
+          data = os.read(key.fd, 65536)
+          if not data:
+            selector.unregister(key.fileobj)
+            key.fileobj.close()
+            continue
+
+          buffers[key.fd].append(data)
+          if output_callback is not None and key.fd == proc.stdout.fileno():
+            output_callback(data)
+
+    return False
+
+  def _wait(self, proc, deadline) -> typing.Tuple[int, typing.Any, bool]:
+    """ Reaps the process via wait4 and sets its return code. """
+    timed_out = False
+    if deadline is None:
+      _, status, rusage = os.wait4(proc.pid, 0)
+    else:
+      while True:
+        pid, status, rusage = os.wait4(proc.pid, os.WNOHANG)
+        if pid != 0:
+          break
+        if time.perf_counter_ns() > deadline and not timed_out:
+          self._kill(proc)
+          timed_out = True
+        time.sleep(0.001)
+
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    for stream in (proc.stdout, proc.stderr):
+      if not stream.closed:
+        stream.close()
+
+    return status, rusage, timed_out
+
+  def _kill(self, proc) -> None:
+    try:
+      os.killpg(proc.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+      pass
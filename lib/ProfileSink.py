@@ -10,8 +10,12 @@ import lib.Logging as log
 import lib.Utility as u
 from lib.Configuration import TargetConfiguration, InstrumentConfig
 from lib.Exception import PiraException
+from lib.CubeReader import CubeReader, CubeReaderException
 
 import json
+import os
+import statistics
+import typing
 
 
 class ProfileSinkException(PiraException):
@@ -32,6 +36,21 @@ class ProfileSinkBase:
   def get_target(self):
     return self._sink_target
 
+  def get_shared_directory(self):
+    """ Returns the directory all targets write into, or None if the sink keeps no shared state on disk. """
+    return None
+
+  def get_state(self) -> dict:
+    """ The state to checkpoint, s.t. a resumed campaign continues where it stopped """
+    return {}
+
+  def set_state(self, state: dict) -> None:
+    pass
+
+  def flush(self) -> None:
+    """ Called by the runners after the last repetition of an argument configuration was processed """
+    pass
+
 
 class NopSink(ProfileSinkBase):
   '''
@@ -59,8 +78,14 @@ class PiraOneProfileSink(ProfileSinkBase):
 
 
 class ExtrapProfileSink(ProfileSinkBase):
-
-  def __init__(self, dir: str, params, prefix: str, postfix: str, filename: str, reps: int):
+  """
+  Places the profile of every repetition in the Extra-P directory structure, i.e.,
+  i<N>/<prefix>.<params>.<postfix>.r<k>/<filename>. With link, the profile is hard linked if it is on the same file
+  system; Score-P writes the profile of a new run into a new file, so the link keeps its contents. Otherwise, or
+  without link, it is reflinked or copied in the kernel where possible, see Utility.archive_file.
+  """
+
+  def __init__(self, dir: str, params, prefix: str, postfix: str, filename: str, reps: int, link: bool = True):
     super().__init__()
     self._base_dir = dir
     self._params = params
@@ -70,6 +95,8 @@ class ExtrapProfileSink(ProfileSinkBase):
     self._iteration = -1
     self._repetition = 0
     self._total_reps = reps
+    self._link = link
+    self._copy_strategies = {}
     self._VALUE = ()
 
   def output_pgis_config(self, benchmark, output_dir):
@@ -97,6 +124,18 @@ class ExtrapProfileSink(ProfileSinkBase):
   def get_target(self):
     return self._sink_target
 
+  def get_shared_directory(self):
+    return self._base_dir
+
+  def get_state(self) -> dict:
+    return {'iteration': self._iteration, 'repetition': self._repetition}
+
+  def set_state(self, state: dict) -> None:
+    self._iteration = state['iteration']
+    self._repetition = state['repetition']
+    # The invocation arguments cannot be restored, the next process call starts a new configuration anyway.
+    self._VALUE = ()
+
   def get_param_mapping(self, target_config: TargetConfiguration) -> str:
     if not target_config.has_args_for_invocation():
       return '.'
@@ -125,6 +164,16 @@ class ExtrapProfileSink(ProfileSinkBase):
     dir_name += '.' + self._postfix + '.r' + str(self._repetition + 1)
     return dir_name
 
+  def get_experiment_cube(self, experiment_dir: str, target_config: TargetConfiguration) -> typing.Optional[str]:
+    cubex_name = experiment_dir + '/' + target_config.get_flavor() + '-' + target_config.get_target() + '.cubex'
+    log.get_logger().log(cubex_name)
+
+    if not u.is_file(cubex_name):
+      log.get_logger().log('ExtrapProfileSink::get_experiment_cube: Returned experiment cube name is no file: ' +
+                           cubex_name)
+      return None
+    return cubex_name
+
   def check_and_prepare(self, experiment_dir: str, target_config: TargetConfiguration,
                         instr_config: InstrumentConfig) -> str:
     cur_ep_dir = self.get_extrap_dir_name(target_config, instr_config.get_instrumentation_iteration())
@@ -138,33 +187,150 @@ class ExtrapProfileSink(ProfileSinkBase):
         u.rename(cur_ep_dir, new_dir_name)
 
       u.create_directory(cur_ep_dir)
-      cubex_name = experiment_dir + '/' + target_config.get_flavor() + '-' + target_config.get_target() + '.cubex'
-      log.get_logger().log(cubex_name)
-
-      if not u.is_file(cubex_name):
-        log.get_logger().log('ExtrapProfileSink::check_and_prepare: Returned experiment cube name is no file: ' +
-                             cubex_name)
-      else:
+      cubex_name = self.get_experiment_cube(experiment_dir, target_config)
+      if cubex_name is not None:
         return cubex_name
 
     raise ProfileSinkException('ExtrapProfileSink: Could not create target directory or Cube dir bad.')
 
   def do_copy(self, src_cube_name: str, dest_dir: str) -> None:
-    log.get_logger().log('ExtrapProfileSink::do_copy: ' + src_cube_name + ' => ' + dest_dir + '/' + self._filename)
-    # return  # TODO make this actually work
-    u.copy_file(src_cube_name, dest_dir + '/' + self._filename)
-
-  def process(self, exp_dir: str, target_config: TargetConfiguration, instr_config: InstrumentConfig) -> None:
-    log.get_logger().log('ExtrapProfileSink::process: ' + str(instr_config.get_instrumentation_iteration()))
+    strategies = u.copy_strategies if self._link else u.copy_strategies[1:]
+    strategy = u.archive_file(src_cube_name, dest_dir + '/' + self._filename, strategies)
+    log.get_logger().log('ExtrapProfileSink::do_copy: ' + src_cube_name + ' => ' + dest_dir + '/' + self._filename +
+                         ' using ' + strategy)
+    self._copy_strategies[strategy] = self._copy_strategies.get(strategy, 0) + 1
+
+  def get_copy_strategies(self) -> typing.Dict[str, int]:
+    """ How often each strategy of Utility.archive_file was used to place a profile """
+    return self._copy_strategies
+
+  def next_repetition(self, target_config: TargetConfiguration, instr_config: InstrumentConfig) -> bool:
+    """ Counts the repetition. Returns True if it is the first one of an iteration and argument configuration. """
+    is_new = False
     if instr_config.get_instrumentation_iteration() > self._iteration or target_config.get_args_for_invocation(
     ) is not self._VALUE:
       self._iteration = instr_config.get_instrumentation_iteration()
       self._repetition = -1
       self._VALUE = ()
+      is_new = True
 
     self._repetition += 1
     self._VALUE = target_config.get_args_for_invocation()
+    return is_new
+
+  def process(self, exp_dir: str, target_config: TargetConfiguration, instr_config: InstrumentConfig) -> None:
+    log.get_logger().log('ExtrapProfileSink::process: ' + str(instr_config.get_instrumentation_iteration()))
+    self.next_repetition(target_config, instr_config)
     src_cube_name = self.check_and_prepare(exp_dir, target_config, instr_config)
     self._sink_target = self.get_extrap_dir_name(target_config, self._iteration)
 
     self.do_copy(src_cube_name, self._sink_target)
+
+
+class ExtrapSummaryProfileSink(ExtrapProfileSink):
+  """
+  Places every profile like the ExtrapProfileSink, which the analysis of the next iteration is based on, and merges
+  the repetitions of an iteration and argument configuration into one summary file in addition:
+  i<N>/<prefix>.<params>.<postfix>.summary.json holds, per metric and call path, the mean, median and minimum of the
+  exclusive values over the repetitions. Minima and maxima are summarized as stored, as they cannot be made
+  exclusive. The summary is written once all repetitions of the configuration are processed, see flush. Only the
+  values of the current configuration are kept in memory.
+  """
+
+  summary_version = 1
+
+  def __init__(self,
+               dir: str,
+               params,
+               prefix: str,
+               postfix: str,
+               filename: str,
+               reps: int,
+               metrics=None,
+               link: bool = True):
+    super().__init__(dir, params, prefix, postfix, filename, reps, link)
+    self._metrics = metrics
+    # metric -> call path -> value per repetition
+    self._samples = {}
+    self._summary_file = None
+
+  def get_state(self) -> dict:
+    state = super().get_state()
+    # The repetitions of the current configuration so far, which the summary of the next repetition includes
+    state['samples'] = self._samples
+    return state
+
+  def set_state(self, state: dict) -> None:
+    super().set_state(state)
+    self._samples = state.get('samples', {})
+
+  def get_summary_file_name(self, target_config: TargetConfiguration, instr_iteration: int) -> str:
+    file_name = self._base_dir + '/' + 'i' + str(instr_iteration) + '/' + self._prefix + '.'
+    file_name += self.get_param_mapping(target_config)
+    file_name += '.' + self._postfix + '.summary.json'
+    return file_name
+
+  def add_profile(self, cubex_file: str) -> None:
+    try:
+      profile = CubeReader(cubex_file, self._metrics).read()
+    except CubeReaderException as e:
+      raise ProfileSinkException('ExtrapSummaryProfileSink::add_profile: ' + str(e))
+
+    call_paths = profile.get_callpath_names()
+    combine = {'sum': lambda a, b: a + b, 'min': min, 'max': max}
+    for metric, cube_metric in profile.get_metrics().items():
+      metric_values = profile.get_values(metric)
+      if cube_metric.is_additive():
+        metric_values = profile.get_exclusive(metric)
+
+      # Call sites of the same function in the same caller share a call path name
+      values = {}
+      for call_path, value in zip(call_paths, metric_values):
+        if call_path in values:
+          value = combine[cube_metric.get_aggregation()](values[call_path], value)
+        values[call_path] = value
+
+      samples = self._samples.setdefault(metric, {})
+      for call_path, value in values.items():
+        # Call paths missing in earlier repetitions had no value there
+        samples.setdefault(call_path, [.0] * self._repetition).append(value)
+      for call_path, values in samples.items():
+        if len(values) == self._repetition:
+          values.append(.0)
+
+  def get_summary(self) -> dict:
+    metrics = {}
+    for metric, samples in self._samples.items():
+      metrics[metric] = {
+          call_path: {
+              'mean': statistics.mean(values),
+              'median': statistics.median(values),
+              'min': min(values)
+          }
+          for call_path, values in samples.items()
+      }
+    return {'version': ExtrapSummaryProfileSink.summary_version, 'repetitions': self._repetition + 1, 'metrics': metrics}
+
+  def get_summary_file(self) -> typing.Optional[str]:
+    """ The summary file of the current configuration, None if there is nothing to flush """
+    return self._summary_file
+
+  def process(self, exp_dir: str, target_config: TargetConfiguration, instr_config: InstrumentConfig) -> None:
+    log.get_logger().log('ExtrapSummaryProfileSink::process: ' + str(instr_config.get_instrumentation_iteration()))
+    if self.next_repetition(target_config, instr_config):
+      self._samples = {}
+
+    cubex_name = self.check_and_prepare(exp_dir, target_config, instr_config)
+    self._sink_target = self.get_extrap_dir_name(target_config, self._iteration)
+    self.do_copy(cubex_name, self._sink_target)
+    self.add_profile(cubex_name)
+    self._summary_file = self.get_summary_file_name(target_config, self._iteration)
+
+  def flush(self) -> None:
+    if self._summary_file is None:
+      return
+
+    log.get_logger().log('ExtrapSummaryProfileSink::flush: Writing ' + self._summary_file, level='debug')
+    os.makedirs(os.path.dirname(self._summary_file), exist_ok=True)
+    u.write_file(self._summary_file, json.dumps(self.get_summary()))
+    self._summary_file = None
@@ -0,0 +1,165 @@
+"""
+File: Report.py
+License: Part of the PIRA project. Licensed under BSD 3 clause license. See LICENSE.txt file at https://github.com/jplehr/pira/LICENSE.txt
+Description: Module to query the PIRA database for reports on campaigns. Invoked as: pira.py report <query> [options]
+"""
+
+import sys
+sys.path.append('..')
+
+from lib.Exception import PiraException
+import lib.Database as d
+
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import typing
+
+try:
+  import pyarrow
+  import pyarrow.parquet
+except ImportError:
+  pyarrow = None
+
+
+class ReportException(PiraException):
+
+  def __init__(self, message):
+    super().__init__(message)
+
+
+# Every report is a single query over the indexed tables. The optional benchmark filter is bound to :benchmark.
+# Runtimes are averages over the repetitions that are not outliers.
+queries = {
+    'overhead':
+        """ WITH runs AS (
+              SELECT Item_ID, BenchmarkName, Iteration_No, Position, Args, AVG(WallTime) AS Runtime,
+                     COUNT(*) AS Repetitions, MIN(Created) AS Created
+              FROM Experiment
+              WHERE IsOutlier=0 AND (:benchmark IS NULL OR BenchmarkName=:benchmark)
+              GROUP BY Item_ID, Iteration_No, Position)
+            SELECT r.BenchmarkName, r.Item_ID, r.Iteration_No, r.Position, r.Args, r.Runtime,
+                   b.Runtime AS BaselineRuntime, r.Runtime / b.Runtime AS Overhead, r.Repetitions, r.Created
+            FROM runs r JOIN runs b ON b.Item_ID=r.Item_ID AND b.Position=r.Position AND b.Iteration_No=-1
+            WHERE r.Iteration_No>=0
+            ORDER BY r.Created, r.Item_ID, r.Iteration_No, r.Position """,
+    'runtime':
+        """ SELECT BenchmarkName, Item_ID, Iteration_No, Position, Args, AVG(WallTime) AS Runtime,
+                   MIN(WallTime) AS MinRuntime, MAX(WallTime) AS MaxRuntime, AVG(UserTime + SysTime) AS CpuTime,
+                   MAX(MaxRSS) AS MaxRSS, COUNT(*) AS Repetitions, MIN(Created) AS Created
+            FROM Experiment
+            WHERE IsOutlier=0 AND (:benchmark IS NULL OR BenchmarkName=:benchmark)
+            GROUP BY Item_ID, Iteration_No, Position
+            ORDER BY Created, Item_ID, Iteration_No, Position """,
+    'whitelist':
+        """ SELECT BenchmarkName, Item_ID, Iteration_No, NumFunctions, Created
+            FROM Analysis
+            WHERE :benchmark IS NULL OR BenchmarkName=:benchmark
+            ORDER BY Created, Item_ID, Iteration_No """
+}
+
+formats = ['table', 'csv', 'columns', 'parquet']
+
+
+class Report:
+  """ The result of a query: column names and rows """
+
+  def __init__(self, columns: typing.List[str], rows: typing.List[tuple]) -> None:
+    self._columns = columns
+    self._rows = rows
+
+  def get_columns(self) -> typing.List[str]:
+    return self._columns
+
+  def get_rows(self) -> typing.List[tuple]:
+    return self._rows
+
+  def to_columns(self) -> typing.Dict[str, typing.List]:
+    """ Column-wise layout, e.g., to construct a data frame without converting row by row """
+    return {column: [row[idx] for row in self._rows] for idx, column in enumerate(self._columns)}
+
+  def format_table(self) -> str:
+    cells = [self._columns] + [['' if v is None else str(v) for v in row] for row in self._rows]
+    widths = [max([len(r[idx]) for r in cells]) for idx in range(len(self._columns))]
+    lines = ['  '.join([c.ljust(w) for c, w in zip(r, widths)]).rstrip() for r in cells]
+    lines.insert(1, '-' * len(lines[0]))
+    return '\n'.join(lines) + '\n'
+
+  def write(self, out_file: str, out_format: str) -> None:
+    """ Writes the report to out_file, or stdout for '-'. Parquet requires pyarrow and a file. """
+    if out_format not in formats:
+      raise ReportException('Report::write: Unknown format ' + out_format)
+
+    if out_format == 'parquet':
+      if pyarrow is None:
+        raise ReportException('Report::write: Writing Parquet files requires pyarrow')
+      if out_file == '-':
+        raise ReportException('Report::write: Parquet cannot be written to stdout')
+      pyarrow.parquet.write_table(pyarrow.table(self.to_columns()), out_file)
+      return
+
+    out = sys.stdout if out_file == '-' else open(out_file, 'w', newline='')
+    try:
+      if out_format == 'csv':
+        writer = csv.writer(out)
+        writer.writerow(self._columns)
+        writer.writerows(self._rows)
+      elif out_format == 'columns':
+        json.dump(self.to_columns(), out)
+      else:
+        out.write(self.format_table())
+    finally:
+      if out is not sys.stdout:
+        out.close()
+
+
+class Reporter:
+  """ Runs the report queries on a PIRA database, which is opened read-only """
+
+  def __init__(self, db_file: str) -> None:
+    if not os.path.isfile(db_file):
+      raise ReportException('Reporter: No database ' + db_file)
+    try:
+      self._conn = sqlite3.connect('file:' + os.path.abspath(db_file) + '?mode=ro', uri=True)
+    except sqlite3.Error as e:
+      raise ReportException('Reporter: Cannot open ' + db_file + ': ' + str(e))
+
+  def close(self) -> None:
+    self._conn.close()
+
+  def query(self, name: str, benchmark: str = None) -> Report:
+    if name not in queries:
+      raise ReportException('Reporter::query: Unknown report ' + name)
+    try:
+      cursor = self._conn.execute(queries[name], {'benchmark': benchmark})
+    except sqlite3.Error as e:
+      raise ReportException('Reporter::query: Report ' + name + ' failed, is the database of an older PIRA? ' + str(e))
+    return Report([c[0] for c in cursor.description], cursor.fetchall())
+
+
+def get_parser() -> argparse.ArgumentParser:
+  parser = argparse.ArgumentParser(prog='pira.py report', description='Reports on the campaigns in a PIRA database.')
+  parser.add_argument('query', help='The report to create', choices=sorted(queries.keys()))
+  parser.add_argument(
+      '--db', help='The PIRA database', default=d.DBManager.db_name + '.' + d.DBManager.db_ext, type=str)
+  parser.add_argument('--benchmark', help='Only report on this benchmark', type=str)
+  parser.add_argument('--format', help='The output format', choices=formats, default='table')
+  parser.add_argument('--output', help='The output file (default: stdout)', default='-', type=str)
+  return parser
+
+
+def main(argv: typing.List[str]) -> int:
+  args = get_parser().parse_args(argv)
+  try:
+    reporter = Reporter(args.db)
+    try:
+      reporter.query(args.query, args.benchmark).write(args.output, args.format)
+    finally:
+      reporter.close()
+  except ReportException as e:
+    print('pira.py report: ' + str(e), file=sys.stderr)
+    return 1
+
+  return 0
@@ -14,7 +14,13 @@ import lib.FunctorManagement as fm
 import lib.Measurement as ms
 import lib.DefaultFlags as defaults
 import lib.ProfileSink as sinks
+import lib.BatchSystemHelper as bat_sys
+from lib.ProcessEngine import ResourceUsage, ExecutionContext
 
+import concurrent.futures
+import contextvars
+import os
+import shlex
 import typing
 
 
@@ -31,6 +37,7 @@ class LocalBaseRunner(Runner):
     """ Runner are initialized once with a PiraConfiguration """
     self._config = configuration
     self._sink = sink
+    self._checkpointer = None
 
   def has_sink(self) -> bool:
     if self._sink is None:
@@ -43,42 +50,79 @@ class LocalBaseRunner(Runner):
   def get_sink(self):
     return self._sink
 
-  def run(self, target_config: TargetConfiguration, instrument_config: InstrumentConfig,
-          compile_time_filtering: bool) -> float:
-    """ Implements the actual invocation """
+  def set_checkpointer(self, checkpointer) -> None:
+    """ Runners that do more than one measurement per phase checkpoint these individually """
+    self._checkpointer = checkpointer
+
+  def get_measurement_settings(self) -> str:
+    """ How the runner measures, e.g., the number of repetitions. Measurements with other settings are not reused. """
+    return type(self).__name__
+
+  def get_arg_configs(self, target_config: TargetConfiguration) -> typing.List:
+    """ The input configuration of every position of the RunResults returned by this runner """
+    if target_config.has_args_for_invocation():
+      return [target_config.get_args_for_invocation()]
+    return self._config.get_args(target_config.get_build(), target_config.get_target())[:1]
+
+  def get_run_command(self, target_config: TargetConfiguration) -> str:
+    """ The command the passive run functor returns for the current arguments of target_config """
+    functor_manager = fm.FunctorManager()
+    run_functor = functor_manager.get_or_load_functor(target_config.get_build(), target_config.get_target(),
+                                                      target_config.get_flavor(), 'run')
+    if run_functor.get_method()['active']:
+      raise RuntimeError('LocalBaseRunner::get_run_command: Active run functors provide no command')
+
+    default_provider = defaults.BackendDefaults()
+    kwargs = default_provider.get_default_kwargs()
+    kwargs['util'] = util
+    kwargs['LD_PRELOAD'] = default_provider.get_MPI_wrap_LD_PRELOAD(target_config.get_wrap_dir())
+    kwargs['args'] = target_config.get_args_for_invocation()
+    return run_functor.passive(target_config.get_target(), **kwargs)
+
+  def run(self,
+          target_config: TargetConfiguration,
+          instrument_config: InstrumentConfig,
+          compile_time_filtering: bool,
+          context: ExecutionContext = None) -> ResourceUsage:
+    """
+    Implements the actual invocation in the target directory. The environment entries of context are set for the
+    invoked target only. Returns wall time, CPU time and memory consumption of the target.
+    """
     functor_manager = fm.FunctorManager()
     run_functor = functor_manager.get_or_load_functor(target_config.get_build(), target_config.get_target(),
                                                       target_config.get_flavor(), 'run')
     default_provider = defaults.BackendDefaults()
     kwargs = default_provider.get_default_kwargs()
     kwargs['util'] = util
-    kwargs['LD_PRELOAD'] = default_provider.get_MPI_wrap_LD_PRELOAD()
-    runtime = .0
+    kwargs['LD_PRELOAD'] = default_provider.get_MPI_wrap_LD_PRELOAD(target_config.get_wrap_dir())
+    usage = ResourceUsage(0)
+
+    if context is None:
+      context = ExecutionContext()
+    context = context.with_cwd(target_config.get_place())
 
     if run_functor.get_method()['active']:
-      run_functor.active(target_config.get_target(), **kwargs)
+      util.run_active_functor(run_functor, target_config.get_target(), context, **kwargs)
       log.get_logger().log('For the active functor we can barely measure runtime', level='warn')
-      runtime = 1.0
+      usage = ResourceUsage(int(1e9))
 
     try:
-      util.change_cwd(target_config.get_place())
-
       invoke_arguments = target_config.get_args_for_invocation()
       kwargs['args'] = invoke_arguments
       if invoke_arguments is not None:
         log.get_logger().log('LocalBaseRunner::run: (args) ' + str(invoke_arguments))
 
       command = run_functor.passive(target_config.get_target(), **kwargs)
-      _, runtime = util.shell(command, time_invoc=True)
+      _, usage = util.shell_with_usage(command, context=context)
       log.get_logger().log(
-          'LocalBaseRunner::run::passive_invocation -> Returned runtime: ' + str(runtime), level='debug')
+          'LocalBaseRunner::run::passive_invocation -> Returned usage: ' + str(usage), level='debug')
 
     except Exception as e:
       log.get_logger().log('LocalBaseRunner::run Exception\n' + str(e), level='error')
       raise RuntimeError('LocalBaseRunner::run caught exception. ' + str(e))
 
     # TODO: Insert the data into the database
-    return runtime
+    return usage
 
 
 class LocalRunner(LocalBaseRunner):
@@ -87,14 +131,171 @@ class LocalRunner(LocalBaseRunner):
   For scalability studies, i.e., iterate over all given input sizes, use the LocalScalingRunner.
   """
 
-  def __init__(self, configuration: PiraConfiguration, sink, num_repetitions: int = 2):
-    """ Runner are initialized once with a PiraConfiguration """
+  # Relative spread of concurrently measured runtimes above which interference is assumed
+  interference_threshold = 0.1
+
+  def __init__(self,
+               configuration: PiraConfiguration,
+               sink,
+               num_repetitions: int = 2,
+               concurrent_reps: bool = False,
+               cpus_per_rep: int = 0,
+               target_rel_ci: float = .0,
+               max_repetitions: int = 0):
+    """
+    Runner are initialized once with a PiraConfiguration.
+    If target_rel_ci is positive, num_repetitions is the minimum number of repetitions. Further repetitions are run
+    until the relative confidence interval of the runtime is below target_rel_ci, or max_repetitions is reached.
+    """
     super().__init__(configuration, sink)
     self._num_repetitions = num_repetitions
+    self._concurrent_reps = concurrent_reps
+    self._cpus_per_rep = cpus_per_rep
+    self._target_rel_ci = target_rel_ci
+    self._max_repetitions = max(max_repetitions, num_repetitions)
+
+  def is_adaptive(self) -> bool:
+    return self._target_rel_ci > 0
+
+  def get_measurement_settings(self) -> str:
+    settings = [('reps', self._num_repetitions), ('concurrent', self._concurrent_reps), ('cpus', self._cpus_per_rep),
+                ('rel_ci', self._target_rel_ci), ('max_reps', self._max_repetitions)]
+    return super().get_measurement_settings() + ':' + ','.join([k + '=' + str(v) for k, v in settings])
+
+  def get_cpu_sets(self) -> typing.List[typing.List[int]]:
+    """ Returns disjoint CPU sets, one per repetition, or None if repetitions cannot be run concurrently. """
+    if not self._concurrent_reps or self._num_repetitions < 2:
+      return None
+
+    try:
+      return util.partition_cpus(self._num_repetitions, self._cpus_per_rep)
+    except Exception as e:
+      log.get_logger().log('LocalRunner::get_cpu_sets: ' + str(e) + '\nRunning repetitions serially.', level='warn')
+      return None
+
+  def check_isolation(self, usages: typing.List[ResourceUsage]) -> bool:
+    """ Flags interference between concurrently run repetitions, based on the spread of their runtimes. """
+    runtimes = [u.get_wall_time() for u in usages]
+    sorted_rts = sorted(runtimes)
+    median = sorted_rts[len(sorted_rts) // 2]
+    if median <= 0:
+      return True
+
+    spread = (sorted_rts[-1] - sorted_rts[0]) / median
+    if spread > LocalRunner.interference_threshold:
+      log.get_logger().log(
+          'LocalRunner::check_isolation: Runtimes of concurrent repetitions spread by ' + str(round(spread * 100, 1)) +
+          '%. The repetitions likely interfered with each other: ' + str(runtimes),
+          level='warn')
+      return False
+
+    return True
+
+  def needs_more_repetitions(self, usages: typing.List[ResourceUsage]) -> bool:
+    """ Decides whether the timings of the repetitions so far are too noisy. """
+    if not self.is_adaptive() or len(usages) < self._num_repetitions:
+      return len(usages) < self._num_repetitions
+
+    if len(usages) < 2:
+      return len(usages) < self._max_repetitions
+
+    rel_ci = ms.RunResult.from_usages(usages).get_relative_ci_width()
+    if rel_ci <= self._target_rel_ci:
+      log.get_logger().log(
+          'LocalRunner::needs_more_repetitions: Converged after ' + str(len(usages)) + ' repetitions (relative CI ' +
+          str(round(rel_ci, 4)) + ')',
+          level='debug')
+      return False
+
+    if len(usages) >= self._max_repetitions:
+      log.get_logger().log(
+          'LocalRunner::needs_more_repetitions: Relative CI ' + str(round(rel_ci, 4)) + ' still above target ' +
+          str(self._target_rel_ci) + ' after ' + str(len(usages)) + ' repetitions',
+          level='warn')
+      return False
+
+    return True
+
+  def _run_pinned(self, cpu_set: typing.List[int], target_config: TargetConfiguration,
+                  instrument_config: InstrumentConfig, compile_time_filtering: bool,
+                  context: ExecutionContext) -> ResourceUsage:
+    util.pin_current_thread(cpu_set)
+    return self.run(target_config, instrument_config, compile_time_filtering, context)
+
+  def _run_concurrently(self, cpu_sets: typing.List[typing.List[int]], target_config: TargetConfiguration,
+                        instrument_config: InstrumentConfig, compile_time_filtering: bool, exp_dir: str,
+                        first_rep: int, context: ExecutionContext) -> typing.List[ResourceUsage]:
+    # Every repetition writes its profile into its own Score-P experiment directory.
+    rep_dirs = [exp_dir] * len(cpu_sets)
+    if exp_dir is not None:
+      rep_dirs = [exp_dir if y == 0 else exp_dir + '-r' + str(y) for y in range(first_rep, first_rep + len(cpu_sets))]
+      for rep_dir in rep_dirs:
+        util.make_dirs(rep_dir)
+
+    log.get_logger().log('LocalRunner::run_repetitions: Running ' + str(len(cpu_sets)) +
+                         ' concurrent repetitions on CPU sets ' + str(cpu_sets))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(cpu_sets)) as pool:
+      futures = []
+      for cpu_set, rep_dir in zip(cpu_sets, rep_dirs):
+        rep_context = context
+        if rep_dir is not None:
+          rep_context = context.with_env({'SCOREP_EXPERIMENT_DIRECTORY': rep_dir})
+        # The context is copied, s.t. the spans of the repetition are nested into the current one
+        futures.append(
+            pool.submit(contextvars.copy_context().run, self._run_pinned, cpu_set, target_config, instrument_config,
+                        compile_time_filtering, rep_context))
+      usages = [f.result() for f in futures]
+
+    self.check_isolation(usages)
+    if exp_dir is not None:
+      for rep_dir in rep_dirs:
+        self._sink.process(rep_dir, target_config, instrument_config)
+
+    return usages
+
+  def run_repetitions(self,
+                      target_config: TargetConfiguration,
+                      instrument_config: InstrumentConfig,
+                      compile_time_filtering: bool,
+                      exp_dir: str = None,
+                      context: ExecutionContext = None) -> typing.List[ResourceUsage]:
+    """
+    Runs the target num_repetitions times, or until the runtimes converged in adaptive mode, and returns the
+    resource usage of the individual repetitions. If exp_dir is given, the profile of every repetition is handed
+    to the sink. The environment of context, e.g., the one of Score-P, is set for every repetition.
+    """
+    if context is None:
+      context = ExecutionContext()
+    cpu_sets = self.get_cpu_sets()
+    usages = []
+    if cpu_sets is None:
+      while self.needs_more_repetitions(usages):
+        log.get_logger().log('LocalRunner::run_repetitions: Running repetition ' + str(len(usages)), level='debug')
+        usages.append(self.run(target_config, instrument_config, compile_time_filtering, context))
+        if exp_dir is not None:
+          # Enable further processing of the resulting profile
+          self._sink.process(exp_dir, target_config, instrument_config)
+      if exp_dir is not None:
+        self._sink.flush()
+      return usages
+
+    # Load the functor before spawning threads
+    fm.FunctorManager().get_or_load_functor(target_config.get_build(), target_config.get_target(),
+                                            target_config.get_flavor(), 'run')
+    while self.needs_more_repetitions(usages):
+      batch_size = len(cpu_sets)
+      if len(usages) > 0:
+        batch_size = min(batch_size, self._max_repetitions - len(usages))
+      usages.extend(
+          self._run_concurrently(cpu_sets[:batch_size], target_config, instrument_config, compile_time_filtering,
+                                 exp_dir, len(usages), context))
+
+    if exp_dir is not None:
+      self._sink.flush()
+    return usages
 
   def do_baseline_run(self, target_config: TargetConfiguration) -> ms.RunResult:
     log.get_logger().log('LocalRunner::do_baseline_run')
-    accu_runtime = .0
 
     if not target_config.has_args_for_invocation():
       log.get_logger().log('LocalRunner::do_baseline_run: BEGIN not target_config.has_args_for_invocation()')
@@ -105,12 +306,12 @@ class LocalRunner(LocalBaseRunner):
       log.get_logger().log('LocalRunner::do_baseline_run: END not target_config.has_args_for_invocation()')
 
     # TODO Better evaluation of the obtained timings.
-    for y in range(0, self._num_repetitions):
-      log.get_logger().log('LocalRunner::do_baseline_run: Running iteration ' + str(y), level='debug')
-      accu_runtime += self.run(target_config, InstrumentConfig(), True)
-
-    run_result = ms.RunResult(accu_runtime, self._num_repetitions)
+    run_result = ms.RunResult.from_usages(self.run_repetitions(target_config, InstrumentConfig(), True))
     log.get_logger().log('[Vanilla][RUNTIME] Vanilla avg: ' + str(run_result.get_average()) + '\n', level='perf')
+    log.get_logger().log(
+        '[Vanilla][CPUTIME] Vanilla avg: ' + str(run_result.get_average_cpu_time()) + ' | max RSS (KiB): ' +
+        str(run_result.get_max_rss()),
+        level='perf')
 
     return run_result
 
@@ -123,22 +324,22 @@ class LocalRunner(LocalBaseRunner):
     scorep_helper = ms.ScorepSystemHelper(self._config)
     instrument_config = InstrumentConfig(True, instr_iteration)
     scorep_helper.set_up(target_config, instrument_config, compile_time_filtering)
-    runtime = .0
 
     if not target_config.has_args_for_invocation():
       # This runner only takes into account the first argument string (if not already set)
       args = self._config.get_args(target_config.get_build(), target_config.get_target())
       target_config.set_args_for_invocation(args[0])
 
-    for y in range(0, self._num_repetitions):
-      log.get_logger().log('LocalRunner::do_profile_run: Running instrumentation iteration ' + str(y), level='debug')
-      runtime = runtime + self.run(target_config, instrument_config, compile_time_filtering)
-      # Enable further processing of the resulting profile
-      self._sink.process(scorep_helper.get_exp_dir(), target_config, instrument_config)
+    usages = self.run_repetitions(target_config, instrument_config, compile_time_filtering,
+                                  scorep_helper.get_exp_dir(), ExecutionContext(env=scorep_helper.get_env()))
 
-    run_result = ms.RunResult(runtime, self._num_repetitions)
+    run_result = ms.RunResult.from_usages(usages)
     log.get_logger().log(
         '[Instrument][RUNTIME] $' + str(instr_iteration) + '$ ' + str(run_result.get_average()), level='perf')
+    log.get_logger().log(
+        '[Instrument][CPUTIME] $' + str(instr_iteration) + '$ ' + str(run_result.get_average_cpu_time()) +
+        ' | max RSS (KiB): ' + str(run_result.get_max_rss()),
+        level='perf')
     return run_result
 
 
@@ -149,11 +350,19 @@ class LocalScalingRunner(LocalRunner):
   the first string is the smallest input configuration, the second is the next larger configuration, etc.
   """
 
-  def __init__(self, configuration: PiraConfiguration, sink, num_repetitions: int = 5):
+  def __init__(self,
+               configuration: PiraConfiguration,
+               sink,
+               num_repetitions: int = 5,
+               concurrent_reps: bool = False,
+               cpus_per_rep: int = 0,
+               target_rel_ci: float = .0,
+               max_repetitions: int = 0):
     if num_repetitions < 0:
       log.get_logger().log('REMEMBER TO REMOVE IN LocalScalingRunner::__init__', level='warn')
       raise RuntimeError('At least 3 repetitions are required for Extra-P modelling.')
-    super().__init__(configuration, sink, num_repetitions)
+    super().__init__(configuration, sink, num_repetitions, concurrent_reps, cpus_per_rep, target_rel_ci,
+                     max_repetitions)
 
   def do_profile_run(self,
                      target_config: TargetConfiguration,
@@ -165,16 +374,33 @@ class LocalScalingRunner(LocalRunner):
     args = self._config.get_args(target_config.get_build(), target_config.get_target())
     # TODO: How to handle multiple MeasurementResult items? We get a vector of these after this function.
     run_result = ms.RunResult()
-    for arg_cfg in args:
+    for idx, arg_cfg in enumerate(args):
       # Call the runner method with the correct arguments.
       target_config.set_args_for_invocation(arg_cfg)
-      rr = super().do_profile_run(target_config, instr_iteration, compile_time_filtering)
+      phase = 'run-' + str(idx)
+      checkpoint = None
+      if self._checkpointer is not None:
+        checkpoint = self._checkpointer.load(target_config, phase, instr_iteration)
+
+      if checkpoint is not None:
+        rr = ms.RunResult.from_json(checkpoint['run_result'])
+        self._sink.set_state(checkpoint['sink'])
+      else:
+        rr = super().do_profile_run(target_config, instr_iteration, compile_time_filtering)
+        if self._checkpointer is not None:
+          self._checkpointer.save(target_config, phase, instr_iteration, {
+              'run_result': rr.to_json(),
+              'sink': self._sink.get_state()
+          })
       run_result.add_from(rr)
 
     # At this point we have all the data we need to construct an Extra-P model
 
     return run_result
 
+  def get_arg_configs(self, target_config: TargetConfiguration) -> typing.List:
+    return self._config.get_args(target_config.get_build(), target_config.get_target())
+
   def do_baseline_run(self, target_config: TargetConfiguration) -> ms.RunResult:
     log.get_logger().log('LocalScalingRunner::do_baseline_run')
     args = self._config.get_args(target_config.get_build(), target_config.get_target())
@@ -187,6 +413,194 @@ class LocalScalingRunner(LocalRunner):
     return run_result
 
 
-class SlurmRunner(Runner):
-  """  TODO This runner executes the measurements on a slurm allocated job. """
-  pass
+class SlurmTask:
+  """  One task of a Slurm job array: a single repetition of the target with one input configuration.  """
+
+  def __init__(self, command: str, cwd: str, env: typing.Dict[str, str] = None) -> None:
+    self._command = command
+    self._cwd = cwd
+    self._env = env if env is not None else {}
+
+  def get_command(self) -> str:
+    return self._command
+
+  def get_cwd(self) -> str:
+    return self._cwd
+
+  def get_env(self) -> typing.Dict[str, str]:
+    return self._env
+
+
+class SlurmRunner(LocalBaseRunner):
+  """
+  The SlurmRunner executes the measurements as Slurm jobs. All repetitions of all input configurations of a phase are
+  submitted as a single job array, i.e., they are scheduled by Slurm at once and may run concurrently on different
+  nodes. The runtimes are taken inside the job, so the queueing time is not measured.
+  With scaling, every argument string of the configuration is measured, as in the LocalScalingRunner. Otherwise,
+  only the first one is, as in the LocalRunner.
+  """
+
+  def __init__(self,
+               configuration: PiraConfiguration,
+               sink,
+               num_repetitions: int = 3,
+               scaling: bool = False,
+               sbatch_options: str = '',
+               poll_interval: float = 1.0,
+               max_poll_interval: float = 60.0):
+    super().__init__(configuration, sink)
+    self._num_repetitions = num_repetitions
+    self._scaling = scaling
+    self._sbatch_options = sbatch_options
+    self._poll_interval = poll_interval
+    self._max_poll_interval = max_poll_interval
+
+  def get_measurement_settings(self) -> str:
+    settings = 'reps=' + str(self._num_repetitions) + ',sbatch=' + self._sbatch_options
+    return super().get_measurement_settings() + ':' + settings
+
+  def get_arg_configs(self, target_config: TargetConfiguration) -> typing.List:
+    if not self._scaling and target_config.has_args_for_invocation():
+      return [target_config.get_args_for_invocation()]
+
+    args = self._config.get_args(target_config.get_build(), target_config.get_target())
+    if self._scaling:
+      return args
+    return args[:1]
+
+  def get_result_file(self, work_dir: str, task_id: int) -> str:
+    return os.path.join(work_dir, 'task-' + str(task_id) + '.result')
+
+  def write_job_script(self, script_file: str, work_dir: str, tasks: typing.List[SlurmTask]) -> None:
+    """
+    Every task changes into its directory, sets its environment and times the command. Its exit status and runtime
+    in nanoseconds are written to its result file.
+    """
+    lines = ['#!/usr/bin/env bash', 'case "$SLURM_ARRAY_TASK_ID" in']
+    for task_id, task in enumerate(tasks):
+      result_file = shlex.quote(self.get_result_file(work_dir, task_id))
+      lines.append(str(task_id) + ')')
+      lines.append('  cd ' + shlex.quote(task.get_cwd()) + ' || exit 1')
+      for key, value in sorted(task.get_env().items()):
+        lines.append('  export ' + key + '=' + shlex.quote(value))
+      lines.append('  pira_start=$(date +%s%N)')
+      lines.append('  ' + task.get_command())
+      lines.append('  pira_status=$?')
+      lines.append('  pira_end=$(date +%s%N)')
+      lines.append('  echo "$pira_status $((pira_end - pira_start))" > ' + result_file + '.tmp')
+      lines.append('  mv ' + result_file + '.tmp ' + result_file)
+      lines.append('  exit $pira_status')
+      lines.append('  ;;')
+    lines.append('*)')
+    lines.append('  exit 1')
+    lines.append('  ;;')
+    lines.append('esac')
+    util.write_file(script_file, '\n'.join(lines) + '\n')
+
+  def submit_array(self, work_dir: str, tasks: typing.List[SlurmTask]) -> bat_sys.SlurmJobArray:
+    util.make_dirs(work_dir)
+    for task_id in range(len(tasks)):
+      util.remove_file(self.get_result_file(work_dir, task_id))
+
+    script_file = os.path.join(work_dir, 'pira-job-array.sh')
+    self.write_job_script(script_file, work_dir, tasks)
+    job = bat_sys.SlurmJobArray(script_file, len(tasks), self._sbatch_options, self._poll_interval,
+                                self._max_poll_interval)
+    job.submit()
+    return job
+
+  def run_array(self, work_dir: str, tasks: typing.List[SlurmTask]) -> typing.List[ResourceUsage]:
+    """ Runs all tasks as one job array and returns their resource usage, in the order of tasks. """
+    job = self.submit_array(work_dir, tasks)
+    return self.get_usages(work_dir, tasks, job, job.wait())
+
+  def get_usages(self, work_dir: str, tasks: typing.List[SlurmTask], job: bat_sys.SlurmJobArray,
+                 states: typing.Dict[int, str]) -> typing.List[ResourceUsage]:
+    """ The wall time is the one of the command, the other resources the ones of the task, as Slurm accounts them """
+    task_usages = job.get_task_usages()
+    usages = []
+    for task_id in range(len(tasks)):
+      result_file = self.get_result_file(work_dir, task_id)
+      if not util.is_file(result_file):
+        raise RuntimeError('SlurmRunner::run_array: Task ' + str(task_id) + ' of job array ' + job.get_job_id() +
+                           ' did not run to completion. State: ' + states.get(task_id, 'UNKNOWN'))
+
+      with open(result_file) as f:
+        status, wall_time_ns = f.read().split()
+      if int(status) != 0:
+        raise RuntimeError('SlurmRunner::run_array: Task ' + str(task_id) + ' of job array ' + job.get_job_id() +
+                           ' returned non-zero exit status ' + status)
+      # Left unset if the accounting does not know the task
+      user_time, sys_time, max_rss = task_usages.get(task_id, (.0, .0, 0))
+      usages.append(ResourceUsage(int(wall_time_ns), user_time, sys_time, max_rss))
+
+    return usages
+
+  def measure(self,
+              target_config: TargetConfiguration,
+              instrument_config: InstrumentConfig,
+              exp_dir: str = None,
+              env: typing.Dict[str, str] = None) -> ms.RunResult:
+    """
+    Measures all argument configurations with num_repetitions repetitions in one job array. The env entries are set
+    for every task. If exp_dir is given, every task writes its profile into its own experiment directory, which is
+    handed to the sink afterwards.
+    The last task writes to exp_dir itself, which thus holds the profile of the last configuration, as locally.
+    """
+    arg_cfgs = self.get_arg_configs(target_config)
+    tasks = []
+    exp_dirs = []
+    num_tasks = len(arg_cfgs) * self._num_repetitions
+    for arg_cfg in arg_cfgs:
+      target_config.set_args_for_invocation(arg_cfg)
+      command = self.get_run_command(target_config)
+      for _ in range(self._num_repetitions):
+        task_env = dict(env) if env is not None else {}
+        task_exp_dir = None
+        if exp_dir is not None:
+          task_exp_dir = exp_dir
+          if len(tasks) < num_tasks - 1:
+            task_exp_dir = exp_dir + '-t' + str(len(tasks))
+          util.make_dirs(task_exp_dir)
+          task_env['SCOREP_EXPERIMENT_DIRECTORY'] = task_exp_dir
+        exp_dirs.append(task_exp_dir)
+        tasks.append(SlurmTask(command, target_config.get_place(), task_env))
+
+    phase = 'vanilla'
+    if instrument_config.is_instrumentation_run():
+      phase = 'i' + str(instrument_config.get_instrumentation_iteration())
+    work_dir = os.path.join(target_config.get_place(), '.pira-slurm',
+                            target_config.get_flavor() + '-' + target_config.get_target() + '-' + phase)
+    usages = self.run_array(work_dir, tasks)
+
+    run_result = ms.RunResult()
+    for idx, arg_cfg in enumerate(arg_cfgs):
+      target_config.set_args_for_invocation(arg_cfg)
+      first = idx * self._num_repetitions
+      run_result.add_from(ms.RunResult.from_usages(usages[first:first + self._num_repetitions]))
+      if exp_dir is not None:
+        for task_exp_dir in exp_dirs[first:first + self._num_repetitions]:
+          self._sink.process(task_exp_dir, target_config, instrument_config)
+        self._sink.flush()
+
+    return run_result
+
+  def do_baseline_run(self, target_config: TargetConfiguration) -> ms.RunResult:
+    log.get_logger().log('SlurmRunner::do_baseline_run')
+    run_result = self.measure(target_config, InstrumentConfig())
+    log.get_logger().log('[Vanilla][RUNTIME] Vanilla avg: ' + str(run_result.get_average()) + '\n', level='perf')
+    return run_result
+
+  def do_profile_run(self,
+                     target_config: TargetConfiguration,
+                     instr_iteration: int,
+                     compile_time_filtering: bool = True) -> ms.RunResult:
+    log.get_logger().log('SlurmRunner::do_profile_run')
+    scorep_helper = ms.ScorepSystemHelper(self._config)
+    instrument_config = InstrumentConfig(True, instr_iteration)
+    scorep_helper.set_up(target_config, instrument_config, compile_time_filtering)
+
+    run_result = self.measure(target_config, instrument_config, scorep_helper.get_exp_dir(), scorep_helper.get_env())
+    log.get_logger().log(
+        '[Instrument][RUNTIME] $' + str(instr_iteration) + '$ ' + str(run_result.get_average()), level='perf')
+    return run_result
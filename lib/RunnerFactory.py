@@ -9,8 +9,8 @@ sys.path.append('..')
 
 from lib.Configuration import PiraConfiguration, ExtrapConfiguration, InvocationConfiguration
 from lib.Configuration import PiraConfigurationII, PiraConfigurationAdapter
-from lib.Runner import LocalRunner, LocalScalingRunner
-from lib.ProfileSink import NopSink, ExtrapProfileSink, PiraOneProfileSink
+from lib.Runner import LocalRunner, LocalScalingRunner, SlurmRunner
+from lib.ProfileSink import NopSink, ExtrapProfileSink, ExtrapSummaryProfileSink, PiraOneProfileSink
 import lib.Logging as log
 
 
@@ -21,7 +21,18 @@ class PiraRunnerFactory:
     self._invoc_cfg = invocation_cfg
 
   def get_simple_local_runner(self):
-    return LocalRunner(self._config, PiraOneProfileSink(), self._invoc_cfg.get_num_repetitions())
+    return LocalRunner(self._config, PiraOneProfileSink(), self._invoc_cfg.get_num_repetitions(),
+                       self._invoc_cfg.is_concurrent_repetitions(), self._invoc_cfg.get_cpus_per_repetition(),
+                       self._invoc_cfg.get_target_relative_ci(), self._invoc_cfg.get_max_repetitions())
+
+  def get_slurm_runner(self, sink=None):
+    """ The sink of a scalability runner makes the SlurmRunner measure all input configurations """
+    if sink is None:
+      return SlurmRunner(self._config, PiraOneProfileSink(), self._invoc_cfg.get_num_repetitions(), False,
+                         self._invoc_cfg.get_sbatch_options())
+
+    return SlurmRunner(self._config, sink, self._invoc_cfg.get_num_repetitions(), True,
+                       self._invoc_cfg.get_sbatch_options())
 
   def get_scalability_runner(self, extrap_config: ExtrapConfiguration):
     pc_ii = None
@@ -51,6 +62,14 @@ class PiraRunnerFactory:
     if params is None:
       raise RuntimeError('PiraRunnerFactory::get_scalability_runner: Cannot use extra-p with old configuration')
 
-    attached_sink = ExtrapProfileSink(extrap_config.get_dir(), ro.get_argmap(), extrap_config.get_prefix(), 'pofi',
-                                      'profile.cubex', self._invoc_cfg.get_num_repetitions())
-    return LocalScalingRunner(self._config, attached_sink, self._invoc_cfg.get_num_repetitions())
+    # In adaptive mode, at least get_num_repetitions() profiles exist for every configuration.
+    if extrap_config.is_summarize():
+      attached_sink = ExtrapSummaryProfileSink(extrap_config.get_dir(), ro.get_argmap(), extrap_config.get_prefix(),
+                                               'pofi', 'profile.cubex', self._invoc_cfg.get_num_repetitions(),
+                                               link=extrap_config.is_link())
+    else:
+      attached_sink = ExtrapProfileSink(extrap_config.get_dir(), ro.get_argmap(), extrap_config.get_prefix(), 'pofi',
+                                        'profile.cubex', self._invoc_cfg.get_num_repetitions(), extrap_config.is_link())
+    return LocalScalingRunner(self._config, attached_sink, self._invoc_cfg.get_num_repetitions(),
+                              self._invoc_cfg.is_concurrent_repetitions(), self._invoc_cfg.get_cpus_per_repetition(),
+                              self._invoc_cfg.get_target_relative_ci(), self._invoc_cfg.get_max_repetitions())
@@ -0,0 +1,230 @@
+"""
+File: Scheduling.py
+License: Part of the PIRA project. Licensed under BSD 3 clause license. See LICENSE.txt file at https://github.com/jplehr/pira/LICENSE.txt
+Description: Module to execute independent targets concurrently.
+"""
+
+import sys
+sys.path.append('..')
+
+import lib.Utility as util
+import lib.Logging as log
+import lib.TimeTracking as tt
+import lib.DefaultFlags as defaults
+import lib.Database as database
+from lib.Configuration import TargetConfiguration
+from lib.Exception import PiraException
+
+import concurrent.futures
+import contextlib
+import multiprocessing
+import shutil
+import tempfile
+import time
+import typing
+
+
+class SchedulingException(PiraException):
+
+  def __init__(self, message):
+    super().__init__(message)
+
+
+class ResourcePools:
+  """
+  Limits how many targets use a class of resources at the same time: 'compile' slots for the (instrumented) builds
+  and 'measure' slots for the baseline and profile runs. With fewer measurement slots than jobs, the targets of the
+  ParallelTargetScheduler form a pipeline: one target is built or analyzed while another one is measured, but no
+  two measurements compete for the cores. A pool of 0 slots is unlimited.
+  The pools are process-shared semaphores, which the forked worker processes inherit.
+  """
+
+  resource_classes = ('compile', 'measure')
+
+  def __init__(self, compile_slots: int = 0, measure_slots: int = 0) -> None:
+    context = multiprocessing.get_context('fork')
+    self._slots = {'compile': compile_slots, 'measure': measure_slots}
+    self._semaphores = {}
+    for resource_class, slots in self._slots.items():
+      if slots < 0:
+        raise SchedulingException('ResourcePools: Negative number of ' + resource_class + ' slots')
+      if slots > 0:
+        self._semaphores[resource_class] = context.BoundedSemaphore(slots)
+
+  def get_slots(self, resource_class: str) -> int:
+    return self._slots[resource_class]
+
+  @contextlib.contextmanager
+  def slot(self, resource_class: str):
+    if resource_class not in ResourcePools.resource_classes:
+      raise SchedulingException('ResourcePools::slot: Unknown resource class ' + resource_class)
+
+    semaphore = self._semaphores.get(resource_class)
+    if semaphore is None:
+      yield
+      return
+
+    start = time.time()
+    semaphore.acquire()
+    log.get_logger().log(
+        'ResourcePools::slot: Waited ' + str(round(time.time() - start, 3)) + 's for a ' + resource_class + ' slot',
+        level='debug')
+    try:
+      yield
+    finally:
+      semaphore.release()
+
+
+_resource_pools = ResourcePools()
+
+
+def set_resource_pools(pools: ResourcePools) -> None:
+  """ Must be called before the worker processes are forked """
+  global _resource_pools
+  _resource_pools = pools
+
+
+def resource_slot(resource_class: str):
+  """ Context manager that holds a slot of resource_class of the current resource pools """
+  return _resource_pools.slot(resource_class)
+
+
+# The worker processes are forked, i.e., they inherit this state and nothing needs to be pickled.
+_worker_state = None
+
+
+def get_target_tag(target_config: TargetConfiguration) -> str:
+  return target_config.get_target() + '/' + target_config.get_flavor()
+
+
+def _execute_lane(lane_id: int, indices: typing.List[int]) -> typing.List[typing.Tuple]:
+  """
+  Runs all targets of one lane, one after the other, inside a worker process.
+  Every worker process has its own working directory, environment and logger, so nothing leaks between lanes.
+  """
+  execute_fn, target_configs = _worker_state
+
+  # Scratch files, e.g., the generated MPI filter wrapper, must not be shared between lanes.
+  lane_dir = tempfile.mkdtemp(prefix='pira-lane-' + str(lane_id) + '-')
+  defaults.BackendDefaults().set_wrap_dir(lane_dir)
+  # A SQLite connection must not be used across fork.
+  if database.DBManager.instance is not None:
+    database.DBManager.instance.reconnect()
+
+  try:
+    results = []
+    for idx in indices:
+      target_config = target_configs[idx]
+      logger = log.get_logger()
+      logger.reset_tape()
+      tt.get_tracer().reset()
+      util.change_cwd(util.get_home_dir())
+      error = None
+      try:
+        execute_fn(target_config)
+      except Exception as e:
+        error = str(e)
+
+      results.append((idx, logger.tape, logger.perf_tape, tt.get_tracer().get_spans(), error))
+
+    if database.DBManager.instance is not None:
+      database.DBManager.instance.flush()
+    return results
+
+  finally:
+    shutil.rmtree(lane_dir, ignore_errors=True)
+
+
+class ParallelTargetScheduler:
+  """
+  Executes TargetConfigurations concurrently in a pool of worker processes.
+  Targets that share a build directory, a Score-P experiment directory or a profile sink directory are not
+  independent. These are grouped into the same lane and run serially within that lane.
+  """
+
+  def __init__(self, num_jobs: int, configuration, runner) -> None:
+    if num_jobs < 1:
+      raise SchedulingException('ParallelTargetScheduler: At least one job is required.')
+    self._num_jobs = num_jobs
+    self._config = configuration
+    self._runner = runner
+
+  def get_resource_keys(self, target_config: TargetConfiguration) -> typing.List[typing.Tuple[str, str]]:
+    build = target_config.get_build()
+    item = target_config.get_target()
+    keys = [('place', target_config.get_place()),
+            ('exp_dir', self._config.get_analyser_exp_dir(build, item) + '-' + target_config.get_flavor())]
+
+    if self._runner.has_sink():
+      sink_dir = self._runner.get_sink().get_shared_directory()
+      if sink_dir is not None:
+        keys.append(('sink', sink_dir))
+
+    return keys
+
+  def partition_into_lanes(self, target_configs: typing.List[TargetConfiguration]) -> typing.List[typing.List[int]]:
+    lanes = []
+    lane_of_key = {}
+    for idx, target_config in enumerate(target_configs):
+      keys = self.get_resource_keys(target_config)
+      lane_ids = sorted(set([lane_of_key[k] for k in keys if k in lane_of_key]))
+
+      if len(lane_ids) == 0:
+        lane_id = len(lanes)
+        lanes.append([idx])
+      else:
+        # Merge all lanes this target depends on into the first one.
+        lane_id = lane_ids[0]
+        lanes[lane_id].append(idx)
+        for other in lane_ids[1:]:
+          lanes[lane_id].extend(lanes[other])
+          lanes[other] = []
+          for k in lane_of_key:
+            if lane_of_key[k] == other:
+              lane_of_key[k] = lane_id
+
+      for k in keys:
+        lane_of_key[k] = lane_id
+
+    return [sorted(lane) for lane in lanes if len(lane) > 0]
+
+  def execute(self, execute_fn, target_configs: typing.List[TargetConfiguration]) -> None:
+    """
+    Runs execute_fn for every target configuration and merges the per-target logs into the global logger, and the
+    per-target spans into the global tracer.
+
+    :execute_fn: callable that is invoked with a single TargetConfiguration
+    :target_configs: the targets to execute
+    """
+    global _worker_state
+    lanes = self.partition_into_lanes(target_configs)
+    num_workers = min(self._num_jobs, len(lanes))
+    log.get_logger().log(
+        'ParallelTargetScheduler::execute: ' + str(len(target_configs)) + ' targets in ' + str(len(lanes)) +
+        ' independent lanes using ' + str(num_workers) + ' processes',
+        level='info')
+
+    _worker_state = (execute_fn, target_configs)
+    results = []
+    try:
+      context = multiprocessing.get_context('fork')
+      with concurrent.futures.ProcessPoolExecutor(max_workers=num_workers, mp_context=context) as pool:
+        futures = [pool.submit(_execute_lane, lane_id, lane) for lane_id, lane in enumerate(lanes)]
+        for future in futures:
+          results.extend(future.result())
+
+    finally:
+      _worker_state = None
+
+    # Merge in the original target order, so the tape reads as if run serially.
+    failed = []
+    for idx, tape, perf_tape, spans, error in sorted(results, key=lambda r: r[0]):
+      tag = get_target_tag(target_configs[idx])
+      log.get_logger().merge_tape(tape, perf_tape, tag)
+      tt.get_tracer().merge(spans)
+      if error is not None:
+        log.get_logger().log('ParallelTargetScheduler::execute: ' + tag + ' failed: ' + error, level='error')
+        failed.append(tag)
+
+    if len(failed) > 0:
+      raise RuntimeError('ParallelTargetScheduler: Execution failed for ' + ', '.join(failed))
@@ -0,0 +1,125 @@
+"""
+File: SelectiveBuild.py
+License: Part of the PIRA project. Licensed under BSD 3 clause license. See LICENSE.txt file at https://github.com/jplehr/pira/LICENSE.txt
+Description: Module to determine the translation units that need recompilation after the whitelist changed.
+"""
+
+import sys
+sys.path.append('..')
+
+import lib.Utility as util
+import lib.Logging as log
+
+import json
+import os
+import typing
+
+
+class TranslationUnitInvalidator:
+  """
+  Uses the source file information of the call graph (the meta.fileProperties.origin field of every function in
+  the .ipcg file) to find the object files that contain a function whose instrumentation status changed.
+  If this cannot be decided reliably, e.g., a function is defined in a header or unknown, None is returned and
+  the target needs a full rebuild.
+  """
+
+  # State of the last instrumented build in the target directory. Hidden, thus not part of the source hash.
+  state_file_name = '.pira-build-state.json'
+
+  source_exts = ('.c', '.cc', '.cpp', '.cxx', '.c++', '.C', '.f', '.f90', '.F', '.F90')
+
+  def __init__(self, call_graph_file: str) -> None:
+    self._cg_file = call_graph_file
+    self._origins = None
+
+  def get_origins(self) -> typing.Dict[str, str]:
+    """ Maps function names to the source file they are defined in. """
+    if self._origins is None:
+      self._origins = {}
+      with open(self._cg_file) as cg_file:
+        call_graph = json.load(cg_file)
+
+      for function, node in call_graph.items():
+        try:
+          origin = node['meta']['fileProperties']['origin']
+        except (KeyError, TypeError):
+          continue
+        if origin is not None and origin != 'unknownOrigin':
+          self._origins[function] = origin
+
+    return self._origins
+
+  def get_changed_sources(self, old_functions: typing.Set[str],
+                          new_functions: typing.Set[str]) -> typing.Optional[typing.Set[str]]:
+    changed = old_functions.symmetric_difference(new_functions)
+    origins = self.get_origins()
+    sources = set()
+    for function in changed:
+      if function not in origins:
+        log.get_logger().log(
+            'TranslationUnitInvalidator::get_changed_sources: No source file for ' + function, level='debug')
+        return None
+
+      origin = origins[function]
+      if not origin.endswith(TranslationUnitInvalidator.source_exts):
+        log.get_logger().log(
+            'TranslationUnitInvalidator::get_changed_sources: ' + function + ' is defined in ' + origin +
+            ', which may be part of many translation units',
+            level='debug')
+        return None
+      sources.add(origin)
+
+    return sources
+
+  def find_objects(self, directory: str, sources: typing.Set[str]) -> typing.Optional[typing.List[str]]:
+    """ Finds the object file of every source, named either file.o (make) or file.cpp.o (CMake). """
+    objects_by_name = {}
+    for root, dirs, files in os.walk(directory):
+      dirs[:] = [d for d in dirs if not d.startswith('.')]
+      for file_name in files:
+        if file_name.endswith('.o'):
+          objects_by_name.setdefault(file_name, []).append(os.path.join(root, file_name))
+
+    objects = []
+    for source in sorted(sources):
+      base_name = os.path.basename(source)
+      candidates = objects_by_name.get(os.path.splitext(base_name)[0] + '.o', []) + objects_by_name.get(
+          base_name + '.o', [])
+      if len(candidates) == 0:
+        log.get_logger().log('TranslationUnitInvalidator::find_objects: No object file for ' + source, level='debug')
+        return None
+      objects.extend(candidates)
+
+    return objects
+
+  def get_objects_to_invalidate(self, directory: str, build_command: str,
+                                instr_file: str) -> typing.Optional[typing.List[str]]:
+    """
+    Returns the object files in directory to remove before building with instr_file, or None if a full rebuild is
+    needed. The objects in directory must stem from the last instrumented build recorded by record_build.
+    """
+    state_file = os.path.join(directory, TranslationUnitInvalidator.state_file_name)
+    if not util.is_file(state_file) or not util.is_file(self._cg_file):
+      return None
+
+    with open(state_file) as f:
+      state = json.load(f)
+    if state['build_command'] != build_command:
+      return None
+
+    sources = self.get_changed_sources(set(state['whitelist']), util.get_whitelisted_functions(instr_file))
+    if sources is None:
+      return None
+
+    return self.find_objects(directory, sources)
+
+  @classmethod
+  def record_build(cls, directory: str, build_command: str, instr_file: str) -> None:
+    state = {'build_command': build_command, 'whitelist': sorted(util.get_whitelisted_functions(instr_file))}
+    with open(os.path.join(directory, cls.state_file_name), 'w') as f:
+      json.dump(state, f)
+
+  @classmethod
+  def forget_build(cls, directory: str) -> None:
+    """ The object files in directory are not the ones of the last instrumented build anymore. """
+    util.remove_file(os.path.join(directory, cls.state_file_name))
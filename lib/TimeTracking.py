@@ -1,12 +1,20 @@
 """
 File: TimeTracking.py
 License: Part of the PIRA project. Licensed under BSD 3 clause license. See LICENSE.txt file at https://github.com/jplehr/pira/LICENSE.txt
-Description: This module allows to track timings of the various bits and pieces with convenience functions.
+Description: This module allows to track timings of the various bits and pieces with convenience functions, and to trace the phases of a campaign as nested spans.
 """
 
 import os
 import lib.Logging as log
 
+import contextlib
+import contextvars
+import itertools
+import json
+import threading
+import time
+import typing
+
 
 class TimeTracker():
   """
@@ -15,13 +23,16 @@ class TimeTracker():
   def __init__(self):
     self._s = os.times()
     self._e = self._s
+    self._s_wall = time.perf_counter()
+    self._e_wall = self._s_wall
 
   def f_track(self, sec_name, function, *args):
     self._start()
     res = function(*args)
     self.stop()
     time_tuple = self.get_time()
-    log.get_logger().log(sec_name + ' took %.3f seconds' % time_tuple[0], level='perf')
+    log.get_logger().log(
+        sec_name + ' took %.3f seconds' % time_tuple[0] + ' | wall %.3f seconds' % self.get_wall_time(), level='perf')
     return (res, time_tuple)
 
   def m_track(self, sec_name, obj, method_name, *args):
@@ -30,19 +41,26 @@ class TimeTracker():
     res = obj_method(*args)
     self.stop()
     time_tuple = self.get_time()
-    log.get_logger().log(sec_name + ' took %.3f seconds' % time_tuple[0], level='perf')
+    log.get_logger().log(
+        sec_name + ' took %.3f seconds' % time_tuple[0] + ' | wall %.3f seconds' % self.get_wall_time(), level='perf')
     return (res, time_tuple)
 
   def get_time(self):
+    """ User and system CPU time of the child processes that finished, and were waited for, in the tracked section """
     u_time = self._e[2] - self._s[2]
     s_time = self._e[3] - self._s[3]
     return (u_time, s_time)
 
+  def get_wall_time(self) -> float:
+    return self._e_wall - self._s_wall
+
   def _start(self):
     self._s = os.times()
+    self._s_wall = time.perf_counter()
 
   def stop(self):
     self._e = os.times()
+    self._e_wall = time.perf_counter()
 
   def _get_callable(self, obj, name):
     try:
@@ -52,3 +70,163 @@ class TimeTracker():
       log.get_logger().log('No such attribute', level='error')
       raise e
     
+
+
+class Span:
+  """
+  A traced section: its wall-clock start and end, and the CPU time of the commands run within it. The CPU time is
+  the one of the commands' own resource usage, summed up from the subprocess spans to their ancestors, s.t.
+  commands of concurrently processed targets are not attributed to each other.
+  Spans nest, e.g., campaign -> target -> iteration -> phase -> subprocess. The track groups the spans of a target.
+  """
+
+  def __init__(self, span_id: str, parent_id: typing.Optional[str], name: str, category: str, track: int,
+               attributes: typing.Dict) -> None:
+    self._id = span_id
+    self._parent_id = parent_id
+    self._name = name
+    self._category = category
+    self._track = track
+    self._attributes = attributes
+    self._pid = os.getpid()
+    self._start_ns = time.time_ns()
+    self._end_ns = None
+    self._child_user_time = .0
+    self._child_sys_time = .0
+
+  def finish(self) -> None:
+    self._end_ns = time.time_ns()
+
+  def add_child_cpu_time(self, user_time: float, sys_time: float) -> None:
+    self._child_user_time += user_time
+    self._child_sys_time += sys_time
+
+  def get_id(self) -> str:
+    return self._id
+
+  def get_parent_id(self) -> typing.Optional[str]:
+    return self._parent_id
+
+  def get_name(self) -> str:
+    return self._name
+
+  def get_category(self) -> str:
+    return self._category
+
+  def get_track(self) -> int:
+    return self._track
+
+  def get_attributes(self) -> typing.Dict:
+    return self._attributes
+
+  def get_wall_time(self) -> float:
+    return (self._end_ns - self._start_ns) / 1e9
+
+  def get_child_cpu_time(self) -> typing.Tuple[float, float]:
+    return (self._child_user_time, self._child_sys_time)
+
+  def to_trace_event(self) -> typing.Dict:
+    """ A complete event of the Chrome trace event format, times in microseconds """
+    args = dict(self._attributes)
+    args.update({'child_user_time': self._child_user_time, 'child_sys_time': self._child_sys_time})
+    return {
+        'name': self._name,
+        'cat': self._category,
+        'ph': 'X',
+        'ts': self._start_ns / 1e3,
+        'dur': (self._end_ns - self._start_ns) / 1e3,
+        'pid': self._pid,
+        'tid': self._track,
+        'args': args
+    }
+
+
+# The innermost open span of the current thread or asyncio task
+_current_span = contextvars.ContextVar('pira_current_span', default=None)
+
+
+class Tracer:
+  """
+  Records spans if enabled, otherwise span() does nothing. The current span is a context variable, thus spans nest
+  correctly across threads and the coroutines of an event loop. Every target span starts a new track.
+  Forked worker processes record their own spans, which are merged into the parent's tracer.
+  """
+
+  def __init__(self) -> None:
+    self._enabled = False
+    self._spans = []
+    self._ids = itertools.count()
+    self._tracks = itertools.count(1)
+    self._lock = threading.Lock()
+
+  def enable(self) -> None:
+    self._enabled = True
+
+  def is_enabled(self) -> bool:
+    return self._enabled
+
+  def reset(self) -> None:
+    self._spans = []
+
+  def get_spans(self) -> typing.List[Span]:
+    return self._spans
+
+  def merge(self, spans: typing.List[Span]) -> None:
+    """ The CPU time of spans started in the current span, e.g., in a forked worker process, is added to it """
+    current = _current_span.get()
+    with self._lock:
+      self._spans.extend(spans)
+      if current is not None:
+        for span in spans:
+          if span.get_parent_id() == current.get_id():
+            current.add_child_cpu_time(*span.get_child_cpu_time())
+
+  @contextlib.contextmanager
+  def span(self, name: str, category: str = 'phase', **attributes):
+    if not self._enabled:
+      yield None
+      return
+
+    parent = _current_span.get()
+    with self._lock:
+      span_id = str(os.getpid()) + '-' + str(next(self._ids))
+      track = next(self._tracks) if parent is None or category == 'target' else parent.get_track()
+    span = Span(span_id, None if parent is None else parent.get_id(), name, category, track, attributes)
+    token = _current_span.set(span)
+    try:
+      yield span
+    finally:
+      span.finish()
+      _current_span.reset(token)
+      with self._lock:
+        if parent is not None:
+          parent.add_child_cpu_time(*span.get_child_cpu_time())
+        self._spans.append(span)
+
+  def to_chrome_trace(self) -> typing.Dict:
+    events = []
+    for span in self._spans:
+      if span.get_category() == 'target':
+        events.append({
+            'name': 'thread_name',
+            'ph': 'M',
+            'pid': span.to_trace_event()['pid'],
+            'tid': span.get_track(),
+            'args': {
+                'name': span.get_name()
+            }
+        })
+      events.append(span.to_trace_event())
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+  def export_chrome_trace(self, out_file: str) -> None:
+    """ Writes the spans as Chrome trace event JSON, e.g., for chrome://tracing or Perfetto """
+    with open(out_file, 'w') as f:
+      json.dump(self.to_chrome_trace(), f)
+
+
+tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+  return tracer
@@ -7,15 +7,21 @@ Description: Module to support other tasks.
 import sys
 sys.path.append('..')
 from lib.Exception import PiraException
+import lib.ProcessEngine as pe
 import os
 import subprocess
 import lib.Logging as log
+import lib.TimeTracking as tt
 import filecmp
 from random import choice
 from string import ascii_uppercase
 from timeit import timeit
 import shutil
 import tempfile
+import hashlib
+import platform
+import fcntl
+import threading
 
 import typing
 
@@ -45,7 +51,7 @@ def get_cwd() -> str:
 
 
 def change_cwd(path: str) -> None:
-  log.get_logger().log('Utility::change_cwd: to ' + path, level='debug')
+  log.get_logger().log('Utility::change_cwd: to %s', path, level='debug')
   os.chdir(path)
 
 
@@ -57,10 +63,66 @@ def read_file(file_name: str) -> str:
 
 
 def copy_file(source_file: str, target_file: str) -> None:
-  log.get_logger().log('Utility::copy_file: ' + source_file + ' -to- ' + target_file)
+  log.get_logger().log('Utility::copy_file: %s -to- %s', source_file, target_file)
   shutil.copyfile(source_file, target_file)
 
 
+# Linux ioctl to share the extents of a file, supported by, e.g., Btrfs and XFS
+FICLONE = 0x40049409
+
+# In the order they are tried by archive_file. Only 'link' does not create a new file.
+copy_strategies = ('link', 'reflink', 'copy_file_range', 'sendfile', 'copy')
+
+
+def _copy_file_with(strategy: str, source_file: str, target_file: str) -> None:
+  if strategy == 'link':
+    os.link(source_file, target_file)
+    return
+  if strategy == 'copy':
+    shutil.copyfile(source_file, target_file)
+    return
+
+  with open(source_file, 'rb') as src, open(target_file, 'wb') as dst:
+    if strategy == 'reflink':
+      fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+      return
+
+    remaining = os.fstat(src.fileno()).st_size
+    while remaining > 0:
+      if strategy == 'copy_file_range':
+        copied = os.copy_file_range(src.fileno(), dst.fileno(), remaining)
+      else:
+        copied = os.sendfile(dst.fileno(), src.fileno(), None, remaining)
+      if copied == 0:
+        raise OSError('Utility::_copy_file_with: ' + source_file + ' shrank while copying')
+      remaining -= copied
+
+
+def archive_file(source_file: str, target_file: str, strategies: typing.Sequence[str] = copy_strategies) -> str:
+  """
+  Places source_file at target_file with the first of strategies the file system supports, avoiding to copy the
+  bytes through user space. Returns the strategy used. The last strategy's error is raised if all fail.
+  """
+  for idx, strategy in enumerate(strategies):
+    if strategy not in copy_strategies:
+      raise PiraException('Utility::archive_file: Unknown copy strategy ' + strategy)
+    if strategy in ('copy_file_range', 'sendfile') and not hasattr(os, strategy):
+      continue
+
+    try:
+      _copy_file_with(strategy, source_file, target_file)
+      log.get_logger().log('Utility::archive_file: %s %s -to- %s', strategy, source_file, target_file)
+      return strategy
+    except OSError as e:
+      if strategy != 'link':
+        remove_file(target_file)
+      if idx == len(strategies) - 1:
+        raise
+      log.get_logger().log('Utility::archive_file: %s failed: %s', strategy, e, level='debug')
+
+  raise PiraException('Utility::archive_file: No copy strategy available for ' + source_file)
+
+
 
 def lines_in_file(file_name: str) -> int:
   if is_file(file_name):
@@ -112,7 +174,7 @@ def make_dirs(path):
   os.makedirs(path,0o777,True)
 
 def write_file(file_path: str, file_content: str) -> str:
-  log.get_logger().log('Utility::write_file: file_path to write: ' + file_path)
+  log.get_logger().log('Utility::write_file: file_path to write: %s', file_path)
   with open(file_path, 'w+') as out_file:
     out_file.write(file_content)
 
@@ -204,85 +266,340 @@ def diff_inst_files(file1: str, file2: str) -> bool:
   return False
 
 
+# --- Hashing / Fingerprints --- #
+
+# Files that are build products, not inputs of a build.
+build_product_exts = ('.o', '.a', '.so', '.gch', '.pch', '.cubex', '.pyc')
+
+# Files that are inputs of a build, if the target directory is no git work tree.
+source_exts = ('.c', '.h', '.cc', '.cpp', '.cxx', '.c++', '.hh', '.hpp', '.hxx', '.h++', '.inc', '.ipp', '.tpp', '.f',
+               '.for', '.f77', '.f90', '.f95', '.f03', '.f08', '.F', '.F90', '.cu', '.cuh', '.cmake', '.mk', '.in',
+               '.am', '.ac')
+build_file_names = ('Makefile', 'makefile', 'GNUmakefile', 'CMakeLists.txt', 'configure', 'meson.build')
+
+# The tools and environment variables that determine what a build produces and how it runs.
+toolchain_commands = ('cc', 'c++', 'gcc', 'g++', 'clang', 'clang++', 'gfortran', 'mpicc', 'mpicxx', 'scorep')
+toolchain_env_vars = ('CC', 'CXX', 'FC', 'CFLAGS', 'CXXFLAGS', 'FFLAGS', 'LDFLAGS', 'CPATH', 'LIBRARY_PATH',
+                      'LD_LIBRARY_PATH', 'LD_PRELOAD')
+
+_toolchain_fingerprint = None
+
+
+def hash_file(file_path: str) -> str:
+  """ SHA-256 of the contents of file_path """
+  hasher = hashlib.sha256()
+  with open(file_path, 'rb') as f:
+    for chunk in iter(lambda: f.read(1 << 20), b''):
+      hasher.update(chunk)
+  return hasher.hexdigest()
+
+
+def hash_string(content: str) -> str:
+  return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def is_elf_file(file_path: str) -> bool:
+  try:
+    with open(file_path, 'rb') as f:
+      return f.read(4) == b'\x7fELF'
+  except OSError:
+    return False
+
+
+def get_tracked_files(directory: str) -> typing.List[str]:
+  """
+  The source files below directory: the files tracked by git, if directory is in a git work tree. Otherwise, the
+  files with a source file extension, see source_exts, and the build files, e.g., Makefiles.
+  Inputs and outputs of the application are no sources, s.t. they do not change the hash of the sources.
+  """
+  try:
+    git = subprocess.run(['git', '-C', directory, 'ls-files', '-z', '--cached'],
+                         stdout=subprocess.PIPE,
+                         stderr=subprocess.DEVNULL,
+                         timeout=60)
+    if git.returncode == 0:
+      tracked = [os.path.join(directory, p) for p in git.stdout.decode('utf-8', 'replace').split('\0') if p != '']
+      return sorted([f for f in tracked if os.path.isfile(f)])
+  except (OSError, subprocess.SubprocessError):
+    pass
+
+  sources = []
+  for root, dirs, files in os.walk(directory):
+    dirs[:] = sorted([d for d in dirs if not d.startswith('.') and not d.startswith('scorep-')])
+    for file_name in sorted(files):
+      if file_name.endswith(source_exts) or file_name in build_file_names:
+        sources.append(os.path.join(root, file_name))
+
+  return sources
+
+
+def hash_source_tree(directory: str) -> str:
+  """ Hashes path and content of every source file below directory, see get_tracked_files. """
+  hasher = hashlib.sha256()
+  for file_path in get_tracked_files(directory):
+    hasher.update(os.path.relpath(file_path, directory).encode('utf-8'))
+    hasher.update(hash_file(file_path).encode('utf-8'))
+
+  return hasher.hexdigest()
+
+
+def find_executables(directory: str, newer_than: float = .0, with_shared_libs: bool = False) -> typing.List[str]:
+  """ All ELF executables (and shared libraries) below directory that were modified after the time stamp newer_than. """
+  executables = []
+  for root, dirs, files in os.walk(directory):
+    dirs[:] = sorted([d for d in dirs if not d.startswith('.') and not d.startswith('scorep-')])
+    for file_name in sorted(files):
+      file_path = os.path.join(root, file_name)
+      is_shared_lib = with_shared_libs and file_name.endswith('.so')
+      if (file_name.endswith(build_product_exts) and not is_shared_lib) or not os.path.isfile(file_path):
+        continue
+      if (is_shared_lib or os.access(file_path, os.X_OK)) and os.path.getmtime(file_path) >= newer_than and is_elf_file(
+          file_path):
+        executables.append(file_path)
+
+  return executables
+
+
+def hash_executables(directory: str, newer_than: float = .0) -> str:
+  """ Combined hash of the executables in directory, or None if there are none. """
+  executables = find_executables(directory, newer_than)
+  if len(executables) == 0:
+    return None
+
+  return hash_string(''.join([os.path.relpath(e, directory) + hash_file(e) for e in executables]))
+
+
+def get_host_fingerprint() -> str:
+  """ Identifies the machine a measurement was taken on: host name, architecture, kernel and CPU model. """
+  cpu_model = platform.processor()
+  try:
+    with open('/proc/cpuinfo') as cpuinfo:
+      for line in cpuinfo:
+        if line.startswith('model name'):
+          cpu_model = line.split(':', 1)[1].strip()
+          break
+  except OSError:
+    pass
+
+  return hash_string('|'.join(
+      [platform.node(), platform.machine(),
+       platform.release(), cpu_model,
+       str(os.cpu_count())]))
+
+
+def get_toolchain_fingerprint() -> str:
+  """
+  Identifies the toolchain a build is done with: the path and version of every compiler and of Score-P that is
+  found, see toolchain_commands and the compilers named in CC, CXX and FC, and the toolchain environment variables.
+  Computed once per PIRA process.
+  """
+  global _toolchain_fingerprint
+  if _toolchain_fingerprint is not None:
+    return _toolchain_fingerprint
+
+  tools = list(toolchain_commands)
+  for env_var in ('CC', 'CXX', 'FC'):
+    if os.environ.get(env_var, '').strip() != '':
+      tools.append(os.environ[env_var].split()[0])
+
+  parts = []
+  for tool in tools:
+    tool_path = shutil.which(tool)
+    if tool_path is None:
+      continue
+    try:
+      version = subprocess.run([tool_path, '--version'], stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                               timeout=30).stdout.decode('utf-8', 'replace')
+    except (OSError, subprocess.SubprocessError):
+      version = ''
+    parts.append(tool + '=' + os.path.realpath(tool_path) + ':' + hash_string(version))
+
+  for env_var in toolchain_env_vars:
+    parts.append(env_var + '=' + os.environ.get(env_var, ''))
+
+  _toolchain_fingerprint = hash_string('|'.join(parts))
+  return _toolchain_fingerprint
+
+
+def get_whitelisted_functions(instr_file: str) -> typing.Set[str]:
+  """ Reads the function names of a whitelist, either plain or in Score-P filter file format. """
+  functions = set()
+  for line in read_file(instr_file).split('\n'):
+    tokens = line.split()
+    if len(tokens) == 0 or tokens[0] in ['SCOREP_REGION_NAMES_BEGIN', 'SCOREP_REGION_NAMES_END', 'EXCLUDE']:
+      continue
+    if tokens[0] == 'INCLUDE':
+      tokens = tokens[1:]
+      if len(tokens) > 0 and tokens[0] == 'MANGLED':
+        tokens = tokens[1:]
+    functions.update(tokens)
+
+  return functions
+
+
 def set_env(env_var: str, val) -> None:
-  log.get_logger().log('Utility::set_env: Setting ' + env_var + ' to ' + str(val), level='debug')
+  log.get_logger().log('Utility::set_env: Setting %s to %s', env_var, val, level='debug')
   os.environ[env_var] = val
 
 
+def run_active_functor(functor, benchmark: str, context: pe.ExecutionContext, **kwargs):
+  """
+  Active functors run inside PIRA. They get the working directory and the environment of context by changing the ones
+  of PIRA, which are restored afterwards. Hence, they cannot run concurrently to other targets.
+  """
+  if threading.current_thread() is not threading.main_thread():
+    raise PiraException('Utility::run_active_functor: Active functors change the working directory and environment '
+                        'of PIRA and cannot be run concurrently, e.g., with --async-orchestration')
+
+  old_cwd = get_cwd()
+  old_env = {key: os.environ.get(key) for key in context.get_env()}
+  try:
+    if context.get_cwd() is not None:
+      change_cwd(context.get_cwd())
+    for key, value in context.get_env().items():
+      set_env(key, value)
+    return functor.active(benchmark, **kwargs)
+
+  finally:
+    for key, value in old_env.items():
+      if value is None:
+        os.environ.pop(key, None)
+      else:
+        os.environ[key] = value
+    change_cwd(old_cwd)
+
+
+def get_available_cpus() -> typing.List[int]:
+  return sorted(os.sched_getaffinity(0))
+
+
+def partition_cpus(num_sets: int, cpus_per_set: int = 0) -> typing.List[typing.List[int]]:
+  """ Splits the CPUs this process may run on into num_sets disjoint sets. """
+  available = get_available_cpus()
+  if cpus_per_set < 1:
+    cpus_per_set = len(available) // num_sets
+  if cpus_per_set < 1 or num_sets * cpus_per_set > len(available):
+    raise PiraException('Utility::partition_cpus: Cannot create ' + str(num_sets) + ' disjoint sets of ' +
+                        str(cpus_per_set) + ' CPUs from ' + str(len(available)) + ' available CPUs')
+
+  return [available[i * cpus_per_set:(i + 1) * cpus_per_set] for i in range(num_sets)]
+
+
+def pin_current_thread(cpu_set: typing.List[int]) -> None:
+  """ On Linux, the affinity applies to the calling thread only and is inherited by processes spawned from it. """
+  log.get_logger().log('Utility::pin_current_thread: to CPUs ' + str(cpu_set), level='debug')
+  os.sched_setaffinity(0, cpu_set)
+
+
 def generate_random_string() -> str:
   return ''.join(choice(ascii_uppercase) for i in range(12))
 
 
 # --- Shell execution and timing --- #
 
-def timed_invocation(command: str, stderr_fd) -> typing.Tuple[str, float]:
-  t1 = os.times()  # start time
-  out = subprocess.check_output(command, stderr=stderr_fd, shell=True)
-  t2 = os.times()  # end time
-  cutime = t2[2] - t1[2]
-  cstime = t2[3] - t1[3]
-  elapsed = t2[4] - t1[4]
-  # FIXME: How to actually compute this? Make it configurable?
-  # Problem is: util.shell('sleep 4s') returns cutime + cstime == 0
-  runtime = cutime + cstime
-  runtime = elapsed
-  return out, runtime
-
-
-def shell(command: str, silent: bool = True, dry: bool = False, time_invoc: bool = False) -> typing.Tuple[str, float]:
+def invoke(command: str,
+           env: typing.Dict[str, str] = None,
+           timeout: float = None,
+           silent: bool = True,
+           cwd: str = None) -> pe.ProcessResult:
+  """ Runs command through the ProcessEngine. Unless silent, the output of command is streamed to stdout. """
+  output_callback = None
+  if not silent:
+    output_callback = lambda data: sys.stdout.write(data.decode('utf-8', errors='replace'))
+  return pe.ProcessEngine().run(command, cwd=cwd, env=env, timeout=timeout, output_callback=output_callback)
+
+
+def timed_invocation(command: str,
+                     env: typing.Dict[str, str] = None,
+                     timeout: float = None,
+                     silent: bool = True,
+                     cwd: str = None) -> typing.Tuple[pe.ProcessResult, pe.ResourceUsage]:
+  result = invoke(command, env, timeout, silent, cwd)
+  return result, result.get_resource_usage()
+
+
+def is_grep_command(command: str) -> bool:
+  """ grep exits with 1 if nothing matched, which is no error """
+  return command.lstrip().startswith('grep ')
+
+
+def shell_with_usage(command: str,
+                     silent: bool = True,
+                     env: typing.Dict[str, str] = None,
+                     timeout: float = None,
+                     context: pe.ExecutionContext = None) -> typing.Tuple[str, pe.ResourceUsage]:
+  """
+  Runs command and returns its output together with wall time, CPU time, max RSS and context switches.
+  If a grep command finds nothing, i.e., returns 1, ('', None) is returned. Every other failure raises.
+  The command runs in the working directory and with the environment of context, env entries take precedence.
+  """
+  cwd = None
+  if context is not None:
+    cwd = context.get_cwd()
+    context_env = context.get_env()
+    if env is not None:
+      context_env.update(env)
+    env = context_env if len(context_env) > 0 else None
+
+  log.get_logger().log('Utility::shell: util executing: %s', command, level='debug')
+  with tt.get_tracer().span(command[:60], 'subprocess', command=command) as span:
+    result, usage = timed_invocation(command, env, timeout, silent, cwd)
+    if span is not None:
+      span.get_attributes()['return_code'] = result.get_return_code()
+      span.add_child_cpu_time(usage.get_user_time(), usage.get_sys_time())
+
+  if result.succeeded():
+    log.get_logger().log('Util::shell: timed_invocation took: %s', usage, level='debug')
+    return result.get_stdout(), usage
+
+  if result.get_return_code() == 1 and not result.is_timed_out() and is_grep_command(command):
+    return '', None
+
+  log.get_logger().log('Utility::shell: Error output: %s', result.get_stderr(), level='debug')
+  if result.is_timed_out():
+    log.get_logger().log('Utility::shell: Command timed out after ' + str(timeout) + ' seconds', level='error')
+  else:
+    log.get_logger().log('Utility::shell: Command returned non-zero exit status ' + str(result.get_return_code()),
+                         level='error')
+  raise Exception('Utility::shell: Running command ' + command + ' did not succeed')
+
+
+def shell(command: str,
+          silent: bool = True,
+          dry: bool = False,
+          time_invoc: bool = False,
+          env: typing.Dict[str, str] = None,
+          timeout: float = None,
+          context: pe.ExecutionContext = None) -> typing.Tuple[str, float]:
   if dry:
-    log.get_logger().log('Utility::shell: DRY RUN SHELL CALL: ' + command, level='debug')
+    log.get_logger().log('Utility::shell: DRY RUN SHELL CALL: %s', command, level='debug')
     return '', 1.0
 
-  stderr_fn = '/tmp/stderr-bp-' + generate_random_string()
-  stderr_fd = open(stderr_fn, 'w+')
-  try:
-    log.get_logger().log('Utility::shell: util executing: ' + str(command), level='debug')
-
-    if time_invoc:
-      out, rt = timed_invocation(command, stderr_fd)
-      log.get_logger().log('Util::shell: timed_invocation took: ' + str(rt), level='debug')
-      return str(out.decode('utf-8')), rt
-
-    else:
-      out = subprocess.check_output(command, stderr=stderr_fd, shell=True)
-      return str(out.decode('utf-8')), -1.0
-
-  except subprocess.CalledProcessError as e:
-    if e.returncode == 1:
-      if command.find('grep '):
-        return '', .0
+  out, usage = shell_with_usage(command, silent, env, timeout, context)
+  if usage is None:
+    return out, .0
 
-    err_out = ''
-    log.get_logger().log('Utility::shell: Attempt to write stderr file', level='debug')
-    err_out += stderr_fd.read()
+  if time_invoc:
+    return out, usage.get_wall_time()
 
-    log.get_logger().log('Utility::shell: Error output: ' + str(err_out), level='debug')
-    log.get_logger().log('Utility::shell: Caught Exception ' + str(e), level='error')
-    raise Exception('Utility::shell: Running command ' + command + ' did not succeed')
-
-  finally:
-    stderr_fd.close()
-    remove_file(stderr_fn)
-    log.get_logger().log('Utility::shell Cleaning up temp files for subprocess communication.', level='debug')
+  return out, -1.0
 
 
 def shell_for_submitter(command: str, silent: bool = True, dry: bool = False):
+  """ Runs command through the ProcessEngine and returns its output as bytes, as the submitter functors expect """
   if dry:
     log.get_logger().log('Utility::shell_for_submitter: SHELL CALL: ' + command, level='debug')
-    return ''
+    return b''
 
-  try:
-    out = subprocess.check_output(command, shell=True)
-    return out
+  result = invoke(command, silent=silent)
+  if result.succeeded():
+    return result.get_stdout().encode('utf-8')
 
-  except subprocess.CalledProcessError as e:
-    if e.returncode == 1:
-      if command.find('grep '):
-        return ''
+  if result.get_return_code() == 1 and is_grep_command(command):
+    return b''
 
-    log.get_logger().log('Utility.shell: Caught Exception ' + str(e), level='error')
-    raise Exception('Utility::shell_for_submitter: Running command ' + command + ' did not succeed')
+  log.get_logger().log('Utility::shell_for_submitter: Error output: %s', result.get_stderr(), level='error')
+  raise Exception('Utility::shell_for_submitter: Running command ' + command + ' did not succeed')
 
 
 # --- Functor utilities --- #
@@ -355,40 +672,45 @@ def get_ipcg_file_name(base_dir: str, b_name: str, flavor: str) -> str:
   return base_dir + "/" + flavor + '-' + b_name + '.ipcg'
 
 
-def run_analyser_command(command: str, analyser_dir: str, flavor: str, benchmark_name: str, exp_dir: str,
-                         iterationNumber: int, pgis_cfg_file: str) -> None:
+def get_analyser_command(command: str, analyser_dir: str, flavor: str, benchmark_name: str, exp_dir: str,
+                         iterationNumber: int, pgis_cfg_file: str) -> str:
   ipcg_file = get_ipcg_file_name(analyser_dir, benchmark_name, flavor)
   cubex_dir = get_cube_file_path(exp_dir, flavor, iterationNumber - 1)
   cubex_file = cubex_dir + '/' + flavor + '-' + benchmark_name + '.cubex'
 
   # PIRA version 1 runner, i.e., only consider raw runtime of single rum
   if pgis_cfg_file is None:
-    log.get_logger().log('Utility::run_analyser_command: using PIRA 1 Analyzer', level='info')
-    sh_cmd = command + ' ' + ipcg_file + ' -c ' + cubex_file
-    log.get_logger().log('Utility::run_analyser_command: INSTR: Run cmd: ' + sh_cmd)
-    out, _ = shell(sh_cmd)
-    log.get_logger().log('Utility::run_analyser_command: Output of analyzer:\n' + out, level='debug')
-    return
+    log.get_logger().log('Utility::get_analyser_command: using PIRA 1 Analyzer', level='info')
+    return command + ' ' + ipcg_file + ' -c ' + cubex_file
 
-  extrap_cfg_file = pgis_cfg_file
   # extrap_file_path = analyser_dir + '/' + extrap_cfg_file
   # sh_cmd = command + ' --model-filter -e ' + extrap_file_path + ' ' + ipcg_file
-  sh_cmd = command + ' -e ' + pgis_cfg_file + ' ' + ipcg_file
+  return command + ' -e ' + pgis_cfg_file + ' ' + ipcg_file
+
+
+def get_analyser_command_noInstr(command: str, analyser_dir: str, flavor: str, benchmark_name: str) -> str:
+  ipcg_file = get_ipcg_file_name(analyser_dir, benchmark_name, flavor)
+  return command + ' --static ' + ipcg_file
+
+
+def run_analyser_command(command: str, analyser_dir: str, flavor: str, benchmark_name: str, exp_dir: str,
+                         iterationNumber: int, pgis_cfg_file: str) -> None:
+  sh_cmd = get_analyser_command(command, analyser_dir, flavor, benchmark_name, exp_dir, iterationNumber,
+                                pgis_cfg_file)
   log.get_logger().log('Utility::run_analyser_command: INSTR: Run cmd: ' + sh_cmd)
-  out, _ = shell(sh_cmd)
-  log.get_logger().log('Utility::run_analyser_command: Output of analyzer:\n' + out, level='debug')
+  out, _ = shell(sh_cmd, context=pe.ExecutionContext(analyser_dir))
+  log.get_logger().log('Utility::run_analyser_command: Output of analyzer:\n%s', out, level='debug')
 
 
 def run_analyser_command_noInstr(command: str, analyser_dir: str, flavor: str, benchmark_name: str) -> None:
-  ipcg_file = get_ipcg_file_name(analyser_dir, benchmark_name, flavor)
-  sh_cmd = command + ' --static ' + ipcg_file
+  sh_cmd = get_analyser_command_noInstr(command, analyser_dir, flavor, benchmark_name)
   log.get_logger().log('Utility::run_analyser_command_noInstr: NO INSTR: Run cmd: ' + sh_cmd)
-  out, _ = shell(sh_cmd)
-  log.get_logger().log('Utility::run_analyser_command_noInstr: Output of analyzer:\n' + out, level='debug')
+  out, _ = shell(sh_cmd, context=pe.ExecutionContext(analyser_dir))
+  log.get_logger().log('Utility::run_analyser_command_noInstr: Output of analyzer:\n%s', out, level='debug')
 
 
 def get_cube_file_path(experiment_dir: str, flavor: str, iter_nr: int) -> str:
-  log.get_logger().log('Utility::get_cube_file_path: ' + experiment_dir + '-' + flavor + '-' + str(iter_nr))
+  log.get_logger().log('Utility::get_cube_file_path: %s-%s-%s', experiment_dir, flavor, iter_nr)
   return experiment_dir + '-' + flavor + '-' + str(iter_nr)
 
 
@@ -33,13 +33,89 @@ create_items_table = """ CREATE TABLE IF NOT EXISTS Items (
                                         FOREIGN KEY(BuildName) REFERENCES Builds(Build_Name)
                                     ); """
 
+# Version of the schema, stored as the user_version of the database
+schema_version = 3
+
+# One row per repetition of a measurement. Iteration_No is -1 for the baseline. Position is the index of the input
+# configuration Args within the RunResult. Times in seconds, MaxRSS in KiB; NULL if only the runtime is known.
 create_experiment_table = """ CREATE TABLE IF NOT EXISTS Experiment (
-                                        Experiment_ID text PRIMARY KEY,
-                                        BenchmarkName text,
-                                        Iteration_No INTEGER,
-                                        IsWithInstrumentation INTEGER,
-                                        CubeFilePath text NOT NULL,
-                                        Runtime text NOT NULL,
+                                        Experiment_ID text NOT NULL,
+                                        BenchmarkName text NOT NULL,
+                                        Iteration_No INTEGER NOT NULL,
+                                        IsWithInstrumentation INTEGER NOT NULL,
+                                        Position INTEGER NOT NULL,
+                                        Args text NOT NULL,
+                                        Repetition INTEGER NOT NULL,
+                                        WallTime REAL NOT NULL,
+                                        UserTime REAL,
+                                        SysTime REAL,
+                                        MaxRSS INTEGER,
+                                        IsOutlier INTEGER NOT NULL,
+                                        CubeFilePath text,
+                                        Created REAL NOT NULL,
                                         Item_ID text NOT NULL,
+                                        PRIMARY KEY(Experiment_ID, Position, Repetition),
                                         FOREIGN KEY(Item_ID) REFERENCES Items(ItemID)
                                     ); """
+
+# One row per analysis, i.e., per whitelist. Iteration_No is the iteration the whitelist is used in.
+create_analysis_table = """ CREATE TABLE IF NOT EXISTS Analysis (
+                                        Item_ID text NOT NULL,
+                                        BenchmarkName text NOT NULL,
+                                        Iteration_No INTEGER NOT NULL,
+                                        NumFunctions INTEGER NOT NULL,
+                                        Created REAL NOT NULL,
+                                        FOREIGN KEY(Item_ID) REFERENCES Items(ItemID)
+                                    ); """
+
+# Typed performance events, see PerfEvents.PerfEvent. Attributes is a JSON object.
+create_perf_event_table = """ CREATE TABLE IF NOT EXISTS PerfEvent (
+                                        Kind text NOT NULL,
+                                        Target text,
+                                        Item_ID text,
+                                        Iteration_No INTEGER,
+                                        Phase text,
+                                        Duration REAL,
+                                        Value REAL,
+                                        Attributes text NOT NULL,
+                                        Created REAL NOT NULL
+                                    ); """
+
+create_indexes = [
+    'CREATE INDEX IF NOT EXISTS Experiment_Item_Iteration ON Experiment(Item_ID, Iteration_No)',
+    'CREATE INDEX IF NOT EXISTS Experiment_Benchmark_Created ON Experiment(BenchmarkName, Created)',
+    'CREATE INDEX IF NOT EXISTS Analysis_Benchmark_Created ON Analysis(BenchmarkName, Created)',
+    'CREATE INDEX IF NOT EXISTS PerfEvent_Kind_Created ON PerfEvent(Kind, Created)'
+]
+
+create_baseline_cache_table = """ CREATE TABLE IF NOT EXISTS BaselineCache (
+                                        CacheKey text PRIMARY KEY,
+                                        SourceHash text NOT NULL,
+                                        ExeHash text NOT NULL,
+                                        Args text NOT NULL,
+                                        Host text NOT NULL,
+                                        Item_Name text NOT NULL,
+                                        RunResult text NOT NULL,
+                                        Created REAL NOT NULL
+                                    ); """
+
+create_checkpoint_table = """ CREATE TABLE IF NOT EXISTS Checkpoint (
+                                        TargetKey text NOT NULL,
+                                        Phase text NOT NULL,
+                                        Iteration INTEGER NOT NULL,
+                                        Payload text NOT NULL,
+                                        Created REAL NOT NULL,
+                                        PRIMARY KEY(TargetKey, Phase, Iteration)
+                                    ); """
+
+# Created once per connection, in this order
+all_tables = [
+    create_application_table, create_builds_table, create_items_table, create_experiment_table,
+    create_baseline_cache_table, create_checkpoint_table, create_analysis_table,
+    create_perf_event_table
+] + create_indexes
+
+# Tables whose layout or contents changed, by the schema version that changed them. Existing tables are kept as
+# <table>_v<version>. Version 2 changed the payloads of the cached baselines and the checkpoints, and added Analysis,
+# version 3 added PerfEvent.
+migrated_tables = {1: ['Experiment'], 2: ['BaselineCache', 'Checkpoint', 'Analysis'], 3: ['PerfEvent']}
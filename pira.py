@@ -4,7 +4,10 @@ License: Part of the PIRA project. Licensed under BSD 3 clause license. See LICE
 Description: This is PIRA.
 """
 import argparse
+import os
+import sys
 import lib.Logging as log
+import lib.TimeTracking as tt
 import lib.Pira as pira
 
 """
@@ -12,8 +15,14 @@ import lib.Pira as pira
 
   This file contains the main entry point for the Pira framework.
   Options are defined here and then passed to the Pira class.
+  With report as first argument, it reports on the PIRA database instead, see lib/Report.py.
 """
 
+# A configuration file named report in the working directory takes precedence over the report subcommand
+if len(sys.argv) > 1 and sys.argv[1] == 'report' and not os.path.exists(sys.argv[1]):
+  import lib.Report as report
+  sys.exit(report.main(sys.argv[2:]))
+
 parser = argparse.ArgumentParser()
 
 # --- Required arguments section
@@ -24,29 +33,153 @@ parser.add_argument('--version', help='Which config file version to use', choice
 parser.add_argument('--runtime-filter', help='Use run-time filtering', default=False, action='store_true')
 parser.add_argument('--iterations', help='Number of Pira iterations', default=3, type=int)
 parser.add_argument('--repetitions', help='Number of measurement repetitions', default=3, type=int)
+parser.add_argument('--jobs', help='Number of independent targets to process concurrently', default=1, type=int)
+parser.add_argument(
+    '--compile-slots',
+    help='Number of targets that may build at the same time with --jobs (0: all)',
+    default=0,
+    type=int)
+parser.add_argument(
+    '--measure-slots',
+    help='Number of targets that may run measurements at the same time with --jobs (0: all). By default, the '
+    'measurements are exclusive, s.t. concurrent targets do not perturb each other\'s runtimes. With fewer slots than '
+    'jobs, targets are built while others are measured',
+    default=1,
+    type=int)
+parser.add_argument(
+    '--async-orchestration',
+    help='Process all targets concurrently, in threads driven by one asyncio event loop, limited by --compile-slots '
+    'and --measure-slots. Not available for Extra-P modelling',
+    default=False,
+    action='store_true')
+parser.add_argument(
+    '--concurrent-repetitions',
+    help='Run the measurement repetitions concurrently on disjoint, pinned CPU sets',
+    default=False,
+    action='store_true')
+parser.add_argument(
+    '--cpus-per-repetition', help='CPUs per concurrent repetition (0: split evenly)', default=0, type=int)
+parser.add_argument(
+    '--adaptive-repetitions',
+    help='Repeat measurements until the relative confidence interval of the runtime is below this value (0: off). '
+    '--repetitions then is the minimum number of repetitions',
+    default=.0,
+    type=float)
+parser.add_argument(
+    '--max-repetitions', help='Maximum number of measurement repetitions in adaptive mode', default=20, type=int)
+parser.add_argument(
+    '--no-baseline-cache',
+    help='Always redo the vanilla build and baseline measurement, instead of reusing an earlier one',
+    default=False,
+    action='store_true')
+parser.add_argument(
+    '--artifact-dir',
+    help='Keep instrumented builds in this directory and restore them instead of rebuilding (default: off)',
+    type=str)
+parser.add_argument(
+    '--artifact-max-size',
+    help='Size in MiB of the artifact directory, above which the least recently used builds are evicted (0: no limit)',
+    default=1024,
+    type=int)
+parser.add_argument(
+    '--selective-rebuild',
+    help='Only recompile the translation units whose functions changed their instrumentation status',
+    default=False,
+    action='store_true')
+parser.add_argument(
+    '--stop-on-fixpoint',
+    help='Stop iterating once the analysis returns the whitelist of the previous iteration',
+    default=False,
+    action='store_true')
+parser.add_argument(
+    '--stop-overhead',
+    help='Stop iterating once the instrumentation overhead ratio is at most this value (0: off)',
+    default=.0,
+    type=float)
+parser.add_argument(
+    '--stop-change',
+    help='Stop iterating once less than this percentage of the whitelisted functions changed (0: off)',
+    default=.0,
+    type=float)
+parser.add_argument(
+    '--resume',
+    help='Resume an interrupted invocation with the same configuration file, skipping all completed phases',
+    default=False,
+    action='store_true')
+parser.add_argument(
+    '--slurm',
+    help='Submit all repetitions of a measurement as one Slurm job array. The value is passed on to sbatch, '
+    'e.g., "--partition=test --time=10"',
+    nargs='?',
+    const='',
+    default=None,
+    type=str)
+parser.add_argument(
+    '--outlier-rejection',
+    help='How to reject outlying measurement repetitions',
+    choices=['none', 'mad', 'iqr'],
+    default='none')
+parser.add_argument(
+    '--perf-events', help='Append the performance events of the campaign as JSON Lines to this file', type=str)
+parser.add_argument(
+    '--perf-events-db',
+    help='Store the performance events in the PerfEvent table of the PIRA database',
+    default=False,
+    action='store_true')
+parser.add_argument(
+    '--trace',
+    help='Write the phases of the campaign as spans in Chrome trace event format (chrome://tracing) to this file',
+    type=str)
 
 # --- Pira debug options
-parser.add_argument('--tape', help='Path to tape file to dump.')
+parser.add_argument('--tape', help='Path to tape file to dump.', default='tape.tp')
+parser.add_argument(
+    '--tape-max-size',
+    help='Size in MiB at which the tape file is rotated, keeping three old ones',
+    default=64,
+    type=int)
+parser.add_argument(
+    '--tape-policy',
+    help='Which messages are recorded on the tape: the ones of enabled log levels, all, or none (only perf)',
+    choices=['enabled', 'all', 'none'],
+    default='enabled')
 
 # --- Pira modeling options
 group = parser.add_argument_group('ExP')
 group.add_argument(
     '--extrap-dir', help='The base directory where extra-p folder structure is placed', type=str, default='')
 group.add_argument('--extrap-prefix', help='The prefix in extra-p naming scheme', type=str)
+group.add_argument(
+    '--extrap-summary',
+    help='Merge the repetitions into one summary (mean, median, min per call path) in addition to the profiles',
+    action='store_true',
+    default=False)
+group.add_argument(
+    '--extrap-copy',
+    help='Never hard link the profiles into the extra-p folder structure, always create a copy (or reflink)',
+    action='store_true',
+    default=False)
 
 
 # ====== Start of Pira program ====== #
 args = parser.parse_args()
+log.get_logger().set_tape_policy(args.tape_policy)
+# The tape is streamed to the file while PIRA runs, s.t. it is kept if PIRA is killed.
+log.get_logger().set_tape_file(args.tape, args.tape_max_size * 1024 * 1024)
+if args.trace is not None:
+  # PIRA changes the working directory
+  args.trace = os.path.abspath(args.trace)
+  tt.get_tracer().enable()
 
 try:
   log.get_logger().log('Starting', level='debug')
-  pira.main(args)
+  with tt.get_tracer().span('campaign', 'campaign', config=args.config):
+    pira.main(args)
 
 finally:
-  if args.tape is not None:
-    log.get_logger().dump_tape(args.tape)
-  else:
-    log.get_logger().dump_tape('tape.tp')
+  if args.trace is not None:
+    tt.get_tracer().export_chrome_trace(args.trace)
+  log.get_logger().close_tape()
 
 log.get_logger().log('End of process')
 log.get_logger().show_perf()
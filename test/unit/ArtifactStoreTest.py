@@ -0,0 +1,97 @@
+"""
+File: ArtifactStoreTest.py
+License: Part of the PIRA project. Licensed under BSD 3 clause license. See LICENSE.txt file at https://github.com/jplehr/pira/LICENSE.txt
+Description: Tests for the content-addressed store of instrumented builds
+"""
+
+import sys
+sys.path.append('..')
+
+from lib.ArtifactStore import ArtifactStore
+from lib.Configuration import TargetConfiguration
+import lib.Utility as u
+
+import unittest
+import os
+import tempfile
+import shutil
+import time
+
+
+class TestArtifactStore(unittest.TestCase):
+
+  def setUp(self):
+    self.place = tempfile.mkdtemp()
+    self.store_dir = tempfile.mkdtemp()
+    self.store = ArtifactStore(self.store_dir)
+    self.tc = TargetConfiguration(self.place, self.place, 'item01', 'fl', '')
+    self.instr_file = os.path.join(self.store_dir, 'instrumented-item01.txt')
+    u.write_file(os.path.join(self.place, 'main.cpp'), 'int main() {}')
+    u.write_file(self.instr_file, 'INCLUDE main')
+
+  def tearDown(self):
+    shutil.rmtree(self.place)
+    shutil.rmtree(self.store_dir)
+
+  def write_exe(self, name, content):
+    with open(os.path.join(self.place, name), 'wb') as f:
+      f.write(content)
+    os.chmod(os.path.join(self.place, name), 0o755)
+
+  def test_build_key(self):
+    key = self.store.get_build_key(self.tc, 'make', 'make clean', self.instr_file)
+    self.assertEqual(key, self.store.get_build_key(self.tc, 'make', 'make clean', self.instr_file))
+    self.assertNotEqual(key, self.store.get_build_key(self.tc, 'make -j', 'make clean', self.instr_file))
+    u.write_file(self.instr_file, 'INCLUDE main\nINCLUDE foo')
+    self.assertNotEqual(key, self.store.get_build_key(self.tc, 'make', 'make clean', self.instr_file))
+
+  def test_build_key_toolchain(self):
+    key = self.store.get_build_key(self.tc, 'make', 'make clean', self.instr_file)
+    fingerprint = u.get_toolchain_fingerprint()
+    try:
+      u._toolchain_fingerprint = 'upgraded-compiler'
+      self.assertNotEqual(key, self.store.get_build_key(self.tc, 'make', 'make clean', self.instr_file))
+    finally:
+      u._toolchain_fingerprint = fingerprint
+
+  def test_save_restore(self):
+    key = self.store.get_build_key(self.tc, 'make', 'make clean', self.instr_file)
+    self.assertFalse(self.store.restore(key, self.place))
+
+    self.write_exe('gol', b'\x7fELF-instrumented')
+    self.assertEqual(self.store.save(key, self.place, .0), [os.path.join(self.place, 'gol')])
+    self.write_exe('gol', b'\x7fELF-other')
+
+    self.assertTrue(self.store.restore(key, self.place))
+    with open(os.path.join(self.place, 'gol'), 'rb') as f:
+      self.assertEqual(f.read(), b'\x7fELF-instrumented')
+    self.assertTrue(os.access(os.path.join(self.place, 'gol'), os.X_OK))
+
+  def test_evict(self):
+    # Room for the objects of two builds
+    store = ArtifactStore(self.store_dir, 2048)
+    for idx, key in enumerate(['key1', 'key2']):
+      self.write_exe('gol', b'\x7fELF' + key.encode('utf-8') * 250)
+      store.save(key, self.place, .0)
+      past = time.time() - 100 + idx
+      os.utime(os.path.join(self.store_dir, 'builds', key + '.json'), (past, past))
+    # Restoring makes key1 the most recently used build, s.t. key2 is evicted
+    self.assertTrue(store.restore('key1', self.place))
+    self.write_exe('gol', b'\x7fELF' + b'key3' * 250)
+    store.save('key3', self.place, .0)
+
+    self.assertTrue(store.has('key1'))
+    self.assertFalse(store.has('key2'))
+    self.assertTrue(store.has('key3'))
+    self.assertLessEqual(store.get_size(), 2048)
+    self.assertEqual(len(os.listdir(os.path.join(self.store_dir, 'objects'))), 2)
+
+  def test_identical_content_stored_once(self):
+    self.write_exe('gol', b'\x7fELF-instrumented')
+    self.store.save('key1', self.place, .0)
+    self.store.save('key2', self.place, .0)
+    self.assertEqual(len(os.listdir(os.path.join(self.store_dir, 'objects'))), 1)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,109 @@
+"""
+File: BaselineCacheTest.py
+License: Part of the PIRA project. Licensed under BSD 3 clause license. See LICENSE.txt file at https://github.com/jplehr/pira/LICENSE.txt
+Description: Tests for the baseline cache
+"""
+
+import sys
+sys.path.append('..')
+
+import lib.BaselineCache as bc
+import lib.Database as d
+import lib.Measurement as m
+import lib.Runner as r
+from lib.Configuration import TargetConfiguration
+from lib.ProcessEngine import ResourceUsage
+
+import unittest
+import os
+import tempfile
+import shutil
+
+
+class FakeConfig:
+
+  def get_args(self, build, item):
+    return ['50', '100']
+
+
+class FixedSourceBaselineCache(bc.BaselineCache):
+
+  source_hash = 'sources-v1'
+
+  def get_source_hash(self, target_config):
+    return FixedSourceBaselineCache.source_hash
+
+
+class TestBaselineCache(unittest.TestCase):
+
+  def setUp(self):
+    self.place = tempfile.mkdtemp()
+    self.dbm = d.DBManager.DBImpl(':memory:')
+    self.dbm.create_cursor()
+    self.cache = FixedSourceBaselineCache(self.dbm, FakeConfig(), r.LocalRunner(FakeConfig(), None, 2))
+    self.tc = TargetConfiguration(self.place, self.place, 'item01', 'fl', '')
+    self.builds = 0
+    self.measurements = 0
+    FixedSourceBaselineCache.source_hash = 'sources-v1'
+
+  def tearDown(self):
+    shutil.rmtree(self.place)
+
+  def build(self, content=b'\x7fELF-v1'):
+    self.builds += 1
+    exe = os.path.join(self.place, 'gol')
+    with open(exe, 'wb') as f:
+      f.write(content)
+    os.chmod(exe, 0o755)
+
+  def measure(self):
+    self.measurements += 1
+    return m.RunResult.from_usages([ResourceUsage(int(2e9), 1.5), ResourceUsage(int(4e9), 3.5)])
+
+  def test_abstract(self):
+    self.assertRaises(TypeError, bc.BaselineCacheBase)
+
+  def test_miss_changed_environment(self):
+    self.cache.get_baseline(self.tc, self.build, self.measure)
+    other = FixedSourceBaselineCache(self.dbm, FakeConfig(), r.LocalRunner(FakeConfig(), None, 2))
+    # E.g., another compiler version
+    other._environment = 'other-toolchain'
+    other.get_baseline(self.tc, self.build, self.measure)
+    self.assertEqual((self.builds, self.measurements), (2, 2))
+
+  def test_miss_changed_measurement(self):
+    self.cache.get_baseline(self.tc, self.build, self.measure)
+    # E.g., with --repetitions 5
+    other = FixedSourceBaselineCache(self.dbm, FakeConfig(), r.LocalRunner(FakeConfig(), None, 5))
+    other.get_baseline(self.tc, self.build, self.measure)
+    self.assertEqual((self.builds, self.measurements), (2, 2))
+    self.assertNotEqual(self.cache.get_args_key(self.tc), other.get_args_key(self.tc))
+
+  def test_nop_cache(self):
+    cache = bc.NopBaselineCache()
+    cache.get_baseline(self.tc, self.build, self.measure)
+    cache.get_baseline(self.tc, self.build, self.measure)
+    self.assertEqual((self.builds, self.measurements), (2, 2))
+
+  def test_hit_sources(self):
+    self.cache.get_baseline(self.tc, self.build, self.measure)
+    rr = self.cache.get_baseline(self.tc, self.build, self.measure)
+    self.assertEqual((self.builds, self.measurements), (1, 1))
+    self.assertEqual(rr.get_average(), 3.0)
+    self.assertEqual(rr.get_average_user_time(), 2.5)
+
+  def test_hit_executable(self):
+    self.cache.get_baseline(self.tc, self.build, self.measure)
+    FixedSourceBaselineCache.source_hash = 'sources-v2'
+    self.cache.get_baseline(self.tc, self.build, self.measure)
+    self.assertEqual((self.builds, self.measurements), (2, 1))
+
+  def test_miss_changed_executable(self):
+    self.cache.get_baseline(self.tc, self.build, self.measure)
+    FixedSourceBaselineCache.source_hash = 'sources-v2'
+    self.cache.get_baseline(self.tc, lambda: self.build(b'\x7fELF-v2'), self.measure)
+    self.assertEqual((self.builds, self.measurements), (2, 2))
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,70 @@
+"""
+File: CheckpointTest.py
+License: Part of the PIRA project. Licensed under BSD 3 clause license. See LICENSE.txt file at https://github.com/jplehr/pira/LICENSE.txt
+Description: Tests for the campaign checkpoints
+"""
+
+import sys
+sys.path.append('..')
+
+from lib.Checkpoint import Checkpointer
+from lib.Configuration import TargetConfiguration
+import lib.Database as d
+import lib.ProfileSink as ps
+
+import unittest
+
+
+class TestCheckpointer(unittest.TestCase):
+
+  def setUp(self):
+    self.dbm = d.DBManager.DBImpl(':memory:')
+    self.dbm.create_cursor()
+    self.tc = TargetConfiguration('/tmp/a', '/tmp/a', 'item01', 'fl', '')
+    self.tc2 = TargetConfiguration('/tmp/a', '/tmp/a', 'item02', 'fl', '')
+
+  def test_resume(self):
+    writer = Checkpointer(self.dbm, 'campaign')
+    writer.begin_target(self.tc)
+    writer.save(self.tc, 'analysis', 0, {'whitelist': 'main\n'})
+    self.assertIsNone(writer.load(self.tc, 'analysis', 0))
+
+    resumer = Checkpointer(self.dbm, 'campaign', True)
+    resumer.begin_target(self.tc)
+    self.assertEqual(resumer.load(self.tc, 'analysis', 0), {'whitelist': 'main\n'})
+    self.assertIsNone(resumer.load(self.tc, 'analysis', 1))
+    self.assertIsNone(resumer.load(self.tc2, 'analysis', 0))
+    self.assertIsNone(Checkpointer(self.dbm, 'other', True).load(self.tc, 'analysis', 0))
+
+  def test_restart_discards(self):
+    writer = Checkpointer(self.dbm, 'campaign')
+    writer.save(self.tc, 'baseline', -1, {})
+    writer.save(self.tc2, 'baseline', -1, {})
+    writer.begin_target(self.tc)
+
+    resumer = Checkpointer(self.dbm, 'campaign', True)
+    self.assertIsNone(resumer.load(self.tc, 'baseline', -1))
+    self.assertEqual(resumer.load(self.tc2, 'baseline', -1), {})
+
+  def test_db_item_id(self):
+    tc = TargetConfiguration('/tmp/a', '/tmp/a', 'item01', 'fl', 'first-item')
+    Checkpointer(self.dbm, 'campaign').begin_target(tc)
+
+    resumer = Checkpointer(self.dbm, 'campaign', True)
+    self.assertEqual(resumer.load_db_item_id(self.tc), 'first-item')
+    self.assertIsNone(resumer.load_db_item_id(self.tc2))
+    self.assertIsNone(Checkpointer(self.dbm, 'campaign').load_db_item_id(self.tc))
+    # The resumed target keeps its item
+    self.tc.set_db_item_id(resumer.load_db_item_id(self.tc))
+    resumer.begin_target(self.tc)
+    self.assertEqual(resumer.load_db_item_id(self.tc), 'first-item')
+
+  def test_sink_state(self):
+    sink = ps.ExtrapProfileSink('/tmp/extrap', ['par'], 'pre', 'post', 'profile.cubex', 5)
+    self.assertEqual(ps.NopSink().get_state(), {})
+    sink.set_state({'iteration': 3, 'repetition': 4})
+    self.assertEqual(sink.get_state(), {'iteration': 3, 'repetition': 4})
+
+
+if __name__ == '__main__':
+  unittest.main()
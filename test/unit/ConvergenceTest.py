@@ -0,0 +1,47 @@
+"""
+File: ConvergenceTest.py
+License: Part of the PIRA project. Licensed under BSD 3 clause license. See LICENSE.txt file at https://github.com/jplehr/pira/LICENSE.txt
+Description: Tests for the convergence criteria of the PIRA iterations
+"""
+
+import sys
+sys.path.append('..')
+
+from lib.Convergence import ConvergenceCriteria
+import lib.Measurement as m
+
+import unittest
+
+
+class TestConvergenceCriteria(unittest.TestCase):
+
+  def test_disabled(self):
+    cc = ConvergenceCriteria()
+    self.assertFalse(cc.is_enabled())
+    self.assertIsNone(cc.check_whitelist(set(['main']), set(['main'])))
+    self.assertIsNone(cc.check_overhead(1.0))
+
+  def test_fixpoint(self):
+    cc = ConvergenceCriteria(stop_on_fixpoint=True)
+    self.assertIsNone(cc.check_whitelist(None, set(['main'])))
+    self.assertIsNone(cc.check_whitelist(set(['main']), set(['main', 'foo'])))
+    self.assertIsNotNone(cc.check_whitelist(set(['main', 'foo']), set(['foo', 'main'])))
+
+  def test_change(self):
+    self.assertEqual(ConvergenceCriteria.get_change_percent(set(['a', 'b', 'c']), set(['a', 'b', 'd'])), 50.0)
+    cc = ConvergenceCriteria(min_change_percent=10.0)
+    previous = set([str(i) for i in range(0, 20)])
+    self.assertIsNotNone(cc.check_whitelist(previous, previous.union(set(['new']))))
+    self.assertIsNone(cc.check_whitelist(previous, previous.union(set(['new', 'other', 'third']))))
+
+  def test_overhead(self):
+    cc = ConvergenceCriteria(overhead_threshold=1.1)
+    self.assertIsNotNone(cc.check_overhead(1.05))
+    self.assertIsNone(cc.check_overhead(1.2))
+    # The upper bound of the confidence interval has to be below the threshold
+    self.assertIsNone(cc.check_overhead(m.Overhead(1.05, 1.0, 1.15)))
+    self.assertIsNotNone(cc.check_overhead(m.Overhead(1.05, 1.0, 1.08)))
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,174 @@
+"""
+File: CubeReaderTest.py
+License: Part of the PIRA project. Licensed under BSD 3 clause license. See LICENSE.txt file at https://github.com/jplehr/pira/LICENSE.txt
+Description: Tests for the Cube profile reader
+"""
+
+import sys
+sys.path.append('..')
+
+import lib.CubeReader as cr
+
+import io
+import os
+import shutil
+import struct
+import tarfile
+import tempfile
+import unittest
+
+anchor = '''<?xml version="1.0" encoding="UTF-8"?>
+<cube version="4.4">
+<metrics>
+  <metric id="0" type="EXCLUSIVE">
+    <disp_name>Visits</disp_name><uniq_name>visits</uniq_name><dtype>UINT64</dtype><uom>occ</uom>
+  </metric>
+  <metric id="1" type="EXCLUSIVE">
+    <disp_name>Time</disp_name><uniq_name>time</uniq_name><dtype>DOUBLE</dtype><uom>sec</uom>
+    <metric id="2" type="EXCLUSIVE">
+      <disp_name>Minimum Inclusive Time</disp_name><uniq_name>min_time</uniq_name><dtype>MINDOUBLE</dtype>
+    </metric>
+  </metric>
+  <metric id="3" type="POSTDERIVED">
+    <disp_name>Derived</disp_name><uniq_name>derived</uniq_name><dtype>DOUBLE</dtype>
+  </metric>
+</metrics>
+<program>
+  <region id="0" mod="a.c"><name>main</name></region>
+  <region id="1" mod="a.c"><name>foo</name></region>
+  <region id="2" mod="a.c"><name>bar</name></region>
+  <cnode id="0" calleeId="0">
+    <cnode id="1" calleeId="1">
+      <cnode id="2" calleeId="2"/>
+    </cnode>
+    <cnode id="3" calleeId="2"/>
+  </cnode>
+</program>
+<system>
+  <systemtreenode id="0"><name>machine</name>
+    <locationgroup id="0"><name>rank 0</name>
+      <location id="0"><name>thread 0</name></location>
+      <location id="1"><name>thread 1</name></location>
+    </locationgroup>
+  </systemtreenode>
+</system>
+</cube>
+'''
+
+
+def dense_index():
+  return b'CUBEX.INDEX' + struct.pack('<IHB', 1, 0, 0)
+
+
+def sparse_index(cnode_ids):
+  return b'CUBEX.INDEX' + struct.pack('<IHBI', 1, 0, 1, len(cnode_ids)) + struct.pack(
+      '<' + 'I' * len(cnode_ids), *cnode_ids)
+
+
+def write_cubex(path, members):
+  with tarfile.open(path, 'w') as cubex:
+    for name, content in members.items():
+      info = tarfile.TarInfo(name)
+      info.size = len(content)
+      cubex.addfile(info, io.BytesIO(content))
+
+
+class TestCubeReader(unittest.TestCase):
+
+  def setUp(self):
+    self.dir = tempfile.mkdtemp()
+    self.cubex = os.path.join(self.dir, 'profile.cubex')
+    # Two values per cnode, one per location
+    visits = struct.pack('<8Q', 1, 1, 10, 10, 20, 20, 5, 0)
+    # Time of cnodes 0, 1 and 2 only
+    time = struct.pack('<6d', 1.0, 1.5, 2.0, 2.0, 4.0, 3.0)
+    min_time = struct.pack('<8d', 9.0, 8.0, 5.0, 6.0, 1.0, 2.0, .5, 1.0)
+    write_cubex(
+        self.cubex, {
+            'anchor.xml': anchor.encode('utf-8'),
+            '0.index': dense_index(),
+            '0.data': b'CUBEX.DATA' + visits,
+            '1.index': sparse_index([0, 1, 2]),
+            '1.data': b'CUBEX.DATA' + time,
+            '2.index': dense_index(),
+            '2.data': b'CUBEX.DATA' + min_time
+        })
+
+  def tearDown(self):
+    shutil.rmtree(self.dir)
+
+  def test_call_tree(self):
+    profile = cr.CubeReader(self.cubex).read()
+    self.assertEqual(profile.get_num_callpaths(), 4)
+    self.assertEqual(profile.get_num_locations(), 2)
+    self.assertEqual(list(profile.get_parents()), [-1, 0, 1, 0])
+    self.assertEqual(profile.get_callpath_names(), ['main', 'main/foo', 'main/foo/bar', 'main/bar'])
+    self.assertEqual(profile.get_callpath_name(2), 'main/foo/bar')
+    self.assertEqual(sorted(profile.get_metrics().keys()), ['min_time', 'time', 'visits'])
+
+  def test_values(self):
+    profile = cr.CubeReader(self.cubex).read()
+    self.assertEqual(list(profile.get_exclusive('visits')), [2, 20, 40, 5])
+    self.assertEqual(list(profile.get_exclusive('time')), [2.5, 4.0, 7.0, .0])
+    self.assertEqual(list(profile.get_inclusive('time')), [13.5, 11.0, 7.0, .0])
+    self.assertEqual(list(profile.get_exclusive('min_time')), [8.0, 5.0, 1.0, .5])
+    self.assertRaises(cr.CubeReaderException, profile.get_inclusive, 'min_time')
+    self.assertEqual(profile.get_region_totals('visits'), {'main': 2, 'foo': 20, 'bar': 45})
+    self.assertEqual(profile.get_total('time'), 13.5)
+
+  def test_inclusive_extremum(self):
+    write_cubex(
+        self.cubex, {
+            'anchor.xml': anchor.replace('<metric id="2" type="EXCLUSIVE">',
+                                         '<metric id="2" type="INCLUSIVE">').encode('utf-8'),
+            '2.index': dense_index(),
+            '2.data': b'CUBEX.DATA' + struct.pack('<8d', 9.0, 8.0, 5.0, 6.0, 1.0, 2.0, .5, 1.0)
+        })
+    profile = cr.CubeReader(self.cubex, ['min_time']).read()
+    self.assertEqual(list(profile.get_values('min_time')), [8.0, 5.0, 1.0, .5])
+    self.assertEqual(profile.get_metrics()['min_time'].get_aggregation(), 'min')
+    self.assertRaises(cr.CubeReaderException, profile.get_exclusive, 'min_time')
+
+  def test_metric_filter(self):
+    profile = cr.CubeReader(self.cubex, ['time']).read()
+    self.assertEqual(list(profile.get_metrics().keys()), ['time'])
+    self.assertRaises(cr.CubeReaderException, profile.get_exclusive, 'visits')
+    self.assertRaises(cr.CubeReaderException, cr.CubeReader(self.cubex, ['nope']).read)
+    self.assertRaises(cr.CubeReaderException, cr.CubeReader(self.cubex, ['derived']).read)
+
+  def test_invalid(self):
+    broken = os.path.join(self.dir, 'broken.cubex')
+    write_cubex(broken, {'anchor.xml': anchor.encode('utf-8'), '0.index': dense_index(), '0.data': b'CUBEX.DATA'})
+    self.assertRaises(cr.CubeReaderException, cr.CubeReader(broken, ['visits']).read)
+    with open(broken, 'w') as f:
+      f.write('no tar file')
+    self.assertRaises(cr.CubeReaderException, cr.CubeReader(broken).read)
+
+  def test_chunked(self):
+    chunk_size = cr.CubeReader.chunk_size
+    # One cnode, i.e., the values of two locations, per read
+    cr.CubeReader.chunk_size = 1
+    try:
+      profile = cr.CubeReader(self.cubex).read()
+    finally:
+      cr.CubeReader.chunk_size = chunk_size
+    self.assertEqual(list(profile.get_exclusive('visits')), [2, 20, 40, 5])
+    self.assertEqual(list(profile.get_exclusive('min_time')), [8.0, 5.0, 1.0, .5])
+
+  def test_too_many_values(self):
+    broken = os.path.join(self.dir, 'broken.cubex')
+    write_cubex(broken, {
+        'anchor.xml': anchor.encode('utf-8'),
+        '0.index': dense_index(),
+        '0.data': b'CUBEX.DATA' + struct.pack('<9Q', *range(9))
+    })
+    self.assertRaises(cr.CubeReaderException, cr.CubeReader(broken, ['visits']).read)
+
+  @unittest.skipIf(cr.np is None, 'NumPy not available')
+  def test_numpy(self):
+    profile = cr.CubeReader(self.cubex).read()
+    self.assertEqual(profile.to_numpy('time', inclusive=True).tolist(), [13.5, 11.0, 7.0, .0])
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -9,7 +9,11 @@ sys.path.append('..')
 
 import lib.Database as d
 import lib.tables as tbls
+import lib.Measurement as ms
+from lib.ProcessEngine import ResourceUsage
 
+import sqlite3
+import tempfile
 import unittest
 import os
 
@@ -45,7 +49,9 @@ class TestDatabaseManip(unittest.TestCase):
 
   @classmethod
   def tearDownClass(cls):
-    os.remove('test.sqlite')
+    for suffix in ['', '-wal', '-shm']:
+      if os.path.exists('test.sqlite' + suffix):
+        os.remove('test.sqlite' + suffix)
 
   def setUp(self):
     d.DBManager.instance = None
@@ -68,6 +74,119 @@ class TestDatabaseManip(unittest.TestCase):
     self.dbm.create_table(tbls.create_experiment_table)
     # XXX Add actual asserts
 
+  def test_schema_and_wal(self):
+    tables = [r[0] for r in self.dbm.conn.execute("SELECT name FROM sqlite_master WHERE type='table'")]
+    for table in ['Application', 'Builds', 'Items', 'Experiment', 'BaselineCache', 'Checkpoint']:
+      self.assertIn(table, tables)
+    self.assertEqual(self.dbm.conn.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+
+  def test_buffered_inserts(self):
+    other = d.DBManager.DBImpl('test.sqlite')
+    self.dbm.insert_data_application(('app-id', 'app', '', ''))
+    self.dbm.insert_data_builds(('build-id', 'build', '', 'fl', 'app'))
+    self.assertEqual(self.dbm.get_num_pending(), 2)
+    self.assertEqual(other.conn.execute("SELECT COUNT(*) FROM Builds WHERE BuildID='build-id'").fetchone()[0], 0)
+
+    self.dbm.flush()
+    self.assertEqual(self.dbm.get_num_pending(), 0)
+    self.assertEqual(other.conn.execute("SELECT COUNT(*) FROM Builds WHERE BuildID='build-id'").fetchone()[0], 1)
+    other.close()
+
+  def test_flush_threshold(self):
+    threshold = d.DBManager.DBImpl.flush_threshold
+    for i in range(threshold + 1):
+      self.dbm.insert_data_application(('thr-' + str(i), 'app', '', ''))
+    self.assertEqual(self.dbm.get_num_pending(), 1)
+    self.dbm.flush()
+    self.assertEqual(self.dbm.conn.execute("SELECT COUNT(*) FROM Application WHERE AppID LIKE 'thr-%'").fetchone()[0],
+                     threshold + 1)
+
+  def test_failed_flush(self):
+    self.dbm.insert_data_application(('dup-id', 'app', '', ''))
+    self.dbm.insert_data_application(('dup-id', 'app', '', ''))
+    self.assertRaises(d.DBException, self.dbm.flush)
+    self.assertEqual(self.dbm.conn.execute("SELECT COUNT(*) FROM Application WHERE AppID='dup-id'").fetchone()[0], 0)
+
+
+class TestExperimentData(unittest.TestCase):
+
+  """ Tests storing the RunResults in the Experiment table """
+
+  def setUp(self):
+    self.dbm = d.DBManager.DBImpl(':memory:')
+    self.dbm.create_cursor()
+
+  def test_schema_version(self):
+    self.assertEqual(self.dbm.get_schema_version(), tbls.schema_version)
+    indexes = [r[0] for r in self.dbm.conn.execute("SELECT name FROM sqlite_master WHERE type='index'")]
+    self.assertIn('Experiment_Item_Iteration', indexes)
+
+  def test_enter_run_data(self):
+    usages = [ResourceUsage(int(w * 1e9), .5, .1, 1024, 0, 0) for w in [1.0, 1.1, 1.0, 9.0, 1.05]]
+    ms.RunResult.set_outlier_rejection('mad')
+    try:
+      run_result = ms.RunResult.from_usages(usages)
+      run_result.add_values(4.0, 2)
+      self.dbm.enter_run_data('exp', 'bench', 2, True, '/exp/fl-bench.cubex', run_result, 'item', ['-n 1', '-n 2'])
+    finally:
+      ms.RunResult.set_outlier_rejection('none')
+    self.dbm.flush()
+
+    rows = self.dbm.conn.execute('SELECT Position, Args, Repetition, WallTime, UserTime, MaxRSS, IsOutlier, '
+                                 'Iteration_No, IsWithInstrumentation FROM Experiment WHERE Item_ID=? AND '
+                                 'Iteration_No=? ORDER BY Position, Repetition', ('item', 2)).fetchall()
+    # The aggregate position is a single row
+    self.assertEqual(len(rows), 6)
+    self.assertEqual(rows[0], (0, '-n 1', 0, 1.0, .5, 1024, 0, 2, 1))
+    self.assertEqual(rows[3][6], 1)
+    self.assertEqual(rows[5], (1, '-n 2', 0, 2.0, None, None, 0, 2, 1))
+    self.assertEqual(self.dbm.conn.execute("SELECT typeof(WallTime) FROM Experiment LIMIT 1").fetchone()[0], 'real')
+
+  def test_migrate(self):
+    db_dir = tempfile.mkdtemp()
+    db_file = os.path.join(db_dir, 'old.sqlite')
+    conn = sqlite3.connect(db_file)
+    conn.execute(""" CREATE TABLE Experiment (Experiment_ID text PRIMARY KEY, BenchmarkName text,
+                     Iteration_No INTEGER, IsWithInstrumentation INTEGER, CubeFilePath text NOT NULL,
+                     Runtime text NOT NULL, Item_ID text NOT NULL) """)
+    conn.execute("INSERT INTO Experiment VALUES ('old', 'bench', 0, 0, 'cube', '1.0', 'item')")
+    conn.commit()
+    conn.close()
+
+    dbm = d.DBManager.DBImpl(db_file)
+    self.assertEqual(dbm.get_schema_version(), tbls.schema_version)
+    self.assertEqual(dbm.conn.execute('SELECT COUNT(*) FROM Experiment_v0').fetchone()[0], 1)
+    self.assertEqual(dbm.conn.execute('SELECT COUNT(*) FROM Experiment').fetchone()[0], 0)
+    dbm.close()
+    # A current database is left untouched
+    dbm = d.DBManager.DBImpl(db_file)
+    self.assertEqual(dbm.conn.execute('SELECT COUNT(*) FROM Experiment_v0').fetchone()[0], 1)
+    dbm.close()
+    for f in os.listdir(db_dir):
+      os.remove(os.path.join(db_dir, f))
+    os.rmdir(db_dir)
+
+  def test_migrate_version_1(self):
+    db_dir = tempfile.mkdtemp()
+    db_file = os.path.join(db_dir, 'old.sqlite')
+    conn = sqlite3.connect(db_file)
+    conn.execute(tbls.create_checkpoint_table)
+    conn.execute("INSERT INTO Checkpoint VALUES ('target', 'build', 0, '{}', 0)")
+    conn.execute('PRAGMA user_version=1')
+    conn.commit()
+    conn.close()
+
+    dbm = d.DBManager.DBImpl(db_file)
+    self.assertEqual(dbm.get_schema_version(), tbls.schema_version)
+    # The checkpoints of an older schema are not resumed from
+    self.assertEqual(dbm.conn.execute('SELECT COUNT(*) FROM Checkpoint_v1').fetchone()[0], 1)
+    self.assertEqual(dbm.conn.execute('SELECT COUNT(*) FROM Checkpoint').fetchone()[0], 0)
+    self.assertEqual(dbm.conn.execute('SELECT COUNT(*) FROM PerfEvent').fetchone()[0], 0)
+    dbm.close()
+    for f in os.listdir(db_dir):
+      os.remove(os.path.join(db_dir, f))
+    os.rmdir(db_dir)
+
 
 if __name__ == '__main__':
   unittest.main()
@@ -0,0 +1,201 @@
+"""
+File: LoggingTest.py
+License: Part of the PIRA project. Licensed under BSD 3 clause license. See LICENSE.txt file at https://github.com/jplehr/pira/LICENSE.txt
+Description: Tests for the logger
+"""
+
+import sys
+sys.path.append('..')
+
+import lib.Logging as log
+
+import os
+import shutil
+import tempfile
+import unittest
+
+
+class Counter:
+
+  def __init__(self):
+    self.calls = 0
+
+  def __call__(self):
+    self.calls += 1
+    return 'built'
+
+
+class TestLogger(unittest.TestCase):
+
+  def setUp(self):
+    self.logger = log.Logger()
+    self.logger.set_state('info', False)
+    self.logger.set_state('warn', False)
+    self.logger.set_state('error', False)
+
+  def test_format_args(self):
+    self.logger.set_tape_policy('all')
+    self.logger.log('a %s b %d', 'x', 3, level='debug')
+    self.assertEqual(self.logger.get_last_msg(), '[debug] a x b 3')
+    self.logger.log('100% literal', level='debug')
+    self.assertEqual(self.logger.tape, ['[debug] a x b 3', '[debug] 100% literal'])
+
+  def test_policy_all(self):
+    counter = Counter()
+    values = [1]
+    self.logger.set_tape_policy('all')
+    self.logger.log(counter, level='debug')
+    self.logger.log('values %s', values, level='debug')
+    # The messages of disabled levels are formatted right away, before their arguments change
+    values.append(2)
+    self.assertEqual(counter.calls, 1)
+    self.assertEqual(self.logger.tape, ['[debug] built', '[debug] values [1]'])
+    self.assertEqual(counter.calls, 1)
+
+  def test_lazy_on_tape(self):
+    counter = Counter()
+    self.logger.set_state('info', True)
+    self.logger.log(counter, level='info')
+    self.assertEqual(counter.calls, 1)
+    self.assertEqual(self.logger.tape, ['[info] built'])
+    self.assertEqual(counter.calls, 1)
+
+  def test_policy_enabled(self):
+    counter = Counter()
+    self.assertEqual(self.logger.tape_policy, 'enabled')
+    self.logger.log(counter, level='debug')
+    self.logger.log('%s', counter, level='info')
+    self.logger.log('perf %s', 1, level='perf')
+    self.assertEqual(counter.calls, 0)
+    self.assertEqual(self.logger.tape, ['[perf] perf 1'])
+    self.assertEqual(self.logger.perf_tape, ['[PERF] perf 1'])
+
+  def test_policy_none(self):
+    self.logger.set_tape_policy('none')
+    self.logger.set_state('debug', True)
+    self.logger.log('debug', level='debug')
+    self.logger.log('perf', level='perf')
+    self.assertEqual(self.logger.tape, [])
+    self.assertEqual(self.logger.perf_tape, ['[PERF] perf'])
+    self.assertRaises(ValueError, self.logger.set_tape_policy, 'some')
+
+  def test_merge_tape(self):
+    worker = log.Logger()
+    worker.set_tape_policy('all')
+    worker.log('lane %d', 1, level='debug')
+    self.logger.merge_tape(worker.tape, worker.perf_tape, 'tag')
+    self.assertEqual(self.logger.tape, ['[tag] [debug] lane 1'])
+
+
+class TestTapeFile(unittest.TestCase):
+
+  def setUp(self):
+    self.dir = tempfile.mkdtemp()
+    self.tape_file = os.path.join(self.dir, 'tape.tp')
+    self.logger = log.Logger()
+    self.logger.set_state('info', False)
+    self.logger.set_tape_policy('all')
+    self.logger.ring_size = 5
+
+  def tearDown(self):
+    self.logger.close_tape()
+    shutil.rmtree(self.dir)
+
+  def read_tape(self, tape_file):
+    with open(tape_file) as f:
+      return f.read().splitlines()
+
+  def test_stream(self):
+    self.logger.log('before', level='debug')
+    self.logger.set_tape_file(self.tape_file)
+    for i in range(20):
+      self.logger.log('msg %d', i, level='info')
+    self.assertEqual(self.logger.get_last_msg(), '[info] msg 19')
+    self.assertEqual(len(self.logger.tape), 5)
+
+    self.logger.dump_tape(self.tape_file)
+    lines = self.read_tape(self.tape_file)
+    self.assertEqual(lines[0], '[debug] before')
+    self.assertEqual(lines[-1], '[info] msg 19')
+    self.assertEqual(len(lines), 21)
+
+    self.logger.close_tape()
+    self.assertIsNone(self.logger.get_tape_file())
+    self.logger.log('after', level='debug')
+    self.assertEqual(len(self.read_tape(self.tape_file)), 21)
+
+  def test_rotate(self):
+    self.logger.set_tape_file(self.tape_file, max_bytes=100, backups=2)
+    for i in range(30):
+      self.logger.log('message number %02d', i, level='debug')
+    self.logger.close_tape()
+    self.assertTrue(os.path.isfile(self.tape_file + '.1'))
+    self.assertTrue(os.path.isfile(self.tape_file + '.2'))
+    self.assertFalse(os.path.isfile(self.tape_file + '.3'))
+    self.assertEqual(self.read_tape(self.tape_file)[-1], '[debug] message number 29')
+    for f in os.listdir(self.dir):
+      self.assertLessEqual(os.path.getsize(os.path.join(self.dir, f)), 100)
+
+  def test_bad_record(self):
+    writer = log.TapeWriter(self.tape_file, flush_interval=.01)
+    writer.write(('[debug] ', log.LazyMessage('value %d', ('not-a-number',))))
+    writer.write('[debug] next')
+    # Returns, as the writer thread keeps running
+    writer.flush()
+    writer.close()
+    tape = self.read_tape(self.tape_file)
+    self.assertTrue(tape[0].startswith('[debug] TapeWriter: Cannot format record: TypeError'))
+    self.assertEqual(tape[1], '[debug] next')
+
+  def test_rotate_after_chdir(self):
+    cwd = os.getcwd()
+    os.chdir(self.dir)
+    try:
+      self.logger.set_tape_file('tape.tp', max_bytes=100, backups=1)
+      os.chdir('/')
+      for i in range(10):
+        self.logger.log('message number %02d', i, level='debug')
+      self.logger.dump_tape(self.tape_file)
+      self.assertEqual(self.logger.get_tape_file(), self.tape_file)
+    finally:
+      os.chdir(cwd)
+    self.logger.close_tape()
+    self.assertTrue(os.path.isfile(self.tape_file + '.1'))
+    self.assertEqual(self.read_tape(self.tape_file)[-1], '[debug] message number 09')
+
+  def test_detach(self):
+    self.logger.set_tape_file(self.tape_file)
+    self.logger.log('streamed', level='debug')
+    self.logger.flush_tape()
+    # As in a forked worker process
+    writer = self.logger._writer
+    self.logger._detach_tape()
+    self.logger.log('in memory', level='debug')
+    self.assertEqual(self.logger.tape, ['[debug] streamed', '[debug] in memory'])
+    writer.close()
+    self.assertEqual(self.read_tape(self.tape_file), ['[debug] streamed'])
+
+  @unittest.skipIf(not hasattr(os, 'fork'), 'fork not available')
+  def test_fork(self):
+    self.logger.set_tape_file(self.tape_file)
+    for i in range(1000):
+      self.logger.log('parent %d', i, level='debug')
+    # As registered for the global logger with os.register_at_fork
+    self.logger._before_fork()
+    pid = os.fork()
+    if pid == 0:
+      self.logger._detach_tape()
+      self.logger.log('child', level='debug')
+      os._exit(0 if self.logger._writer is None and len(self.logger._detached_writers) == 1 else 1)
+    self.logger._after_fork_in_parent()
+    _, status = os.waitpid(pid, 0)
+    self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+    self.logger.log('after fork', level='debug')
+    self.logger.close_tape()
+    tape = self.read_tape(self.tape_file)
+    self.assertEqual(len(tape), 1001)
+    self.assertEqual(tape[-1], '[debug] after fork')
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -14,6 +14,7 @@ import lib.Measurement as m
 import lib.ConfigurationLoader as cln
 import lib.DefaultFlags as dff
 from lib.Configuration import PiraConfiguration, TargetConfiguration, InstrumentConfig
+from lib.ProcessEngine import ResourceUsage
 
 
 class TestRunResult(unittest.TestCase):
@@ -54,6 +55,85 @@ class TestRunResult(unittest.TestCase):
     self.assertEqual(rr.compute_overhead(rr2, 1), 0.5)
     self.assertEqual(rr.compute_overhead(rr2, 2), 0.5)
 
+  def test_usages(self):
+    rr = m.RunResult.from_usages([ResourceUsage(int(2e9), 1.0, .5, 100, 1, 2), ResourceUsage(int(4e9), 3.0, .5, 300)])
+    base = m.RunResult.from_usages([ResourceUsage(int(1e9), 1.0, .0, 100), ResourceUsage(int(1e9), 1.0, .0, 100)])
+
+    self.assertTrue(rr.has_usages())
+    self.assertEqual(rr.get_average(), 3.0)
+    self.assertEqual(rr.get_average_user_time(), 2.0)
+    self.assertEqual(rr.get_average_sys_time(), .5)
+    self.assertEqual(rr.get_average_cpu_time(), 2.5)
+    self.assertEqual(rr.get_average_context_switches(), 1.5)
+    self.assertEqual(rr.get_max_rss(), 300)
+    self.assertEqual(rr.compute_overhead(base), 3.0)
+    self.assertEqual(rr.compute_cpu_overhead(base), 2.5)
+    self.assertEqual(rr.compute_memory_overhead(base), 3.0)
+
+  def test_no_usages(self):
+    rr = m.RunResult(4.0, 1)
+    self.assertFalse(rr.has_usages())
+    self.assertRaises(RuntimeError, rr.get_average_cpu_time)
+
+  def test_statistics(self):
+    rr = m.RunResult.from_usages([ResourceUsage(int(v * 1e9)) for v in [1.0, 2.0, 3.0, 4.0, 10.0]])
+
+    self.assertEqual(rr.get_average(), 4.0)
+    self.assertEqual(rr.get_median(), 3.0)
+    self.assertEqual(rr.get_mad(), 1.0)
+    self.assertAlmostEqual(rr.get_stddev(), 3.5355, places=4)
+    lower, upper = rr.get_confidence_interval()
+    self.assertAlmostEqual(lower, 4.0 - 2.776 * 3.5355 / 5**.5, places=3)
+    self.assertAlmostEqual(upper, 4.0 + 2.776 * 3.5355 / 5**.5, places=3)
+
+  def test_outlier_rejection(self):
+    rr = m.RunResult.from_usages([ResourceUsage(int(v * 1e9), v) for v in [1.0, 1.1, 0.9, 1.0, 10.0]])
+    try:
+      m.RunResult.set_outlier_rejection('mad')
+      self.assertEqual(rr.get_num_outliers(), 1)
+      self.assertAlmostEqual(rr.get_average(), 1.0)
+      self.assertAlmostEqual(rr.get_average_user_time(), 1.0)
+      m.RunResult.set_outlier_rejection('iqr')
+      self.assertEqual(rr.get_num_outliers(), 1)
+    finally:
+      m.RunResult.set_outlier_rejection('none')
+    self.assertEqual(rr.get_num_outliers(), 0)
+    self.assertRaises(m.MeasurementSystemException, m.RunResult.set_outlier_rejection, 'foo')
+
+  def test_overhead_interval(self):
+    rr = m.RunResult.from_usages([ResourceUsage(int(v * 1e9)) for v in [3.9, 4.0, 4.1]])
+    base = m.RunResult.from_usages([ResourceUsage(int(v * 1e9)) for v in [1.9, 2.0, 2.1]])
+    ovh = rr.compute_overhead(base)
+
+    self.assertAlmostEqual(ovh, 2.0)
+    lower, upper = ovh.get_interval()
+    self.assertLess(lower, 2.0)
+    self.assertGreater(upper, 2.0)
+    self.assertEqual(m.RunResult(4.0, 1).compute_overhead(m.RunResult(2.0, 1)).get_interval(), (2.0, 2.0))
+
+  def test_aggregate(self):
+    rr = m.RunResult(6.0, 3)
+    self.assertFalse(rr.has_samples())
+    self.assertEqual(rr.get_average(), 2.0)
+    self.assertRaises(m.MeasurementSystemException, rr.get_confidence_interval)
+    self.assertRaises(m.MeasurementSystemException, rr.get_stddev)
+    self.assertRaises(m.MeasurementSystemException, rr.get_num_outliers)
+    base = m.RunResult.from_usages([ResourceUsage(int(v * 1e9)) for v in [0.9, 1.0, 1.1]])
+    self.assertEqual(rr.compute_overhead(base).get_interval(), (2.0, 2.0))
+    rr2 = m.RunResult.from_json(rr.to_json())
+    self.assertFalse(rr2.has_samples())
+    self.assertEqual(rr2.get_average(), 2.0)
+
+  def test_serialization(self):
+    rr = m.RunResult.from_usages([ResourceUsage(int(2e9), 1.0, .5, 100, 1, 2), ResourceUsage(int(4e9), 3.0, .5, 300)])
+    rr.add_values(6.0, 2)
+    rr2 = m.RunResult.from_json(rr.to_json())
+
+    self.assertEqual(rr2.get_all_averages(), [3.0, 3.0])
+    self.assertEqual(rr2.get_max_rss(), 300)
+    self.assertTrue(rr2.has_usages(0))
+    self.assertFalse(rr2.has_usages(1))
+
 class TestScorepHelper(unittest.TestCase):
   """
   Tests the ScorepSystemHelper class and, currently, also the DefaultFlags.
@@ -85,6 +165,18 @@ class TestScorepHelper(unittest.TestCase):
     self.assertEqual('item01-flavor01-item01', s_mh.cur_base_name)
     self.assertEqual('/tmp/where/cube/files/are/item01-item01-flavor01-0', s_mh.cur_exp_directory)
 
+  def test_scorep_mh_env(self):
+    old_environ = dict(m.u.os.environ)
+    s_mh = m.ScorepSystemHelper(self.cfg)
+    s_mh.set_up(self.target_cfg, self.instr_cfg, True)
+
+    env = s_mh.get_env()
+    self.assertEqual('/tmp/where/cube/files/are/item01-item01-flavor01-0', env['SCOREP_EXPERIMENT_DIRECTORY'])
+    self.assertEqual('500M', env['SCOREP_TOTAL_MEMORY'])
+    self.assertEqual('True', env['SCOREP_OVERWRITE_EXPERIMENT_DIRECTORY'])
+    self.assertNotIn('SCOREP_FILTERING_FILE', env)
+    self.assertDictEqual(old_environ, dict(m.u.os.environ))
+
   def test_scorep_mh_set_up_no_instr(self):
     s_mh = m.ScorepSystemHelper(self.cfg)
     self.instr_cfg._is_instrumentation_run = False
@@ -95,6 +187,7 @@ class TestScorepHelper(unittest.TestCase):
     self.assertEqual('False', s_mh.cur_overwrite_exp_dir)
     self.assertEqual('', s_mh.cur_base_name)
     self.assertEqual('', s_mh.cur_exp_directory)
+    self.assertDictEqual({}, s_mh.get_env())
 
   def test_scorep_mh_dir_invalid(self):
     s_mh = m.ScorepSystemHelper(self.cfg)
@@ -127,6 +220,15 @@ class TestScorepHelper(unittest.TestCase):
     cpp = kw_dict['CXX']
     self.assertEqual('\"clang++\"', cpp)
 
+  def test_wrap_dir_per_target(self):
+    provider = dff.BackendDefaults()
+    tc = TargetConfiguration('/tmp/a', '/tmp/a', 'item01', 'fl', '')
+    self.assertIsNone(tc.get_wrap_dir())
+    self.assertEqual(provider.get_wrap_so_file(tc.get_wrap_dir()), provider.get_wrap_dir() + '/PIRA_MPI_Filter.so')
+    tc.set_wrap_dir('/tmp/pira-wrap-a')
+    self.assertEqual(provider.get_MPI_wrap_LD_PRELOAD(tc.get_wrap_dir()), 'LD_PRELOAD=/tmp/pira-wrap-a/PIRA_MPI_Filter.so')
+    self.assertEqual(provider.get_MPI_functions_file(tc.get_wrap_dir()), '/tmp/pira-wrap-a/mpi_funcs.dump')
+
 
 if __name__ == '__main__':
   unittest.main()
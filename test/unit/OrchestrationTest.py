@@ -0,0 +1,80 @@
+"""
+File: OrchestrationTest.py
+License: Part of the PIRA project. Licensed under BSD 3 clause license. See LICENSE.txt file at https://github.com/jplehr/pira/LICENSE.txt
+Description: Tests for the asyncio based orchestration
+"""
+
+import sys
+sys.path.append('..')
+
+import lib.Orchestration as orch
+import lib.BatchSystemHelper as bat_sys
+from lib.Configuration import TargetConfiguration
+
+import os
+import threading
+import time
+import unittest
+
+
+def make_target(item: str) -> TargetConfiguration:
+  return TargetConfiguration('/tmp', '/tmp', item, 'fl', item)
+
+
+class TestAsyncOrchestrator(unittest.TestCase):
+
+  def setUp(self):
+    self.targets = [make_target('a'), make_target('b'), make_target('c')]
+    self.lock = threading.Lock()
+    self.active = []
+    self.peak = 0
+    self.executed = []
+
+  def execute(self, target_config):
+    with self.lock:
+      self.active.append(target_config.get_target())
+      self.peak = max(self.peak, len(self.active))
+      self.executed.append((target_config.get_target(), target_config.get_wrap_dir(), bat_sys._poll_loop))
+    time.sleep(.1)
+    with self.lock:
+      self.active.remove(target_config.get_target())
+
+  def test_lanes(self):
+    orch.AsyncOrchestrator(self.execute).run(self.targets, [[0, 2], [1]])
+    # a and c share a lane, which is executed concurrently to the one of b
+    self.assertEqual(self.peak, 2)
+    order = [target for target, _, _ in self.executed]
+    self.assertLess(order.index('a'), order.index('c'))
+    self.assertEqual(sorted(order), ['a', 'b', 'c'])
+
+  def test_wrap_dir_per_target(self):
+    orch.AsyncOrchestrator(self.execute).run(self.targets, [[0], [1], [2]])
+    wrap_dirs = [wrap_dir for _, wrap_dir, _ in self.executed]
+    self.assertEqual(len(set(wrap_dirs)), 3)
+    for wrap_dir in wrap_dirs:
+      self.assertFalse(os.path.exists(wrap_dir))
+    for target_config in self.targets:
+      self.assertIsNone(target_config.get_wrap_dir())
+
+  def test_poll_loop(self):
+    orch.AsyncOrchestrator(self.execute).run(self.targets[:1], [[0]])
+    self.assertIsNotNone(self.executed[0][2])
+    self.assertIsNone(bat_sys._poll_loop)
+
+  def test_failure(self):
+
+    def execute(target_config):
+      if target_config.get_target() == 'a':
+        raise RuntimeError('failed')
+      self.execute(target_config)
+
+    with self.assertRaises(RuntimeError) as ctx:
+      orch.AsyncOrchestrator(execute).run(self.targets, [[0, 2], [1]])
+    self.assertIn('a/fl', str(ctx.exception))
+    self.assertNotIn('b/fl', str(ctx.exception))
+    # The remaining targets of the failed lane are skipped, the other lanes are completed
+    self.assertEqual([target for target, _, _ in self.executed], ['b'])
+
+
+if __name__ == '__main__':
+  unittest.main()
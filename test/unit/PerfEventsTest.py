@@ -0,0 +1,87 @@
+"""
+File: PerfEventsTest.py
+License: Part of the PIRA project. Licensed under BSD 3 clause license. See LICENSE.txt file at https://github.com/jplehr/pira/LICENSE.txt
+Description: Tests for the performance events
+"""
+
+import sys
+sys.path.append('..')
+
+import lib.PerfEvents as pe
+import lib.Database as d
+import lib.Configuration as c
+
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import unittest
+
+
+class FailingExporter(pe.PerfEventExporterBase):
+
+  def export(self, event):
+    raise RuntimeError('broken')
+
+
+def emit_in_child():
+  pe.emit('runtime', iteration=1, value=2.0)
+
+
+class TestPerfEvents(unittest.TestCase):
+
+  def setUp(self):
+    self.dir = tempfile.mkdtemp()
+    self.tc = c.TargetConfiguration(self.dir, self.dir, 'asd', 'fl', 'item-id')
+
+  def tearDown(self):
+    pe.close_exporters()
+    shutil.rmtree(self.dir)
+
+  def read_events(self, out_file):
+    with open(out_file) as f:
+      return [json.loads(line) for line in f]
+
+  def test_event(self):
+    event = pe.PerfEvent('overhead', 'asd/fl', 2, 'run', value=1.5, attributes={'lower': 1.4})
+    values = event.to_dict()
+    self.assertEqual(values['kind'], 'overhead')
+    self.assertEqual(values['iteration'], 2)
+    self.assertEqual(values['attributes'], {'lower': 1.4})
+    self.assertEqual(values['pid'], os.getpid())
+    self.assertRaises(pe.PerfEventException, pe.PerfEvent, 'unknown')
+
+  def test_json_lines(self):
+    out_file = os.path.join(self.dir, 'events.jsonl')
+    pe.emit('runtime', self.tc, iteration=0, value=1.0)
+    self.assertFalse(os.path.exists(out_file))
+
+    pe.add_exporter(pe.JsonLinesExporter(out_file))
+    pe.add_exporter(FailingExporter())
+    pe.emit('runtime', self.tc, iteration=-1, phase='run', duration=3.0, value=1.0)
+    process = multiprocessing.get_context('fork').Process(target=emit_in_child)
+    process.start()
+    process.join()
+    pe.emit('whitelist', self.tc, iteration=0, value=12)
+
+    events = self.read_events(out_file)
+    self.assertEqual([e['kind'] for e in events], ['runtime', 'runtime', 'whitelist'])
+    self.assertEqual(events[0]['target'], 'asd/fl')
+    self.assertEqual(events[0]['item_id'], 'item-id')
+    self.assertEqual(events[0]['duration'], 3.0)
+    self.assertIsNone(events[1]['target'])
+    self.assertNotEqual(events[1]['pid'], events[0]['pid'])
+
+  def test_database(self):
+    dbm = d.DBManager.DBImpl(':memory:')
+    pe.add_exporter(pe.DatabaseExporter(dbm))
+    pe.emit('overhead', self.tc, iteration=1, phase='run', value=1.25, attributes={'upper': 1.3})
+    pe.close_exporters()
+    rows = dbm.conn.execute('SELECT Kind, Target, Item_ID, Iteration_No, Value, Attributes FROM PerfEvent').fetchall()
+    self.assertEqual(rows, [('overhead', 'asd/fl', 'item-id', 1, 1.25, '{"upper": 1.3}')])
+    self.assertEqual(len(pe.get_exporters()), 0)
+
+
+if __name__ == '__main__':
+  unittest.main()
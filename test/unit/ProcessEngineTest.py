@@ -0,0 +1,110 @@
+"""
+File: ProcessEngineTest.py
+License: Part of the PIRA project. Licensed under BSD 3 clause license. See LICENSE.txt file at https://github.com/jplehr/pira/LICENSE.txt
+Description: Tests for the process engine
+"""
+
+import sys
+sys.path.append('..')
+
+import lib.ProcessEngine as pe
+
+import os
+import unittest
+
+
+class TestArgv(unittest.TestCase):
+
+  def test_simple_command(self):
+    argv, env = pe.ProcessEngine.to_argv('./gol 50')
+    self.assertEqual(argv, ['./gol', '50'])
+    self.assertDictEqual(env, {})
+
+  def test_env_prefix(self):
+    argv, env = pe.ProcessEngine.to_argv('CXX="clang++ -O2" make gol')
+    self.assertEqual(argv, ['make', 'gol'])
+    self.assertDictEqual(env, {'CXX': 'clang++ -O2'})
+
+  def test_needs_shell(self):
+    for cmd in ['cd test && make', 'wrap.py -d > out', 'CXX=${CXX} make', 'echo `ls`', 'cd test', 'A=b']:
+      argv, env = pe.ProcessEngine.to_argv(cmd)
+      self.assertEqual(argv, ['/bin/sh', '-c', cmd])
+      self.assertDictEqual(env, {})
+
+  def test_argv_passthrough(self):
+    argv, env = pe.ProcessEngine.to_argv(['echo', 'a && b'])
+    self.assertEqual(argv, ['echo', 'a && b'])
+
+
+class TestBoundedBuffer(unittest.TestCase):
+
+  def test_keeps_tail(self):
+    buf = pe.BoundedBuffer(4)
+    buf.append(b'ab')
+    self.assertFalse(buf.is_truncated())
+    buf.append(b'cdef')
+    self.assertEqual(buf.get_value(), b'cdef')
+    self.assertTrue(buf.is_truncated())
+
+
+class TestExecutionContext(unittest.TestCase):
+
+  def test_derive(self):
+    context = pe.ExecutionContext('/a', {'A': '1'})
+    derived = context.with_env({'B': '2'}).with_cwd('/b')
+    self.assertEqual(derived.get_cwd(), '/b')
+    self.assertDictEqual(derived.get_env(), {'A': '1', 'B': '2'})
+    # The original context is unchanged
+    self.assertEqual(context.get_cwd(), '/a')
+    self.assertDictEqual(context.get_env(), {'A': '1'})
+    context.get_env()['C'] = '3'
+    self.assertDictEqual(context.get_env(), {'A': '1'})
+
+
+class TestProcessEngine(unittest.TestCase):
+
+  def test_run_output(self):
+    res = pe.ProcessEngine().run('echo "Hello World!"')
+    self.assertTrue(res.succeeded())
+    self.assertEqual(res.get_stdout(), 'Hello World!\n')
+    self.assertIsNotNone(res.get_rusage())
+    self.assertGreater(res.get_wall_time(), .0)
+
+  def test_run_stderr_and_code(self):
+    res = pe.ProcessEngine().run('echo err 1>&2; exit 3')
+    self.assertFalse(res.succeeded())
+    self.assertEqual(res.get_return_code(), 3)
+    self.assertEqual(res.get_stderr(), 'err\n')
+
+  def test_run_env(self):
+    res = pe.ProcessEngine().run('PIRA_A=a printenv PIRA_A PIRA_B', env={'PIRA_B': 'b'})
+    self.assertEqual(res.get_stdout(), 'a\nb\n')
+
+  def test_run_cwd(self):
+    res = pe.ProcessEngine().run('pwd', cwd='/')
+    self.assertEqual(res.get_stdout(), '/\n')
+
+  def test_bounded_output(self):
+    res = pe.ProcessEngine(max_output=10).run('seq 1 10000')
+    self.assertTrue(res.is_output_truncated())
+    self.assertEqual(res.get_stdout(), '\n9999\n10000\n'[-10:])
+
+  def test_timeout(self):
+    res = pe.ProcessEngine().run('sleep 10', timeout=0.2)
+    self.assertTrue(res.is_timed_out())
+    self.assertFalse(res.succeeded())
+    self.assertLess(res.get_wall_time(), 5.0)
+
+  def test_not_found(self):
+    res = pe.ProcessEngine().run('/this/does/not/exist')
+    self.assertEqual(res.get_return_code(), 127)
+    self.assertIsNone(res.get_rusage())
+
+  def test_callback(self):
+    chunks = []
+    pe.ProcessEngine().run('echo streamed', output_callback=chunks.append)
+    self.assertEqual(b''.join(chunks), b'streamed\n')
+
+
+if __name__ == '__main__':
+  unittest.main()
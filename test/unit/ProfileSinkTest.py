@@ -10,7 +10,13 @@ sys.path.append('..')
 
 import lib.ProfileSink as ps
 import lib.Configuration as c
+from CubeReaderTest import anchor, dense_index, sparse_index, write_cubex
 
+import json
+import os
+import shutil
+import struct
+import tempfile
 import unittest
 import typing
 
@@ -40,5 +46,135 @@ class TestProfileSink(unittest.TestCase):
     self.assertEqual(es.get_target(), '')
 
 
+class TestExtrapSinks(unittest.TestCase):
+
+  def setUp(self):
+    self._dir = tempfile.mkdtemp()
+    self._exp_dir = os.path.join(self._dir, 'exp')
+    self._extrap_dir = os.path.join(self._dir, 'extrap')
+    os.makedirs(self._exp_dir)
+    self._tc = c.TargetConfiguration(self._dir, self._dir, 'asd', 'fl', 'a')
+    self._tc.set_args_for_invocation('x10')
+    self._ic = c.InstrumentConfig(True, 0)
+
+  def tearDown(self):
+    shutil.rmtree(self._dir)
+
+  def write_profile(self, visits, time):
+    # Replace the file, as Score-P does for every run
+    cubex = os.path.join(self._exp_dir, 'fl-asd.cubex')
+    if os.path.exists(cubex):
+      os.remove(cubex)
+    write_cubex(
+        cubex, {
+            'anchor.xml': anchor.encode('utf-8'),
+            '0.index': dense_index(),
+            '0.data': b'CUBEX.DATA' + struct.pack('<8Q', *visits),
+            '1.index': sparse_index([0, 1, 2]),
+            '1.data': b'CUBEX.DATA' + struct.pack('<6d', *time)
+        })
+
+  def test_extrap_link(self):
+    es = ps.ExtrapProfileSink(self._extrap_dir, ['x'], 'pre', 'post', 'profile.cubex', 2, link=True)
+    self.write_profile([1] * 8, [1.0] * 6)
+    es.process(self._exp_dir, self._tc, self._ic)
+    first = os.path.join(es.get_target(), 'profile.cubex')
+    self.assertTrue(es.get_target().endswith('/i0/pre.x10.post.r1'))
+    self.assertTrue(os.path.samefile(first, os.path.join(self._exp_dir, 'fl-asd.cubex')))
+
+    self.write_profile([2] * 8, [2.0] * 6)
+    es.process(self._exp_dir, self._tc, self._ic)
+    self.assertTrue(es.get_target().endswith('/i0/pre.x10.post.r2'))
+    self.assertFalse(os.path.samefile(first, os.path.join(es.get_target(), 'profile.cubex')))
+    self.assertEqual(es.get_copy_strategies(), {'link': 2})
+
+  def test_extrap_copy(self):
+    es = ps.ExtrapProfileSink(self._extrap_dir, ['x'], 'pre', 'post', 'profile.cubex', 1, link=False)
+    self.write_profile([1] * 8, [1.0] * 6)
+    es.process(self._exp_dir, self._tc, self._ic)
+    self.assertFalse(os.path.samefile(os.path.join(es.get_target(), 'profile.cubex'),
+                                      os.path.join(self._exp_dir, 'fl-asd.cubex')))
+    self.assertNotIn('link', es.get_copy_strategies())
+    self.assertEqual(sum(es.get_copy_strategies().values()), 1)
+
+  def test_extrap_summary(self):
+    es = ps.ExtrapSummaryProfileSink(self._extrap_dir, ['x'], 'pre', 'post', 'profile.cubex', 3, ['visits', 'time'])
+    for scale in [1, 3, 2]:
+      self.write_profile([scale] * 8, [scale * 1.0] * 6)
+      es.process(self._exp_dir, self._tc, self._ic)
+
+    # The summary is written once the runner finished the configuration
+    self.assertTrue(es.get_summary_file().endswith('/i0/pre.x10.post.summary.json'))
+    summary_file = es.get_summary_file()
+    self.assertFalse(os.path.exists(summary_file))
+    es.flush()
+    self.assertIsNone(es.get_summary_file())
+    with open(summary_file) as f:
+      summary = json.load(f)
+    self.assertEqual(summary['repetitions'], 3)
+    self.assertEqual(summary['metrics']['visits']['main/foo'], {'mean': 4, 'median': 4, 'min': 2})
+    self.assertEqual(summary['metrics']['time']['main/foo/bar'], {'mean': 4.0, 'median': 4.0, 'min': 2.0})
+    self.assertEqual(summary['metrics']['time']['main/bar'], {'mean': .0, 'median': .0, 'min': .0})
+    # The profiles, which the analysis of the next iteration reads, are kept as well
+    self.assertEqual(sorted(os.listdir(os.path.join(self._extrap_dir, 'i0'))),
+                     ['pre.x10.post.r1', 'pre.x10.post.r2', 'pre.x10.post.r3', 'pre.x10.post.summary.json'])
+    self.assertEqual(es.get_copy_strategies(), {'link': 3})
+
+    # A new iteration starts a new summary
+    es.process(self._exp_dir, self._tc, c.InstrumentConfig(True, 1))
+    summary_file = es.get_summary_file()
+    es.flush()
+    with open(summary_file) as f:
+      self.assertEqual(json.load(f)['repetitions'], 1)
+
+    cfg_file = es.output_pgis_config('asd', self._dir)
+    with open(cfg_file) as f:
+      pgis_config = json.load(f)
+    self.assertEqual(pgis_config['iter'], 2)
+
+  def test_extrap_summary_extremum(self):
+    es = ps.ExtrapSummaryProfileSink(self._extrap_dir, ['x'], 'pre', 'post', 'profile.cubex', 2, ['min_time'])
+    cubex = os.path.join(self._exp_dir, 'fl-asd.cubex')
+    min_time = [9.0, 8.0, 5.0, 6.0, 1.0, 2.0, .5, 1.0]
+    for scale in [1, 3]:
+      # The profiles of the repetitions are linked, see write_profile
+      if os.path.exists(cubex):
+        os.remove(cubex)
+      write_cubex(
+          cubex, {
+              'anchor.xml': anchor.replace('<metric id="2" type="EXCLUSIVE">',
+                                           '<metric id="2" type="INCLUSIVE">').encode('utf-8'),
+              '0.index': dense_index(),
+              '0.data': b'CUBEX.DATA' + struct.pack('<8Q', *([1] * 8)),
+              '1.index': dense_index(),
+              '1.data': b'CUBEX.DATA' + struct.pack('<8d', *([1.0] * 8)),
+              '2.index': dense_index(),
+              '2.data': b'CUBEX.DATA' + struct.pack('<8d', *[v * scale for v in min_time])
+          })
+      es.process(self._exp_dir, self._tc, self._ic)
+    es.flush()
+
+    # The inclusive minima are kept as they are, and not subtracted like additive metrics
+    min_time = es.get_summary()['metrics']['min_time']
+    self.assertEqual(min_time['main'], {'mean': 16.0, 'median': 16.0, 'min': 8.0})
+    self.assertEqual(min_time['main/foo/bar'], {'mean': 2.0, 'median': 2.0, 'min': 1.0})
+
+  def test_extrap_summary_state(self):
+    es = ps.ExtrapSummaryProfileSink(self._extrap_dir, ['x'], 'pre', 'post', 'profile.cubex', 3, ['visits'])
+    for scale in [1, 3]:
+      self.write_profile([scale] * 8, [1.0] * 6)
+      es.process(self._exp_dir, self._tc, self._ic)
+
+    # The state is stored as JSON in a checkpoint
+    resumed = ps.ExtrapSummaryProfileSink(self._extrap_dir, ['x'], 'pre', 'post', 'profile.cubex', 3, ['visits'])
+    resumed.set_state(json.loads(json.dumps(es.get_state())))
+    self.assertEqual(resumed.get_summary(), es.get_summary())
+    self.assertEqual(resumed.get_summary()['metrics']['visits']['main/foo'], {'mean': 4, 'median': 4, 'min': 2})
+
+  def test_extrap_summary_no_cube(self):
+    es = ps.ExtrapSummaryProfileSink(self._extrap_dir, ['x'], 'pre', 'post', 'profile.cubex', 3)
+    self.assertRaises(ps.ProfileSinkException, es.process, self._exp_dir, self._tc, self._ic)
+
+
 if __name__ == '__main__':
   unittest.main()
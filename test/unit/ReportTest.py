@@ -0,0 +1,133 @@
+"""
+File: ReportTest.py
+License: Part of the PIRA project. Licensed under BSD 3 clause license. See LICENSE.txt file at https://github.com/jplehr/pira/LICENSE.txt
+Description: Tests for the database reports
+"""
+
+import sys
+sys.path.append('..')
+
+import lib.Report as r
+import lib.Database as d
+import lib.Measurement as ms
+import lib.BaselineCache as bc
+import lib.Pira as pira
+from lib.Configuration import TargetConfiguration
+from lib.ProcessEngine import ResourceUsage
+
+import csv
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+
+class FakeRunner:
+
+  def get_arg_configs(self, target_config):
+    return ['1']
+
+
+class CachedBaseline(bc.BaselineCacheBase):
+  """ A cache that hits for every target """
+
+  def __init__(self, run_result):
+    self._run_result = run_result
+
+  def get_baseline(self, target_config, build_fn, measure_fn):
+    return self._run_result
+
+
+class TestReport(unittest.TestCase):
+
+  def setUp(self):
+    self.dir = tempfile.mkdtemp()
+    self.db_file = os.path.join(self.dir, 'pira.sqlite')
+    dbm = d.DBManager.DBImpl(self.db_file)
+    for item, bench, scale in [('item-a', 'a', 1.0), ('item-b', 'b', 2.0)]:
+      dbm.enter_run_data('base-' + item, bench, -1, False, None, self.run_result([1.0, 2.0], scale), item, ['1', '2'])
+      for it in [0, 1]:
+        dbm.enter_run_data('run-' + item + str(it), bench, it, True, 'cube', self.run_result([1.5, 3.0], scale), item,
+                           ['1', '2'])
+        dbm.enter_analysis_data(item, bench, it, 10 * (it + 1))
+    dbm.close()
+
+  def tearDown(self):
+    shutil.rmtree(self.dir)
+
+  def run_result(self, runtimes, scale):
+    run_result = ms.RunResult()
+    for runtime in runtimes:
+      run_result.add_from(ms.RunResult.from_usages([ResourceUsage(int(runtime * scale * 1e9))] * 3))
+    return run_result
+
+  def test_overhead(self):
+    reporter = r.Reporter(self.db_file)
+    report = reporter.query('overhead', 'b')
+    reporter.close()
+    columns = report.get_columns()
+    self.assertIn('Overhead', columns)
+    self.assertEqual(len(report.get_rows()), 4)
+    for row in report.get_rows():
+      self.assertEqual(row[columns.index('BenchmarkName')], 'b')
+      self.assertAlmostEqual(row[columns.index('Overhead')], 1.5)
+      self.assertEqual(row[columns.index('Repetitions')], 3)
+    self.assertEqual([row[columns.index('Args')] for row in report.get_rows()], ['1', '2', '1', '2'])
+
+  def test_overhead_cached_baseline(self):
+    dbm = d.DBManager.DBImpl(self.db_file)
+    tc = TargetConfiguration(self.dir, self.dir, 'c', 'fl', 'item-c')
+    # Neither build nor baseline run take place, but the cached baseline is recorded for item-c
+    pira.execute_with_config(FakeRunner(), None, 0, tc, CachedBaseline(self.run_result([2.0], 1.0)), dbm=dbm)
+    dbm.enter_run_data('run-item-c0', 'c', 0, True, 'cube', self.run_result([3.0], 1.0), 'item-c', ['1'])
+    dbm.close()
+
+    reporter = r.Reporter(self.db_file)
+    report = reporter.query('overhead', 'c')
+    reporter.close()
+    columns = report.get_columns()
+    self.assertEqual(len(report.get_rows()), 1)
+    self.assertAlmostEqual(report.get_rows()[0][columns.index('BaselineRuntime')], 2.0)
+    self.assertAlmostEqual(report.get_rows()[0][columns.index('Overhead')], 1.5)
+
+  def test_runtime_and_whitelist(self):
+    reporter = r.Reporter(self.db_file)
+    runtime = reporter.query('runtime').to_columns()
+    whitelist = reporter.query('whitelist', 'a').to_columns()
+    reporter.close()
+    self.assertEqual(len(runtime['Runtime']), 12)
+    self.assertEqual(sorted(set(runtime['Iteration_No'])), [-1, 0, 1])
+    self.assertEqual(whitelist['NumFunctions'], [10, 20])
+
+  def test_write(self):
+    reporter = r.Reporter(self.db_file)
+    report = reporter.query('whitelist')
+    reporter.close()
+    csv_file = os.path.join(self.dir, 'whitelist.csv')
+    report.write(csv_file, 'csv')
+    with open(csv_file) as f:
+      rows = list(csv.reader(f))
+    self.assertEqual(rows[0], report.get_columns())
+    self.assertEqual(len(rows), 5)
+
+    columns_file = os.path.join(self.dir, 'whitelist.json')
+    report.write(columns_file, 'columns')
+    with open(columns_file) as f:
+      self.assertEqual(json.load(f)['BenchmarkName'], ['a', 'a', 'b', 'b'])
+
+    self.assertEqual(len(report.format_table().splitlines()), 6)
+    self.assertRaises(r.ReportException, report.write, csv_file, 'xml')
+    if r.pyarrow is None:
+      self.assertRaises(r.ReportException, report.write, csv_file, 'parquet')
+
+  def test_main(self):
+    out_file = os.path.join(self.dir, 'overhead.csv')
+    self.assertEqual(r.main(['overhead', '--db', self.db_file, '--format', 'csv', '--output', out_file]), 0)
+    self.assertTrue(os.path.isfile(out_file))
+    self.assertEqual(r.main(['overhead', '--db', os.path.join(self.dir, 'nope.sqlite')]), 1)
+    self.assertRaises(r.ReportException, r.Reporter(self.db_file).query, 'nope')
+
+
+if __name__ == '__main__':
+  unittest.main()
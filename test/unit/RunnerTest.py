@@ -0,0 +1,42 @@
+"""
+File: RunnerTest.py
+License: Part of the PIRA project. Licensed under BSD 3 clause license. See LICENSE.txt file at https://github.com/jplehr/pira/LICENSE.txt
+Description: Tests for the repetition handling of the local runner
+"""
+
+import sys
+sys.path.append('..')
+
+import lib.Runner as r
+import lib.ProfileSink as ps
+from lib.ProcessEngine import ResourceUsage
+
+import unittest
+
+
+def usages_of(runtimes):
+  return [ResourceUsage(int(rt * 1e9)) for rt in runtimes]
+
+
+class TestRepetitions(unittest.TestCase):
+
+  def test_fixed_repetitions(self):
+    runner = r.LocalRunner(None, ps.NopSink(), 3)
+    self.assertFalse(runner.is_adaptive())
+    self.assertTrue(runner.needs_more_repetitions(usages_of([1.0, 5.0])))
+    self.assertFalse(runner.needs_more_repetitions(usages_of([1.0, 5.0, 9.0])))
+
+  def test_adaptive_converged(self):
+    runner = r.LocalRunner(None, ps.NopSink(), 3, target_rel_ci=0.05, max_repetitions=10)
+    self.assertTrue(runner.is_adaptive())
+    self.assertTrue(runner.needs_more_repetitions(usages_of([1.0, 1.0])))
+    self.assertFalse(runner.needs_more_repetitions(usages_of([1.0, 1.01, 0.99])))
+
+  def test_adaptive_noisy(self):
+    runner = r.LocalRunner(None, ps.NopSink(), 3, target_rel_ci=0.05, max_repetitions=5)
+    self.assertTrue(runner.needs_more_repetitions(usages_of([1.0, 2.0, 3.0])))
+    self.assertFalse(runner.needs_more_repetitions(usages_of([1.0, 2.0, 3.0, 4.0, 5.0])))
+
+
+if __name__ == '__main__':
+  unittest.main()
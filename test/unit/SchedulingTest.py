@@ -0,0 +1,151 @@
+"""
+File: SchedulingTest.py
+License: Part of the PIRA project. Licensed under BSD 3 clause license. See LICENSE.txt file at https://github.com/jplehr/pira/LICENSE.txt
+Description: Tests for the parallel target scheduler
+"""
+
+import sys
+sys.path.append('..')
+
+import lib.Scheduling as sched
+import lib.Logging as log
+import lib.Utility as u
+import lib.ProfileSink as ps
+from lib.Configuration import TargetConfiguration
+
+import unittest
+import glob
+import os
+import tempfile
+import time
+
+
+class FakeConfig:
+
+  def get_analyser_exp_dir(self, build, item):
+    return '/tmp/cubes/' + item
+
+
+class FakeRunner:
+
+  def __init__(self, sink):
+    self._sink = sink
+
+  def has_sink(self):
+    return not isinstance(self._sink, ps.NopSink)
+
+  def get_sink(self):
+    return self._sink
+
+
+def log_pid(target_config):
+  log.get_logger().log('pid ' + str(os.getpid()), level='perf')
+
+
+def fail(target_config):
+  raise RuntimeError('expected failure')
+
+
+def hold_slot(resource_class):
+
+  def fn(target_config):
+    with sched.resource_slot(resource_class):
+      start = time.time()
+      time.sleep(.2)
+      log.get_logger().log(str(start) + ' ' + str(time.time()), level='perf')
+
+  return fn
+
+
+def slot_intervals():
+  return sorted([tuple([float(t) for t in entry.split('[PERF] ')[1].split()]) for entry in log.get_logger().perf_tape])
+
+
+class TestParallelTargetScheduler(unittest.TestCase):
+
+  def setUp(self):
+    u.set_home_dir('/tmp')
+    self.tcs = [
+        TargetConfiguration('/tmp/a', '/tmp/a', 'item01', 'fl', ''),
+        TargetConfiguration('/tmp/a', '/tmp/a', 'item02', 'fl', ''),
+        TargetConfiguration('/tmp/b', '/tmp/b', 'item03', 'fl', ''),
+        TargetConfiguration('/tmp/c', '/tmp/c', 'item03', 'fl', '')
+    ]
+
+  def test_invalid_jobs(self):
+    self.assertRaises(sched.SchedulingException, sched.ParallelTargetScheduler, 0, FakeConfig(),
+                      FakeRunner(ps.NopSink()))
+
+  def test_partition_independent(self):
+    s = sched.ParallelTargetScheduler(4, FakeConfig(), FakeRunner(ps.NopSink()))
+    lanes = s.partition_into_lanes(self.tcs)
+    # item01 and item02 share a build directory, the two item03 share the experiment directory
+    self.assertEqual(lanes, [[0, 1], [2, 3]])
+
+  def test_partition_shared_sink(self):
+    sink = ps.ExtrapProfileSink('/tmp/extrap', ['par'], 'pre', 'post', 'profile.cubex', 1)
+    s = sched.ParallelTargetScheduler(4, FakeConfig(), FakeRunner(sink))
+    lanes = s.partition_into_lanes(self.tcs)
+    self.assertEqual(lanes, [[0, 1, 2, 3]])
+
+  def test_execute_merges_tapes(self):
+    log.get_logger().reset_tape()
+    s = sched.ParallelTargetScheduler(2, FakeConfig(), FakeRunner(ps.NopSink()))
+    s.execute(log_pid, self.tcs)
+    perf = log.get_logger().perf_tape
+    self.assertEqual(len(perf), 4)
+    self.assertTrue(perf[0].startswith('[item01/fl] [PERF] pid'))
+    self.assertTrue(perf[3].startswith('[item03/fl] [PERF] pid'))
+
+  def test_execute_reports_failure(self):
+    s = sched.ParallelTargetScheduler(2, FakeConfig(), FakeRunner(ps.NopSink()))
+    self.assertRaises(RuntimeError, s.execute, fail, self.tcs)
+
+  def test_execute_removes_lane_dirs(self):
+    before = set(glob.glob(os.path.join(tempfile.gettempdir(), 'pira-lane-*')))
+    s = sched.ParallelTargetScheduler(2, FakeConfig(), FakeRunner(ps.NopSink()))
+    self.assertRaises(RuntimeError, s.execute, fail, self.tcs)
+    self.assertEqual(set(glob.glob(os.path.join(tempfile.gettempdir(), 'pira-lane-*'))) - before, set())
+
+
+
+class TestResourcePools(unittest.TestCase):
+
+  def setUp(self):
+    u.set_home_dir('/tmp')
+    log.get_logger().reset_tape()
+    self.tcs = [
+        TargetConfiguration('/tmp/a', '/tmp/a', 'item01', 'fl', ''),
+        TargetConfiguration('/tmp/b', '/tmp/b', 'item02', 'fl', ''),
+        TargetConfiguration('/tmp/c', '/tmp/c', 'item03', 'fl', '')
+    ]
+
+  def tearDown(self):
+    sched.set_resource_pools(sched.ResourcePools())
+
+  def test_invalid_slots(self):
+    self.assertRaises(sched.SchedulingException, sched.ResourcePools, -1, 0)
+    with self.assertRaises(sched.SchedulingException):
+      with sched.ResourcePools().slot('network'):
+        pass
+
+  def test_measure_slots_exclusive(self):
+    sched.set_resource_pools(sched.ResourcePools(0, 1))
+    s = sched.ParallelTargetScheduler(3, FakeConfig(), FakeRunner(ps.NopSink()))
+    s.execute(hold_slot('measure'), self.tcs)
+    intervals = slot_intervals()
+    self.assertEqual(len(intervals), 3)
+    for (_, end), (start, _) in zip(intervals, intervals[1:]):
+      self.assertLessEqual(end, start)
+
+  def test_compile_slots_unlimited(self):
+    sched.set_resource_pools(sched.ResourcePools(0, 1))
+    s = sched.ParallelTargetScheduler(3, FakeConfig(), FakeRunner(ps.NopSink()))
+    s.execute(hold_slot('compile'), self.tcs)
+    intervals = slot_intervals()
+    # Unlimited compile slots: all targets hold one at the same time
+    self.assertLess(max([i[0] for i in intervals]), min([i[1] for i in intervals]))
+
+
+if __name__ == '__main__':
+  unittest.main()
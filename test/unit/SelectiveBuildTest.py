@@ -0,0 +1,68 @@
+"""
+File: SelectiveBuildTest.py
+License: Part of the PIRA project. Licensed under BSD 3 clause license. See LICENSE.txt file at https://github.com/jplehr/pira/LICENSE.txt
+Description: Tests for the translation unit invalidation
+"""
+
+import sys
+sys.path.append('..')
+
+from lib.SelectiveBuild import TranslationUnitInvalidator
+import lib.Utility as u
+
+import unittest
+import json
+import os
+import tempfile
+import shutil
+
+
+def node(origin):
+  return {'callees': [], 'hasBody': True, 'meta': {'fileProperties': {'origin': origin, 'systemInclude': False}}}
+
+
+class TestTranslationUnitInvalidator(unittest.TestCase):
+
+  def setUp(self):
+    self.place = tempfile.mkdtemp()
+    self.cg_file = os.path.join(self.place, '.pira-test.ipcg')
+    call_graph = {
+        'main': node('/src/main.cpp'),
+        '_ZN3GoL4stepEv': node('/src/SerialGoL.cpp'),
+        '_ZN5Field3getEii': node('/src/Field.h'),
+        'noMeta': {'callees': []}
+    }
+    with open(self.cg_file, 'w') as f:
+      json.dump(call_graph, f)
+    for obj in ['main.o', 'SerialGoL.o']:
+      u.write_file(os.path.join(self.place, obj), '')
+    self.instr_file = os.path.join(self.place, '.pira-wl.txt')
+    self.invalidator = TranslationUnitInvalidator(self.cg_file)
+
+  def tearDown(self):
+    shutil.rmtree(self.place)
+
+  def test_changed_sources(self):
+    self.assertEqual(self.invalidator.get_changed_sources(set(['main']), set(['main', '_ZN3GoL4stepEv'])),
+                     set(['/src/SerialGoL.cpp']))
+    self.assertEqual(self.invalidator.get_changed_sources(set(['main']), set(['main'])), set())
+    self.assertIsNone(self.invalidator.get_changed_sources(set(['main']), set(['_ZN5Field3getEii'])))
+    self.assertIsNone(self.invalidator.get_changed_sources(set(), set(['noMeta'])))
+
+  def test_objects_to_invalidate(self):
+    u.write_file(self.instr_file, 'main\n')
+    self.assertIsNone(self.invalidator.get_objects_to_invalidate(self.place, 'make', self.instr_file))
+
+    TranslationUnitInvalidator.record_build(self.place, 'make', self.instr_file)
+    u.write_file(self.instr_file, '_ZN3GoL4stepEv\n')
+    self.assertEqual(
+        self.invalidator.get_objects_to_invalidate(self.place, 'make', self.instr_file),
+        [os.path.join(self.place, 'SerialGoL.o'), os.path.join(self.place, 'main.o')])
+    self.assertIsNone(self.invalidator.get_objects_to_invalidate(self.place, 'make -j', self.instr_file))
+
+    TranslationUnitInvalidator.forget_build(self.place)
+    self.assertIsNone(self.invalidator.get_objects_to_invalidate(self.place, 'make', self.instr_file))
+
+
+if __name__ == '__main__':
+  unittest.main()
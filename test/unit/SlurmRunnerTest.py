@@ -0,0 +1,168 @@
+"""
+File: SlurmRunnerTest.py
+License: Part of the PIRA project. Licensed under BSD 3 clause license. See LICENSE.txt file at https://github.com/jplehr/pira/LICENSE.txt
+Description: Tests for the Slurm job array submission, using fake sbatch, squeue and sacct commands
+"""
+
+import sys
+sys.path.append('..')
+
+import lib.Runner as r
+import lib.ProfileSink as ps
+import lib.BatchSystemHelper as bat_sys
+
+import asyncio
+import os
+import shutil
+import tempfile
+import unittest
+
+# Runs all tasks right away and reports job 42
+fake_sbatch = '''#!/usr/bin/env bash
+for arg in "$@"; do
+  case "$arg" in
+    --array=*) last=${arg##*-} ;;
+  esac
+  script=$arg
+done
+for i in $(seq 0 $last); do
+  SLURM_ARRAY_TASK_ID=$i bash "$script" > /dev/null 2>&1
+done
+echo "42;cluster"
+'''
+
+# Reports the job as running for the first two polls
+fake_squeue = '''#!/usr/bin/env bash
+polls=$(cat "$PIRA_FAKE_SLURM/polls" 2>/dev/null || echo 0)
+echo $((polls + 1)) > "$PIRA_FAKE_SLURM/polls"
+if [ "$polls" -lt 2 ]; then
+  echo 42
+fi
+'''
+
+fake_sacct = '''#!/usr/bin/env bash
+case "$*" in
+  *State*)
+    echo "42_0|COMPLETED"
+    echo "42_1|FAILED"
+    ;;
+  *)
+    echo "42_0|00:01.500|00:00.250|"
+    echo "42_0.batch|00:01.500|00:00.250|2M"
+    echo "42_0.extern|00:00:00|00:00:00|512K"
+    ;;
+esac
+'''
+
+
+class TestSlurmJobArray(unittest.TestCase):
+
+  def setUp(self):
+    self.shim_dir = tempfile.mkdtemp()
+    self.work_dir = tempfile.mkdtemp()
+    for name, content in [('sbatch', fake_sbatch), ('squeue', fake_squeue), ('sacct', fake_sacct)]:
+      with open(os.path.join(self.shim_dir, name), 'w') as f:
+        f.write(content)
+      os.chmod(os.path.join(self.shim_dir, name), 0o755)
+
+    self.old_path = os.environ['PATH']
+    os.environ['PATH'] = self.shim_dir + os.pathsep + self.old_path
+    os.environ['PIRA_FAKE_SLURM'] = self.shim_dir
+
+  def tearDown(self):
+    os.environ['PATH'] = self.old_path
+    del os.environ['PIRA_FAKE_SLURM']
+    shutil.rmtree(self.shim_dir)
+    shutil.rmtree(self.work_dir)
+
+  def test_submit_and_wait(self):
+    script = os.path.join(self.work_dir, 'job.sh')
+    with open(script, 'w') as f:
+      f.write('#!/usr/bin/env bash\n')
+    job = bat_sys.SlurmJobArray(script, 2, '--partition=test', poll_interval=0.01, max_poll_interval=0.02)
+    self.assertEqual(job.submit(), '42')
+    self.assertFalse(job.is_done())
+    states = job.wait()
+    self.assertEqual(states, {0: 'COMPLETED', 1: 'FAILED'})
+
+  def test_wait_on_background_loop(self):
+    script = os.path.join(self.work_dir, 'job.sh')
+    with open(script, 'w') as f:
+      f.write('#!/usr/bin/env bash\n')
+    job = bat_sys.SlurmJobArray(script, 2, poll_interval=0.01, max_poll_interval=0.02)
+    job.submit()
+    self.assertEqual(job.wait(), {0: 'COMPLETED', 1: 'FAILED'})
+    self.assertIsNotNone(bat_sys._background_loop)
+    self.assertTrue(bat_sys._background_loop.is_running())
+
+  def test_parse_slurm_values(self):
+    self.assertEqual(bat_sys.parse_slurm_time('1-02:03:04'), 93784.0)
+    self.assertEqual(bat_sys.parse_slurm_time('03:04.500'), 184.5)
+    self.assertEqual(bat_sys.parse_slurm_time(''), .0)
+    self.assertEqual(bat_sys.parse_slurm_memory('1.5G'), 1572864)
+    self.assertEqual(bat_sys.parse_slurm_memory('100'), 100)
+    self.assertEqual(bat_sys.parse_slurm_memory(''), 0)
+
+  def test_wait_async(self):
+    script = os.path.join(self.work_dir, 'job.sh')
+    with open(script, 'w') as f:
+      f.write('#!/usr/bin/env bash\n')
+    job = bat_sys.SlurmJobArray(script, 2, poll_interval=0.01, max_poll_interval=0.02)
+    job.submit()
+
+    async def wait_and_count():
+      # The event loop is free while the job array is queued
+      ticks = 0
+      task = asyncio.ensure_future(job.wait_async())
+      while not task.done():
+        ticks += 1
+        await asyncio.sleep(0.001)
+      return task.result(), ticks
+
+    states, ticks = asyncio.run(wait_and_count())
+    self.assertEqual(states, {0: 'COMPLETED', 1: 'FAILED'})
+    self.assertGreater(ticks, 1)
+
+  def test_wait_on_poll_loop(self):
+    script = os.path.join(self.work_dir, 'job.sh')
+    with open(script, 'w') as f:
+      f.write('#!/usr/bin/env bash\n')
+    job = bat_sys.SlurmJobArray(script, 2, poll_interval=0.01, max_poll_interval=0.02)
+    job.submit()
+
+    async def wait_in_thread():
+      bat_sys.set_poll_loop(asyncio.get_running_loop())
+      try:
+        with self.assertRaises(bat_sys.BatchSystemException):
+          job.wait()
+        return await asyncio.to_thread(job.wait)
+      finally:
+        bat_sys.set_poll_loop(None)
+
+    self.assertEqual(asyncio.run(wait_in_thread()), {0: 'COMPLETED', 1: 'FAILED'})
+
+  def test_run_array(self):
+    runner = r.SlurmRunner(None, ps.NopSink(), 2, poll_interval=0.01)
+    out_file = os.path.join(self.work_dir, 'out')
+    tasks = [
+        r.SlurmTask('echo "$PIRA_VALUE" >> ' + out_file, self.work_dir, {'PIRA_VALUE': 'a b'}),
+        r.SlurmTask('echo "$(pwd)" >> ' + out_file, self.shim_dir)
+    ]
+    usages = runner.run_array(os.path.join(self.work_dir, '.pira-slurm'), tasks)
+    self.assertEqual(len(usages), 2)
+    self.assertTrue(all([u.get_wall_time() >= 0 for u in usages]))
+    # Task 1 is not known to the accounting
+    self.assertEqual((usages[0].get_user_time(), usages[0].get_sys_time(), usages[0].get_max_rss()), (1.5, .25, 2048))
+    self.assertEqual((usages[1].get_user_time(), usages[1].get_sys_time(), usages[1].get_max_rss()), (.0, .0, 0))
+    with open(out_file) as f:
+      self.assertEqual(f.read().split('\n'), ['a b', self.shim_dir, ''])
+
+  def test_run_array_failed_task(self):
+    runner = r.SlurmRunner(None, ps.NopSink(), 2, poll_interval=0.01)
+    tasks = [r.SlurmTask('true', self.work_dir), r.SlurmTask('exit 3', self.work_dir)]
+    with self.assertRaises(RuntimeError):
+      runner.run_array(os.path.join(self.work_dir, '.pira-slurm'), tasks)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -8,8 +8,15 @@ import sys
 sys.path.append('../')
 
 import unittest
+import asyncio
+import contextvars
+import json
+import os
+import tempfile
+import threading
 
 import lib.TimeTracking as tt
+import lib.Utility as u
 
 
 class Dummy:
@@ -54,6 +61,136 @@ class TestTimeTracking(unittest.TestCase):
     self.assertEqual(r, 2)
     self.assertEqual(obj.val, 2)
 
+  def test_wall_time(self):
+    tracker = tt.TimeTracker()
+    tracker.f_track('sleep', u.shell, 'sleep 0.2')
+    self.assertGreaterEqual(tracker.get_wall_time(), 0.2)
+
+
+class TestTracer(unittest.TestCase):
+
+  def setUp(self):
+    self.tracer = tt.Tracer()
+    self.tracer.enable()
+
+  def test_disabled(self):
+    tracer = tt.Tracer()
+    with tracer.span('campaign', 'campaign') as span:
+      self.assertIsNone(span)
+    self.assertEqual(tracer.get_spans(), [])
+
+  def test_nesting(self):
+    with self.tracer.span('campaign', 'campaign') as campaign:
+      with self.tracer.span('item/fl', 'target') as target:
+        with self.tracer.span('iteration 0', 'iteration', iteration=0) as iteration:
+          with self.tracer.span('analysis', 'analysis') as analysis:
+            pass
+    self.assertIsNone(campaign.get_parent_id())
+    self.assertEqual(target.get_parent_id(), campaign.get_id())
+    self.assertEqual(iteration.get_parent_id(), target.get_id())
+    self.assertEqual(analysis.get_parent_id(), iteration.get_id())
+    self.assertNotEqual(target.get_track(), campaign.get_track())
+    self.assertEqual(analysis.get_track(), target.get_track())
+    self.assertEqual(iteration.get_attributes(), {'iteration': 0})
+    # Spans are recorded when they end
+    names = [s.get_name() for s in self.tracer.get_spans()]
+    self.assertEqual(names, ['analysis', 'iteration 0', 'item/fl', 'campaign'])
+
+  def test_subprocess_span(self):
+    global_tracer = tt.tracer
+    tt.tracer = self.tracer
+    try:
+      with self.tracer.span('run', 'run') as run:
+        u.shell('sleep 0.2')
+    finally:
+      tt.tracer = global_tracer
+    subprocess_span = self.tracer.get_spans()[0]
+    self.assertEqual(subprocess_span.get_category(), 'subprocess')
+    self.assertEqual(subprocess_span.get_parent_id(), run.get_id())
+    self.assertEqual(subprocess_span.get_attributes()['return_code'], 0)
+    self.assertGreaterEqual(subprocess_span.get_wall_time(), 0.2)
+    self.assertGreaterEqual(run.get_wall_time(), subprocess_span.get_wall_time())
+    # The CPU time of a sleeping child is close to 0, unlike its wall time
+    self.assertLess(sum(subprocess_span.get_child_cpu_time()), 0.2)
+
+  def test_child_cpu_time_per_target(self):
+    busy = sys.executable + ' -c "import time\nend = time.process_time() + .3\nwhile time.process_time() < end: pass"'
+
+    def target(name, command):
+      with self.tracer.span(name, 'target'):
+        with self.tracer.span('run', 'run'):
+          u.shell(command)
+
+    global_tracer = tt.tracer
+    tt.tracer = self.tracer
+    try:
+      with self.tracer.span('campaign', 'campaign') as campaign:
+        threads = [
+            threading.Thread(target=contextvars.copy_context().run, args=(target, 'busy', busy)),
+            threading.Thread(target=contextvars.copy_context().run, args=(target, 'idle', 'sleep 0.3'))
+        ]
+        for thread in threads:
+          thread.start()
+        for thread in threads:
+          thread.join()
+    finally:
+      tt.tracer = global_tracer
+
+    spans = {s.get_name(): s for s in self.tracer.get_spans()}
+    # The CPU time of the busy command is attributed to its target only, and to the spans enclosing it
+    self.assertGreaterEqual(sum(spans['busy'].get_child_cpu_time()), .25)
+    self.assertLess(sum(spans['idle'].get_child_cpu_time()), .1)
+    self.assertEqual(campaign.get_child_cpu_time()[0],
+                     spans['busy'].get_child_cpu_time()[0] + spans['idle'].get_child_cpu_time()[0])
+
+  def test_merge_child_cpu_time(self):
+    with self.tracer.span('campaign', 'campaign') as campaign:
+      # As recorded by a forked worker process, in a copy of the current span
+      target = tt.Span('42-0', campaign.get_id(), 'item/fl', 'target', 1, {})
+      target.add_child_cpu_time(1.0, .5)
+      target.finish()
+      self.tracer.merge([target])
+    self.assertEqual(campaign.get_child_cpu_time(), (1.0, .5))
+
+  def test_async_tasks(self):
+
+    async def target(name):
+      with self.tracer.span(name, 'target') as t:
+        await asyncio.sleep(0.01)
+        with self.tracer.span('build', 'build') as b:
+          await asyncio.sleep(0.01)
+      return t, b
+
+    async def campaign():
+      return await asyncio.gather(target('a/fl'), target('b/fl'))
+
+    (a, a_build), (b, b_build) = asyncio.run(campaign())
+    self.assertEqual(a_build.get_parent_id(), a.get_id())
+    self.assertEqual(b_build.get_parent_id(), b.get_id())
+    self.assertNotEqual(a.get_track(), b.get_track())
+
+  def test_chrome_trace(self):
+    with self.tracer.span('item/fl', 'target', build='/tmp/b'):
+      with self.tracer.span('build', 'build'):
+        pass
+    out_dir = tempfile.mkdtemp()
+    out_file = os.path.join(out_dir, 'trace.json')
+    self.tracer.export_chrome_trace(out_file)
+    with open(out_file) as f:
+      trace = json.load(f)
+    u.remove_dir(out_dir)
+
+    events = trace['traceEvents']
+    self.assertEqual([e['ph'] for e in events], ['X', 'M', 'X'])
+    build, metadata, target = events
+    self.assertEqual(metadata['args']['name'], 'item/fl')
+    self.assertEqual(metadata['tid'], target['tid'])
+    self.assertEqual(target['args']['build'], '/tmp/b')
+    self.assertEqual(build['tid'], target['tid'])
+    self.assertLessEqual(target['ts'], build['ts'])
+    self.assertLessEqual(build['ts'] + build['dur'], target['ts'] + target['dur'])
+    self.assertIn('child_user_time', build['args'])
+
 
 if __name__ == '__main__':
   unittest.main()
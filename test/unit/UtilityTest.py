@@ -28,7 +28,12 @@ class TestUtility(unittest.TestCase):
     command = 'echo "Hello world!"'
     expected_out = '[debug] Utility::shell: DRY RUN SHELL CALL: ' + command
 
-    out, t = u.shell(command, dry=True)
+    # The message is logged at the disabled debug level
+    log.get_logger().set_tape_policy('all')
+    try:
+      out, t = u.shell(command, dry=True)
+    finally:
+      log.get_logger().set_tape_policy('enabled')
     lm = log.get_logger().get_last_msg()
     self.assertEqual(lm, expected_out)
     self.assertEqual(t, 1.0)
@@ -50,6 +55,134 @@ class TestUtility(unittest.TestCase):
     self.assertEqual(out, expected_out)
     self.assertEqual(t, -1.0)  # XXX This is already a little fishy!
 
+  def test_shell_with_usage(self):
+    out, usage = u.shell_with_usage('echo "Hello World!"')
+    self.assertEqual(out, 'Hello World!\n')
+    self.assertGreater(usage.get_wall_time_ns(), 0)
+    self.assertGreaterEqual(usage.get_cpu_time(), .0)
+    self.assertGreater(usage.get_max_rss(), 0)
+
+  def test_shell_fail(self):
+    self.assertRaises(Exception, u.shell, 'exit 2')
+    # Only a grep that finds nothing may return 1
+    self.assertRaises(Exception, u.shell, 'exit 1')
+    self.assertRaises(Exception, u.shell, 'echo grep ; exit 1')
+    out, _ = u.shell('grep pira /dev/null')
+    self.assertEqual(out, '')
+
+  def test_shell_for_submitter(self):
+    self.assertEqual(u.shell_for_submitter('printf "%s" job 42'), b'job42')
+    self.assertEqual(u.shell_for_submitter('grep pira /dev/null'), b'')
+    self.assertEqual(u.shell_for_submitter('exit 2', dry=True), b'')
+    self.assertRaises(Exception, u.shell_for_submitter, 'exit 2')
+
+  def test_shell_timeout(self):
+    self.assertRaises(Exception, u.shell, 'sleep 10', timeout=0.2)
+
+  def test_shell_env(self):
+    out, _ = u.shell('echo $PIRA_UNIT_TEST_VAR', env={'PIRA_UNIT_TEST_VAR': 'pira'})
+    self.assertEqual(out, 'pira\n')
+    self.assertNotIn('PIRA_UNIT_TEST_VAR', u.os.environ)
+
+  def test_shell_context(self):
+    cwd = u.get_cwd()
+    context = u.pe.ExecutionContext('/', {'PIRA_UNIT_TEST_VAR': 'ctx', 'PIRA_UNIT_TEST_VAR2': 'ctx2'})
+    out, _ = u.shell('pwd; echo $PIRA_UNIT_TEST_VAR $PIRA_UNIT_TEST_VAR2', env={'PIRA_UNIT_TEST_VAR': 'env'},
+                     context=context)
+    self.assertEqual(out, '/\nenv ctx2\n')
+    self.assertEqual(u.get_cwd(), cwd)
+    self.assertNotIn('PIRA_UNIT_TEST_VAR2', u.os.environ)
+
+  def test_run_active_functor(self):
+
+    class ActiveFunctor:
+
+      def active(self, benchmark, **kwargs):
+        return benchmark, kwargs['arg'], u.get_cwd(), u.os.environ.get('PIRA_UNIT_TEST_VAR')
+
+    cwd = u.get_cwd()
+    context = u.pe.ExecutionContext('/', {'PIRA_UNIT_TEST_VAR': 'ctx'})
+    self.assertEqual(u.run_active_functor(ActiveFunctor(), 'gol', context, arg=1), ('gol', 1, '/', 'ctx'))
+    self.assertEqual(u.get_cwd(), cwd)
+    self.assertNotIn('PIRA_UNIT_TEST_VAR', u.os.environ)
+
+  def test_partition_cpus(self):
+    cpus = u.get_available_cpus()
+    sets = u.partition_cpus(1)
+    self.assertEqual(sets, [cpus])
+    sets = u.partition_cpus(len(cpus), 1)
+    self.assertEqual(len(sets), len(cpus))
+    self.assertEqual(len(set([c for cs in sets for c in cs])), len(cpus))
+
+  def test_partition_cpus_too_many(self):
+    cpus = u.get_available_cpus()
+    self.assertRaises(u.PiraException, u.partition_cpus, len(cpus) + 1)
+    self.assertRaises(u.PiraException, u.partition_cpus, 1, len(cpus) + 1)
+
+  def test_hash_source_tree(self):
+    d = u.tempfile.mkdtemp()
+    u.write_file(d + '/main.cpp', 'int main() {}')
+    h1 = u.hash_source_tree(d)
+    u.write_file(d + '/main.o', 'object')
+    with open(d + '/main', 'wb') as f:
+      f.write(b'\x7fELF')
+    self.assertEqual(u.hash_source_tree(d), h1)
+    self.assertEqual(len(u.find_executables(d)), 0)
+    u.os.chmod(d + '/main', 0o755)
+    self.assertEqual(u.find_executables(d), [d + '/main'])
+    # Inputs and outputs of the application are no sources
+    u.write_file(d + '/result.txt', 'output')
+    self.assertEqual(u.hash_source_tree(d), h1)
+    u.write_file(d + '/main.cpp', 'int main() { return 0; }')
+    self.assertNotEqual(u.hash_source_tree(d), h1)
+    u.remove_dir(d)
+
+  @unittest.skipIf(u.shutil.which('git') is None, 'Requires git')
+  def test_hash_source_tree_git(self):
+    d = u.tempfile.mkdtemp()
+    u.shell('git init -q ' + d)
+    u.write_file(d + '/main.cpp', 'int main() {}')
+    u.write_file(d + '/input.dat', '42')
+    u.shell('git -C ' + d + ' add main.cpp input.dat')
+    self.assertEqual(u.get_tracked_files(d), [d + '/input.dat', d + '/main.cpp'])
+    h1 = u.hash_source_tree(d)
+    u.write_file(d + '/main.cpp.orig', 'untracked')
+    self.assertEqual(u.hash_source_tree(d), h1)
+    u.write_file(d + '/input.dat', '43')
+    self.assertNotEqual(u.hash_source_tree(d), h1)
+    u.remove_dir(d)
+
+  def test_toolchain_fingerprint(self):
+    fingerprint = u.get_toolchain_fingerprint()
+    self.assertEqual(len(fingerprint), 64)
+    self.assertEqual(u.get_toolchain_fingerprint(), fingerprint)
+
+  def test_archive_file(self):
+    d = u.tempfile.mkdtemp()
+    u.write_file(d + '/src', 'profile' * 1000)
+    self.assertEqual(u.archive_file(d + '/src', d + '/linked'), 'link')
+    self.assertTrue(u.os.path.samefile(d + '/src', d + '/linked'))
+    for strategy in u.copy_strategies[1:]:
+      if strategy != 'reflink' and not hasattr(u.os, strategy):
+        continue
+      used = u.archive_file(d + '/src', d + '/' + strategy, u.copy_strategies[u.copy_strategies.index(strategy):])
+      self.assertNotEqual(used, 'link')
+      self.assertFalse(u.os.path.samefile(d + '/src', d + '/' + strategy))
+      self.assertTrue(u.filecmp.cmp(d + '/src', d + '/' + strategy, shallow=False))
+    self.assertEqual(u.archive_file(d + '/src', d + '/copied', ['copy']), 'copy')
+    self.assertRaises(u.PiraException, u.archive_file, d + '/src', d + '/x', ['teleport'])
+    self.assertRaises(OSError, u.archive_file, d + '/nope', d + '/x')
+    u.remove_dir(d)
+
+  def test_get_whitelisted_functions(self):
+    d = u.tempfile.mkdtemp()
+    u.write_file(d + '/wl.txt', 'SCOREP_REGION_NAMES_BEGIN\nEXCLUDE *\nINCLUDE main\nINCLUDE MANGLED _Z1fv\n'
+                 'SCOREP_REGION_NAMES_END\n')
+    self.assertEqual(u.get_whitelisted_functions(d + '/wl.txt'), set(['main', '_Z1fv']))
+    u.write_file(d + '/wl.txt', 'main\n_Z1fv\n')
+    self.assertEqual(u.get_whitelisted_functions(d + '/wl.txt'), set(['main', '_Z1fv']))
+    u.remove_dir(d)
+
   def test_concat_a_b_with_sep_all_empty(self):
     a = ''
     b = ''